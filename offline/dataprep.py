@@ -1,3 +1,4 @@
+import argparse
 import requests
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -415,11 +416,30 @@ def sumarizar_proposicoes():
         print(f"Erro ao sumarizar proposições: {e}")
 
 
+def publicar_indice_assistente():
+    """
+    Monta os documentos do assistente, calcula os embeddings em lotes grandes com todos os
+    núcleos da máquina e publica um pacote versionado do índice em 'data/assistente/'.
+    O dashboard apenas abre o pacote publicado; nenhum embedding é calculado ao responder.
+    """
+    from online.assistant import publicar_base
+
+    pasta = publicar_base(num_threads=os.cpu_count() or 1, max_tokens=16384)
+    print(f"Índice do assistente publicado em '{pasta}'.")
+
+
 
 
 
 if __name__ == "__main__":
-    
+    parser = argparse.ArgumentParser(description="Coleta os dados da Câmara e prepara os artefatos do dashboard.")
+    parser.add_argument("--somente-indice", action="store_true", help="apenas recalcula e publica o índice do assistente")
+    args = parser.parse_args()
+
+    if args.somente_indice:
+        publicar_indice_assistente()
+        sys.exit(0)
+
     coletar_deputados()
     distribuicao = gerar_grafico_distribuicao()
     gerar_insights_gemini(distribuicao)
@@ -427,5 +447,6 @@ if __name__ == "__main__":
     gerar_analise_gemini()
     gerar_insights_despesas()
     coletar_proposicoes(data_inicio="2024-08-01", data_fim="2024-08-30")
-    sumarizar_proposicoes() 
+    sumarizar_proposicoes()
+    publicar_indice_assistente()
 
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+class CacheRespostas:
+    """Cache LRU com TTL de respostas do assistente, versionado pelos dados/índice.
+
+    Cada entrada guarda a versão dos dados vigente quando foi criada. Quando a versão
+    informada em `obter`/`guardar` muda (dados regravados, índice reconstruído), todas
+    as entradas antigas são descartadas. Seguro para uso entre threads/sessões do
+    Streamlit e persistido em JSON com escrita atômica (arquivo temporário + rename).
+    """
+
+    def __init__(self, caminho: Path | None = None, max_itens: int = 512, ttl_segundos: float = 24 * 3600) -> None:
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self.acertos = 0
+        self.faltas = 0
+        self._versao: str | None = None
+        self._itens: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._carregar()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def _carregar(self) -> None:
+        if self.caminho is None or not self.caminho.exists():
+            return
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as file:
+                dados = json.load(file)
+        except (OSError, ValueError):
+            return
+        self._versao = dados.get("versao")
+        self._itens = OrderedDict((chave, item) for chave, item in dados.get("itens", []))
+
+    def _persistir(self) -> None:
+        if self.caminho is None:
+            return
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_name(f"{self.caminho.name}.{os.getpid()}.tmp")
+        with open(temporario, "w", encoding="utf-8") as file:
+            json.dump({"versao": self._versao, "itens": list(self._itens.items())}, file, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
+
+    def _sincronizar_versao(self, versao: str) -> None:
+        if versao != self._versao:
+            self._itens.clear()
+            self._versao = versao
+
+    def obter(self, chave: str, versao: str) -> dict[str, Any] | None:
+        with self._lock:
+            self._sincronizar_versao(versao)
+            item = self._itens.get(chave)
+            if item is not None and time.time() - item["criado_em"] > self.ttl_segundos:
+                del self._itens[chave]
+                item = None
+            if item is None:
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item["resposta"]
+
+    def guardar(self, chave: str, versao: str, resposta: dict[str, Any]) -> None:
+        self.guardar_varios([(chave, resposta)], versao)
+
+    def guardar_varios(self, itens: list[tuple[str, dict[str, Any]]], versao: str) -> None:
+        """Guarda várias respostas com uma única gravação em disco (uso em lotes)."""
+        with self._lock:
+            self._sincronizar_versao(versao)
+            criado_em = time.time()
+            for chave, resposta in itens:
+                self._itens[chave] = {"criado_em": criado_em, "resposta": resposta}
+                self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+            self._persistir()
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self._persistir()
+
+    def estatisticas(self) -> dict[str, Any]:
+        total = self.acertos + self.faltas
+        return {
+            "itens": len(self._itens),
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": (self.acertos / total) if total else 0.0,
+        }
+
+
+class CacheSemantico:
+    """Cache de respostas por similaridade entre perguntas (quase duplicatas).
+
+    Guarda o embedding normalizado de cada pergunta respondida em uma matriz de tamanho fixo;
+    uma pergunta nova com cosseno >= `limiar` para uma guardada do mesmo `grupo` (ex.: mesmos
+    filtros de tema, ano e partido) recebe a resposta dela. LRU com TTL, descartado quando a
+    versão dos dados muda e mantido só em memória.
+    """
+
+    def __init__(self, max_itens: int = 256, limiar: float = 0.95, ttl_segundos: float = 24 * 3600) -> None:
+        self.max_itens = max_itens
+        self.limiar = limiar
+        self.ttl_segundos = ttl_segundos
+        self.acertos = 0
+        self.faltas = 0
+        self._versao: str | None = None
+        self._vetores: np.ndarray | None = None
+        self._itens: OrderedDict[int, dict[str, Any]] = OrderedDict()  # posição na matriz -> entrada
+        self._posicoes: dict[tuple[str, str], int] = {}  # (grupo, pergunta) -> posição
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def _sincronizar_versao(self, versao: str) -> None:
+        if versao != self._versao:
+            self.limpar_itens()
+            self._versao = versao
+
+    def limpar_itens(self) -> None:
+        self._itens.clear()
+        self._posicoes.clear()
+
+    def limpar(self) -> None:
+        with self._lock:
+            self.limpar_itens()
+
+    def obter(self, vetor: np.ndarray, versao: str, grupo: str = "") -> tuple[dict[str, Any], str, float] | None:
+        """Devolve (resposta, pergunta guardada, similaridade) da vizinha mais próxima acima do limiar."""
+        with self._lock:
+            self._sincronizar_versao(versao)
+            if self._itens and self._vetores is not None and self._vetores.shape[1] == vetor.shape[0]:
+                posicoes = np.fromiter(self._itens.keys(), dtype=np.int64, count=len(self._itens))
+                similaridades = self._vetores[posicoes] @ vetor
+                agora = time.time()
+                for ordem in np.argsort(-similaridades):
+                    similaridade = float(similaridades[ordem])
+                    if similaridade < self.limiar:
+                        break
+                    posicao = int(posicoes[ordem])
+                    item = self._itens[posicao]
+                    if item["grupo"] != grupo or agora - item["criado_em"] > self.ttl_segundos:
+                        continue
+                    self._itens.move_to_end(posicao)
+                    self.acertos += 1
+                    return item["resposta"], item["pergunta"], similaridade
+            self.faltas += 1
+            return None
+
+    def guardar_varios(self, itens: list[tuple[str, np.ndarray, str, dict[str, Any]]], versao: str) -> None:
+        """Guarda (pergunta, vetor, grupo, resposta); a mesma pergunta no mesmo grupo é sobrescrita."""
+        with self._lock:
+            self._sincronizar_versao(versao)
+            criado_em = time.time()
+            for pergunta, vetor, grupo, resposta in itens:
+                if self._vetores is None or self._vetores.shape[1] != vetor.shape[0]:
+                    self._vetores = np.zeros((self.max_itens, vetor.shape[0]), dtype=np.float32)
+                    self.limpar_itens()
+                posicao = self._posicoes.get((grupo, pergunta))
+                if posicao is None:
+                    posicao = self._posicao_livre()
+                    self._posicoes[(grupo, pergunta)] = posicao
+                self._vetores[posicao] = vetor
+                self._itens[posicao] = {"pergunta": pergunta, "grupo": grupo, "criado_em": criado_em, "resposta": resposta}
+                self._itens.move_to_end(posicao)
+
+    def _posicao_livre(self) -> int:
+        # Só se despeja com a matriz cheia e a posição é reaproveitada na hora: abaixo do limite,
+        # as posições ocupadas são sempre 0..n-1.
+        if len(self._itens) < self.max_itens:
+            return len(self._itens)
+        posicao, antigo = self._itens.popitem(last=False)
+        del self._posicoes[(antigo["grupo"], antigo["pergunta"])]
+        return posicao
+
+    def estatisticas(self) -> dict[str, Any]:
+        total = self.acertos + self.faltas
+        return {
+            "itens": len(self._itens),
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": (self.acertos / total) if total else 0.0,
+            "limiar": self.limiar,
+        }
@@ -1,41 +1,384 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+import inspect
 import json
+import math
 import os
-from dataclasses import dataclass
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Literal
 
 # Evita crash no Windows por runtimes OpenMP duplicados (faiss/torch).
 os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
-import faiss
 import numpy as np
 import pandas as pd
 import streamlit as st
-import torch
-from transformers import AutoModel, AutoTokenizer
 
 try:
-    import google.generativeai as genai
-except Exception:  # pragma: no cover - fallback when dependency is unavailable
-    genai = None
+    from .answer_cache import CacheRespostas, CacheSemantico
+    from .assistant_client import ASSISTANT_SERVICE_URL, ErroServicoAssistente, chamar_servico
+    from .data_access import ler_parquet, versao_arquivos
+    from .doc_store import DocumentosBinarios, gravar_documentos
+    from .file_lock import TravaArquivo
+except ImportError:  # importado como `assistant` por `streamlit run online/dashboard.py`
+    from answer_cache import CacheRespostas, CacheSemantico
+    from assistant_client import ASSISTANT_SERVICE_URL, ErroServicoAssistente, chamar_servico
+    from data_access import ler_parquet, versao_arquivos
+    from doc_store import DocumentosBinarios, gravar_documentos
+    from file_lock import TravaArquivo
+
+# faiss, torch, transformers e google.generativeai são importados sob demanda, na primeira
+# recuperação: o dashboard importa este módulo e não deve pagar esse custo para desenhar as abas.
+if TYPE_CHECKING:  # pragma: no cover
+    import faiss
+    import torch
+    from transformers import AutoTokenizer
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
-ASSISTANT_INDEX_PATH = DATA_DIR / "assistente_faiss.index"
-ASSISTANT_META_PATH = DATA_DIR / "assistente_faiss_docs.json"
+# Pacotes de índice versionados (um por publicação) e o ponteiro atual_<encoder>.json.
+ASSISTANT_BUNDLES_DIR = DATA_DIR / "assistente"
+# Índice anterior aos pacotes (BERT base, documentos no JSON): servido só enquanto o encoder
+# correspondente não tem pacote publicado, para um clone novo responder sem calcular embeddings.
+ASSISTANT_LEGACY_INDEX_NAME = "assistente_faiss.index"
+ASSISTANT_LEGACY_DOCS_NAME = "assistente_faiss_docs.json"
+PACOTES_MANTIDOS = 2
+# Uma trava de publicação mais velha que isso é tida como abandonada (processo morto em outro host).
+TRAVA_PUBLICACAO_EXPIRA_S = float(os.getenv("ASSISTANT_INDEX_LOCK_TTL", "3600") or 3600)
+# Tempo máximo que um processo espera outro terminar a publicação antes de desistir.
+TRAVA_PUBLICACAO_ESPERA_S = float(os.getenv("ASSISTANT_INDEX_LOCK_WAIT", "900") or 900)
+# Sem pacote publicado, ou com fontes mais novas que ele, o processo só calcula embeddings
+# se ASSISTANT_INDEX_ON_DEMAND=1; o padrão é publicar offline (offline/dataprep.py).
+INDICE_SOB_DEMANDA = os.getenv("ASSISTANT_INDEX_ON_DEMAND", "0").strip() == "1"
+ASSISTANT_ONNX_DIR = DATA_DIR / "onnx"
 BERT_EMBEDDING_MODEL = "neuralmind/bert-base-portuguese-cased"
 BERT_EMBEDDING_DIM = 768
-ASSISTANT_SCHEMA_VERSION = 2
+# Backend de inferência do encoder: "fp32" (PyTorch), "int8" (quantização dinâmica) ou "onnx" (ONNX Runtime).
+EMBEDDING_BACKENDS = ("fp32", "int8", "onnx")
+EMBEDDING_BACKEND = os.getenv("ASSISTANT_EMBEDDING_BACKEND", "fp32").strip().lower()
+EMBEDDING_MAX_LENGTH = 256
+# Orçamento de tokens (com padding) por lote do encoder; 4096 = 16 textos no comprimento máximo.
+EMBEDDING_MAX_TOKENS_PER_BATCH = int(os.getenv("ASSISTANT_EMBEDDING_MAX_TOKENS", "4096") or 4096)
+# 0 mantém o padrão da biblioteca (em geral, um thread por núcleo físico).
+EMBEDDING_INTRA_OP_THREADS = int(os.getenv("ASSISTANT_INTRA_OP_THREADS", "0") or 0)
+ASSISTANT_SCHEMA_VERSION = 3
+# Bases de conhecimento residentes no processo (uma por dataset/versão), despejadas em LRU.
+KB_MEMORIA_MAX_MB = float(os.getenv("ASSISTANT_KB_MEMORY_MB", "2048") or 0)
+KB_MAX_BASES = int(os.getenv("ASSISTANT_KB_MAX_BASES", "4") or 4)
+ARQUIVOS_FONTE = (
+    "deputados.parquet",
+    "serie_despesas_diarias_deputados.parquet",
+    "despesas_deputados_detalhadas.parquet",
+    "proposicoes_deputados.parquet",
+    "sumarizacao_proposicoes.json",
+)
+ANSWER_CACHE_FILENAME = "assistente_cache_respostas.json"
+ANSWER_CACHE_MAX_ITEMS = int(os.getenv("ASSISTANT_ANSWER_CACHE_SIZE", "512") or 512)
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ASSISTANT_ANSWER_CACHE_TTL", str(24 * 3600)) or 0)
+# Cache de quase duplicatas: perguntas com cosseno >= limiar reaproveitam a resposta (0 itens desliga).
+# O limiar depende do encoder (`Encoder.limiar_semantico`): embeddings sem ajuste para sentenças
+# (BERT base) são muito próximos entre si. Sem limiar calibrado (nenhum encoder embutido tem um;
+# meça com tests/benchmark_assistant.py --calibrar-cache) o cache fica desligado, a menos que
+# ASSISTANT_SEMANTIC_CACHE_THRESHOLD defina um.
+SEMANTIC_CACHE_MAX_ITEMS = int(os.getenv("ASSISTANT_SEMANTIC_CACHE_SIZE", "256") or 0)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("ASSISTANT_SEMANTIC_CACHE_THRESHOLD") or 0) or None
+GEMINI_MODEL = "gemini-1.5-flash"
+# Limite de chamadas ao Gemini por minuto no processo (compartilhado entre threads do lote).
+GEMINI_MAX_CHAMADAS_POR_MINUTO = float(os.getenv("ASSISTANT_GEMINI_RPM", "60") or 0)
+# Confiança mínima para responder direto dos agregados, sem embedding, FAISS ou LLM.
+LIMIAR_CONFIANCA_ROTA = 0.8
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+TEMAS_PALAVRAS_CHAVE = {
+    "Economia": ["economia", "fiscal", "tribut", "financeir", "banc", "mercado"],
+    "Ciência, Tecnologia e Inovação": ["ciência", "tecnologia", "inovação", "software", "pesquisa", "telecom", "comput"],
+}
+
+_STOPWORDS = frozenset(
+    "a o as os de da do das dos e em no na nos nas um uma uns umas que qual quais para por com sobre ao aos se mais".split()
+)
+
+
+@dataclass(frozen=True)
+class Encoder:
+    """Encoder de sentenças do assistente (mean pooling sobre `AutoModel`).
+
+    `dim_truncada` guarda só as primeiras dimensões do embedding (truncamento Matryoshka),
+    renormalizadas; os prefixos são os exigidos por modelos da família E5. `limiar_semantico`
+    é o cosseno a partir do qual duas perguntas são a mesma, calibrado para o encoder;
+    `None` desliga o cache semântico.
+    """
+
+    nome: str
+    modelo: str
+    dim: int
+    dim_truncada: int | None = None
+    prefixo_consulta: str = ""
+    prefixo_documento: str = ""
+    limiar_semantico: float | None = None
+
+    @property
+    def dim_indice(self) -> int:
+        return self.dim_truncada or self.dim
+
+    @property
+    def assinatura(self) -> str:
+        """Identifica os vetores produzidos: mudar qualquer parte exige reconstruir o índice."""
+        return "|".join([self.modelo, str(self.dim_indice), self.prefixo_consulta, self.prefixo_documento])
+
+
+ENCODERS = {
+    encoder.nome: encoder
+    for encoder in (
+        Encoder("bert-base-pt", BERT_EMBEDDING_MODEL, BERT_EMBEDDING_DIM),
+        # ~4x mais rápido que o BERT base (12 camadas de 384) e índice com metade do tamanho.
+        Encoder("minilm-multilingue", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", 384),
+        Encoder("e5-small-multilingue", "intfloat/multilingual-e5-small", 384, None, "query: ", "passage: "),
+        # O E5 small não foi treinado com perda Matryoshka: a perda de recall do corte em 256
+        # dimensões deve ser conferida em tests/benchmark_assistant.py --encoders antes do uso.
+        Encoder("e5-small-multilingue-256", "intfloat/multilingual-e5-small", 384, 256, "query: ", "passage: "),
+    )
+}
+# Encoder usado por `build_knowledge_base`; trocar o nome reconstrói o índice na próxima abertura.
+EMBEDDING_ENCODER = os.getenv("ASSISTANT_ENCODER", "bert-base-pt").strip()
+
+
+def _resolver_encoder(nome: str | None = None) -> Encoder:
+    nome = nome or EMBEDDING_ENCODER
+    if nome not in ENCODERS:
+        raise ValueError(f"Encoder desconhecido: {nome!r}. Use um de {tuple(ENCODERS)}.")
+    return ENCODERS[nome]
+
+
+def _normalizar_termo(texto: Any) -> str:
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(caractere for caractere in texto if not unicodedata.combining(caractere))
+
+
+def _tokenizar(texto: Any) -> list[str]:
+    return [termo for termo in re.findall(r"\w+", _normalizar_termo(texto)) if termo not in _STOPWORDS]
+
+
+@dataclass
+class IndiceLexical:
+    """Índice invertido BM25: termo -> lista de (posição do documento, frequência)."""
+
+    postings: dict[str, list[tuple[int, int]]]
+    doc_lens: list[int]
+    k1: float = BM25_K1
+    b: float = BM25_B
+    _idf: dict[str, float] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        total = len(self.doc_lens)
+        self._idf = {
+            termo: math.log(1 + (total - len(lista) + 0.5) / (len(lista) + 0.5)) for termo, lista in self.postings.items()
+        }
+        self._avgdl = (sum(self.doc_lens) / total) if total else 0.0
+
+    @classmethod
+    def construir(cls, textos: list[str]) -> "IndiceLexical":
+        postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lens: list[int] = []
+        for posicao, texto in enumerate(textos):
+            termos = _tokenizar(texto)
+            doc_lens.append(len(termos))
+            for termo, frequencia in Counter(termos).items():
+                postings.setdefault(termo, []).append((posicao, frequencia))
+        return cls(postings=postings, doc_lens=doc_lens)
+
+    def buscar(self, consulta: str, top_k: int, permitidos: set[int] | None = None) -> list[tuple[int, float]]:
+        pontuacao: dict[int, float] = {}
+        for termo in set(_tokenizar(consulta)):
+            idf = self._idf.get(termo)
+            if idf is None:
+                continue
+            for posicao, frequencia in self.postings[termo]:
+                if permitidos is not None and posicao not in permitidos:
+                    continue
+                norma = self.k1 * (1 - self.b + self.b * self.doc_lens[posicao] / (self._avgdl or 1.0))
+                pontuacao[posicao] = pontuacao.get(posicao, 0.0) + idf * frequencia * (self.k1 + 1) / (frequencia + norma)
+        return heapq.nlargest(top_k, pontuacao.items(), key=lambda item: item[1])
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"k1": self.k1, "b": self.b, "doc_lens": self.doc_lens, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, dados: dict[str, Any]) -> "IndiceLexical":
+        postings = {termo: [(int(pos), int(freq)) for pos, freq in lista] for termo, lista in dados["postings"].items()}
+        return cls(postings=postings, doc_lens=[int(n) for n in dados["doc_lens"]], k1=float(dados["k1"]), b=float(dados["b"]))
+
+
+@dataclass(frozen=True)
+class FiltroBusca:
+    """Restrição da busca por facetas dos documentos.
+
+    `temas` e `fontes` são estritos. `partidos` e o período só excluem documentos que
+    declaram essas informações e não batem; os demais (ex.: agregados sem datas) passam.
+    """
+
+    temas: tuple[str, ...] = ()
+    fontes: tuple[str, ...] = ()
+    partidos: tuple[str, ...] = ()
+    data_inicio: str | None = None
+    data_fim: str | None = None
+
+    def vazio(self) -> bool:
+        return not (self.temas or self.fontes or self.partidos or self.data_inicio or self.data_fim)
+
+
+@dataclass
+class IndiceFacetas:
+    """Posições dos documentos por valor de faceta (tema, fonte, partido) e período de cada um.
+
+    Partidos e período vêm de `metadata["partidos"]` e `metadata["periodo"]`, calculados
+    sobre as tabelas de origem inteiras ao montar os documentos (veja `montar_documentos`).
+    """
+
+    valores: dict[str, dict[str, list[int]]]
+    periodos: list[tuple[str, str] | None]
+    _posicoes: dict[str, dict[str, np.ndarray]] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._posicoes = {
+            faceta: {valor: np.asarray(lista, dtype=np.int64) for valor, lista in por_valor.items()}
+            for faceta, por_valor in self.valores.items()
+        }
+        inicio = [periodo[0] if periodo else None for periodo in self.periodos]
+        fim = [periodo[1] if periodo else None for periodo in self.periodos]
+        self._inicio = pd.to_datetime(pd.Series(inicio, dtype=object), errors="coerce").to_numpy()
+        self._fim = pd.to_datetime(pd.Series(fim, dtype=object), errors="coerce").to_numpy()
+
+    @classmethod
+    def construir(cls, documentos: Sequence[dict[str, Any]]) -> "IndiceFacetas":
+        valores: dict[str, dict[str, list[int]]] = {"tema": {}, "fonte": {}, "partido": {}}
+        periodos: list[tuple[str, str] | None] = []
+        for posicao, doc in enumerate(documentos):
+            metadata = doc.get("metadata", {}) or {}
+            valores["fonte"].setdefault(str(doc.get("source", "")), []).append(posicao)
+            if metadata.get("tema"):
+                valores["tema"].setdefault(_normalizar_termo(metadata["tema"]), []).append(posicao)
+            for partido in metadata.get("partidos", []) or []:
+                valores["partido"].setdefault(_normalizar_termo(partido), []).append(posicao)
+            periodo = metadata.get("periodo")
+            periodos.append(tuple(periodo) if periodo else None)
+        return cls(valores=valores, periodos=periodos)
+
+    def partidos(self) -> set[str]:
+        return set(self.valores.get("partido", {}))
+
+    def selecionar(self, filtro: FiltroBusca) -> np.ndarray | None:
+        """Posições permitidas pelo filtro (ordenadas); None quando o filtro não restringe nada."""
+        if filtro.vazio():
+            return None
+        total = len(self.periodos)
+        permitido = np.ones(total, dtype=bool)
+
+        def restringir(faceta: str, escolhidos: tuple[str, ...], estrito: bool) -> None:
+            if not escolhidos:
+                return
+            por_valor = self._posicoes.get(faceta, {})
+            chaves = [valor if faceta == "fonte" else _normalizar_termo(valor) for valor in escolhidos]
+            mascara = np.zeros(total, dtype=bool)
+            for chave in chaves:
+                mascara[por_valor.get(chave, np.empty(0, dtype=np.int64))] = True
+            if not estrito:
+                declarados = np.zeros(total, dtype=bool)
+                for posicoes in por_valor.values():
+                    declarados[posicoes] = True
+                mascara |= ~declarados
+            np.logical_and(permitido, mascara, out=permitido)
+
+        restringir("tema", filtro.temas, estrito=True)
+        restringir("fonte", filtro.fontes, estrito=True)
+        restringir("partido", filtro.partidos, estrito=False)
+        if filtro.data_inicio:
+            permitido &= ~(self._fim < np.datetime64(filtro.data_inicio))
+        if filtro.data_fim:
+            permitido &= ~(self._inicio > np.datetime64(filtro.data_fim))
+        return np.flatnonzero(permitido)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"valores": self.valores, "periodos": self.periodos}
+
+    @classmethod
+    def from_dict(cls, dados: dict[str, Any]) -> "IndiceFacetas":
+        periodos = [tuple(periodo) if periodo else None for periodo in dados["periodos"]]
+        return cls(valores=dados["valores"], periodos=periodos)
+
+
+class IndiceProposicoes:
+    """Índice invertido das proposições (termo da ementa/tema -> linhas do DataFrame).
+
+    Substitui as varreduras `str.contains` por tema: cada fragmento de palavra-chave é
+    resolvido uma única vez contra o vocabulário e depois atendido pelas postings.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        postings: dict[str, list[int]] = {}
+        if "ementa" in df.columns:
+            for linha, ementa in enumerate(df["ementa"].tolist()):
+                if ementa is None or (isinstance(ementa, float) and math.isnan(ementa)):
+                    continue
+                for termo in set(re.findall(r"\w+", _normalizar_termo(ementa))):
+                    postings.setdefault(termo, []).append(linha)
+        self._postings = {termo: np.asarray(linhas, dtype=np.int64) for termo, linhas in postings.items()}
+
+        self._temas: dict[str, np.ndarray] = {}
+        if "tema" in df.columns:
+            codigos, valores = pd.factorize(df["tema"].astype(str))
+            for codigo, valor in enumerate(valores):
+                self._temas[_normalizar_termo(valor)] = np.flatnonzero(codigos == codigo)
+        self._fragmentos: dict[str, np.ndarray] = {}
+
+    def linhas_com_fragmento(self, fragmento: str) -> np.ndarray:
+        fragmento = _normalizar_termo(fragmento)
+        if fragmento not in self._fragmentos:
+            listas = [linhas for termo, linhas in self._postings.items() if fragmento in termo]
+            self._fragmentos[fragmento] = np.unique(np.concatenate(listas)) if listas else np.empty(0, dtype=np.int64)
+        return self._fragmentos[fragmento]
+
+    def linhas_tema(self, tema: str, palavras: list[str]) -> np.ndarray:
+        tema_norm = _normalizar_termo(tema)
+        listas = [linhas for valor, linhas in self._temas.items() if tema_norm in valor]
+        listas.extend(self.linhas_com_fragmento(palavra) for palavra in palavras)
+        listas = [linhas for linhas in listas if len(linhas)]
+        return np.unique(np.concatenate(listas)) if listas else np.empty(0, dtype=np.int64)
 
 
 @dataclass
 class AssistantKnowledgeBase:
-    documents: list[dict[str, Any]]
+    documents: Sequence[dict[str, Any]]
     index: faiss.Index
     embedding_model: str
+    lexical: IndiceLexical | None = None
+    facetas: IndiceFacetas | None = None
+    encoder: Encoder = ENCODERS["bert-base-pt"]
+
+
+@lru_cache(maxsize=1)
+def _carregar_genai() -> Any:
+    try:
+        import google.generativeai as genai
+    except Exception:  # pragma: no cover - fallback when dependency is unavailable
+        return None
+    return genai
 
 
 def _read_json(path: Path, default: Any) -> Any:
@@ -51,32 +394,6 @@ def _save_json(path: Path, data: Any) -> None:
         json.dump(data, file, ensure_ascii=False, indent=2)
 
 
-def _documents_require_rebuild(documentos: list[dict[str, Any]], require_despesas_deputado_doc: bool) -> bool:
-    if not documentos:
-        return True
-
-    encontrou_doc_proposicoes = False
-    encontrou_doc_despesas_deputado = False
-
-    for doc in documentos:
-        metadata = doc.get("metadata", {}) or {}
-        doc_id = str(doc.get("id", ""))
-
-        if doc_id.startswith("proposicoes_"):
-            encontrou_doc_proposicoes = True
-            if not metadata.get("proposicoes"):
-                return True
-
-        if doc_id == "despesas_deputados":
-            encontrou_doc_despesas_deputado = True
-            if not metadata.get("top_deputados"):
-                return True
-
-    if require_despesas_deputado_doc:
-        return not (encontrou_doc_proposicoes and encontrou_doc_despesas_deputado)
-    return not encontrou_doc_proposicoes
-
-
 def _normalizar_fornecedores(valor: Any) -> str:
     if isinstance(valor, (list, tuple)):
         itens = []
@@ -106,43 +423,71 @@ def _texto_breve(texto: str, limite: int = 180) -> str:
     return texto if len(texto) <= limite else texto[: limite - 3] + "..."
 
 
+# Colunas que documentos e estatísticas do assistente usam (nomes alternativos incluídos);
+# as demais colunas da API nem são decodificadas.
+_COLUNAS_DEPUTADOS = ("nome", "siglaPartido")
+_COLUNAS_DESPESAS_AGREGADAS = (
+    "dataDocumento",
+    "tipoDespesa",
+    "total_despesas",
+    "fornecedores",
+    "nomeDeputado",
+    "nomeParlamentar",
+    "nome",
+    "deputado",
+)
+_COLUNAS_DESPESAS_DETALHADAS = ("nomeDeputado", "dataDocumento", "total_despesas")
+_COLUNAS_DATA_PROPOSICAO = ("dataApresentacao", "data_apresentacao", "dataApresentacao_iso", "data")
+_COLUNAS_PROPOSICOES = ("id", "ementa", "tema", *_COLUNAS_DATA_PROPOSICAO, "ano")
+_COLUNAS_NOME_DEPUTADO = ("nomeDeputado", "nomeParlamentar", "nome", "deputado")
+
+
 def _carregar_deputados(data_dir: Path) -> pd.DataFrame:
     caminho = data_dir / "deputados.parquet"
     if not caminho.exists():
         return pd.DataFrame()
-    return pd.read_parquet(caminho)
+    return ler_parquet(caminho, _COLUNAS_DEPUTADOS)
 
 
 def _carregar_despesas_agregadas(data_dir: Path) -> pd.DataFrame:
     caminho = data_dir / "serie_despesas_diarias_deputados.parquet"
     if not caminho.exists():
         return pd.DataFrame()
-    df = pd.read_parquet(caminho)
-    if "dataDocumento" in df.columns:
-        df["dataDocumento"] = pd.to_datetime(df["dataDocumento"], errors="coerce")
-    return df
+    return ler_parquet(caminho, _COLUNAS_DESPESAS_AGREGADAS)
 
 
 def _carregar_despesas_detalhadas(data_dir: Path) -> pd.DataFrame:
     caminho = data_dir / "despesas_deputados_detalhadas.parquet"
     if not caminho.exists():
         return pd.DataFrame()
-    df = pd.read_parquet(caminho)
-    if "dataDocumento" in df.columns:
-        df["dataDocumento"] = pd.to_datetime(df["dataDocumento"], errors="coerce")
-    return df
+    return ler_parquet(caminho, _COLUNAS_DESPESAS_DETALHADAS)
 
 
 def _carregar_proposicoes(data_dir: Path) -> pd.DataFrame:
     caminho = data_dir / "proposicoes_deputados.parquet"
     if not caminho.exists():
         return pd.DataFrame()
-    df = pd.read_parquet(caminho)
+    df = ler_parquet(caminho, _COLUNAS_PROPOSICOES)
     if "dataApresentacao" in df.columns:
         df["dataApresentacao"] = pd.to_datetime(df["dataApresentacao"], errors="coerce")
     return df
 
 
+@lru_cache(maxsize=4)
+def _proposicoes_da_versao(data_dir: Path, versao: tuple[Any, ...]) -> tuple[pd.DataFrame, IndiceProposicoes]:
+    df = _carregar_proposicoes(data_dir)
+    return df, IndiceProposicoes(df)
+
+
+def _proposicoes_indexadas(data_dir: Path) -> tuple[pd.DataFrame, IndiceProposicoes]:
+    """Proposições e seu índice invertido, lidos e tokenizados uma vez por versão do arquivo.
+
+    A chave é `versao_arquivos` (mtime + tamanho): montar os documentos e as estatísticas
+    reaproveita o mesmo índice, e regravar o parquet gera um novo. Somente leitura.
+    """
+    return _proposicoes_da_versao(data_dir, versao_arquivos(data_dir / "proposicoes_deputados.parquet"))
+
+
 def _carregar_sumarizacoes(data_dir: Path) -> list[str]:
     caminho = data_dir / "sumarizacao_proposicoes.json"
     dados = _read_json(caminho, {})
@@ -160,6 +505,46 @@ def _doc(doc_id: str, title: str, text: str, source: str, metadata: dict[str, An
     }
 
 
+def _periodo(datas: pd.Series) -> list[str] | None:
+    """Primeira e última data válidas da série (ISO); None quando nenhuma data é válida."""
+    datas = pd.to_datetime(datas, errors="coerce").dropna()
+    if datas.empty:
+        return None
+    return [datas.min().date().isoformat(), datas.max().date().isoformat()]
+
+
+def _periodo_proposicoes(df: pd.DataFrame) -> list[str] | None:
+    """Período das proposições pela data de apresentação ou, sem ela, pelo ano."""
+    coluna_data = next((c for c in _COLUNAS_DATA_PROPOSICAO if c in df.columns), None)
+    periodo = _periodo(df[coluna_data]) if coluna_data else None
+    if periodo is None and "ano" in df.columns:
+        anos = pd.to_numeric(df["ano"], errors="coerce").dropna()
+        if not anos.empty:
+            periodo = [f"{int(anos.min())}-01-01", f"{int(anos.max())}-12-31"]
+    return periodo
+
+
+def _partidos_das_despesas(df: pd.DataFrame, partido_por_nome: dict[str, str]) -> list[str]:
+    """Siglas dos deputados presentes nas linhas de despesas (vazio se a tabela não os identifica)."""
+    if "siglaPartido" in df.columns:
+        return sorted(str(sigla) for sigla in df["siglaPartido"].dropna().unique())
+    coluna = next((c for c in _COLUNAS_NOME_DEPUTADO if c in df.columns), None)
+    if coluna is None:
+        return []
+    return sorted({partido_por_nome[nome] for nome in df[coluna].dropna().unique() if nome in partido_por_nome})
+
+
+def _facetas_despesas(df: pd.DataFrame, partido_por_nome: dict[str, str]) -> dict[str, Any]:
+    facetas: dict[str, Any] = {}
+    partidos = _partidos_das_despesas(df, partido_por_nome)
+    if partidos:
+        facetas["partidos"] = partidos
+    periodo = _periodo(df["dataDocumento"]) if "dataDocumento" in df.columns else None
+    if periodo:
+        facetas["periodo"] = periodo
+    return facetas
+
+
 def _build_party_document(df_deputados: pd.DataFrame) -> dict[str, Any] | None:
     if df_deputados.empty or "siglaPartido" not in df_deputados.columns:
         return None
@@ -171,15 +556,24 @@ def _build_party_document(df_deputados: pd.DataFrame) -> dict[str, Any] | None:
         "Partidos com mais deputados",
         texto,
         "data/deputados.parquet",
-        {"tipo": "partidos", "top_partidos": distribuicao.to_dict()},
+        {
+            "tipo": "partidos",
+            "top_partidos": distribuicao.to_dict(),
+            "partidos": sorted(str(sigla) for sigla in df_deputados["siglaPartido"].dropna().unique()),
+        },
     )
 
 
-def _build_expense_documents(df_despesas: pd.DataFrame, df_detalhadas: pd.DataFrame) -> list[dict[str, Any]]:
+def _build_expense_documents(
+    df_despesas: pd.DataFrame, df_detalhadas: pd.DataFrame, partido_por_nome: dict[str, str] | None = None
+) -> list[dict[str, Any]]:
     documentos: list[dict[str, Any]] = []
     if df_despesas.empty:
         return documentos
 
+    partido_por_nome = partido_por_nome or {}
+    facetas_agregadas = _facetas_despesas(df_despesas, partido_por_nome)
+
     total_gasto = float(df_despesas["total_despesas"].sum()) if "total_despesas" in df_despesas.columns else 0.0
 
     if "tipoDespesa" in df_despesas.columns and "total_despesas" in df_despesas.columns:
@@ -192,7 +586,12 @@ def _build_expense_documents(df_despesas: pd.DataFrame, df_detalhadas: pd.DataFr
                 "Tipo de despesa mais declarado",
                 texto,
                 "data/serie_despesas_diarias_deputados.parquet",
-                {"total_gasto": total_gasto, "top_tipo": str(tipo_top), "top_valor": float(por_tipo.iloc[0])},
+                {
+                    "total_gasto": total_gasto,
+                    "top_tipo": str(tipo_top),
+                    "top_valor": float(por_tipo.iloc[0]),
+                    **facetas_agregadas,
+                },
             )
         )
 
@@ -211,7 +610,7 @@ def _build_expense_documents(df_despesas: pd.DataFrame, df_detalhadas: pd.DataFr
                 "Fornecedores recorrentes",
                 texto,
                 "data/serie_despesas_diarias_deputados.parquet",
-                {"top_fornecedores": {str(k): float(v) for k, v in top_fornecedores.items()}},
+                {"top_fornecedores": {str(k): float(v) for k, v in top_fornecedores.items()}, **facetas_agregadas},
             )
         )
 
@@ -228,7 +627,10 @@ def _build_expense_documents(df_despesas: pd.DataFrame, df_detalhadas: pd.DataFr
                 "Deputado com mais despesas",
                 texto,
                 "data/despesas_deputados_detalhadas.parquet",
-                {"top_deputados": {str(k): float(v) for k, v in top_deputados.items()}},
+                {
+                    "top_deputados": {str(k): float(v) for k, v in top_deputados.items()},
+                    **_facetas_despesas(df_detalhadas, partido_por_nome),
+                },
             )
         )
     elif {"nomeDeputado", "total_despesas"}.issubset(df_despesas.columns):
@@ -244,35 +646,24 @@ def _build_expense_documents(df_despesas: pd.DataFrame, df_detalhadas: pd.DataFr
                 "Deputado com mais despesas",
                 texto,
                 "data/serie_despesas_diarias_deputados.parquet",
-                {"top_deputados": {str(k): float(v) for k, v in top_deputados.items()}},
+                {"top_deputados": {str(k): float(v) for k, v in top_deputados.items()}, **facetas_agregadas},
             )
         )
 
     return documentos
 
 
-def _build_proposition_documents(df_proposicoes: pd.DataFrame, sumarizacoes: list[str]) -> list[dict[str, Any]]:
+def _build_proposition_documents(
+    df_proposicoes: pd.DataFrame, sumarizacoes: list[str], indice: IndiceProposicoes | None = None
+) -> list[dict[str, Any]]:
     documentos: list[dict[str, Any]] = []
     if df_proposicoes.empty:
         return documentos
 
-    temas_alvo = {
-        "Economia": ["economia", "fiscal", "tribut", "financeir", "banc", "mercado"],
-        "Ciência, Tecnologia e Inovação": ["ciência", "tecnologia", "inovação", "software", "pesquisa", "telecom", "comput"],
-    }
-
-    for tema, palavras in temas_alvo.items():
-        if "tema" in df_proposicoes.columns:
-            mascara_tema = df_proposicoes["tema"].astype(str).str.contains(tema, case=False, na=False)
-        else:
-            mascara_tema = pd.Series([False] * len(df_proposicoes), index=df_proposicoes.index)
+    indice = indice or IndiceProposicoes(df_proposicoes)
 
-        if "ementa" in df_proposicoes.columns:
-            mascara_texto = df_proposicoes["ementa"].astype(str).str.contains("|".join(palavras), case=False, na=False, regex=True)
-        else:
-            mascara_texto = pd.Series([False] * len(df_proposicoes), index=df_proposicoes.index)
-
-        filtrado = df_proposicoes[mascara_tema | mascara_texto].copy()
+    for tema, palavras in TEMAS_PALAVRAS_CHAVE.items():
+        filtrado = df_proposicoes.iloc[indice.linhas_tema(tema, palavras)].copy()
         resumo_textual = []
         itens_struct: list[dict[str, Any]] = []
         if not filtrado.empty:
@@ -293,13 +684,17 @@ def _build_proposition_documents(df_proposicoes: pd.DataFrame, sumarizacoes: lis
             resumo_textual.append("Sem registros suficientes para esse tema na base atual.")
 
         texto = f"Tema {tema}. Foram encontradas {len(filtrado)} proposições relevantes na base local."
+        metadata = {"tema": tema, "quantidade": int(len(filtrado)), "proposicoes": itens_struct, "resumo_textual": resumo_textual}
+        periodo = _periodo_proposicoes(filtrado)
+        if periodo:
+            metadata["periodo"] = periodo
         documentos.append(
             _doc(
                 f"proposicoes_{tema.lower().replace(' ', '_')}",
                 f"Proposições sobre {tema}",
                 texto,
                 "data/proposicoes_deputados.parquet",
-                {"tema": tema, "quantidade": int(len(filtrado)), "proposicoes": itens_struct, "resumo_textual": resumo_textual},
+                metadata,
             )
         )
 
@@ -325,7 +720,7 @@ def montar_documentos(base_dir: Path | None = None) -> list[dict[str, Any]]:
     df_deputados = _carregar_deputados(data_dir)
     df_despesas = _carregar_despesas_agregadas(data_dir)
     df_detalhadas = _carregar_despesas_detalhadas(data_dir)
-    df_proposicoes = _carregar_proposicoes(data_dir)
+    df_proposicoes, indice_proposicoes = _proposicoes_indexadas(data_dir)
     sumarizacoes = _carregar_sumarizacoes(data_dir)
 
     documentos: list[dict[str, Any]] = []
@@ -334,134 +729,1000 @@ def montar_documentos(base_dir: Path | None = None) -> list[dict[str, Any]]:
     if doc_partidos:
         documentos.append(doc_partidos)
 
-    documentos.extend(_build_expense_documents(df_despesas, df_detalhadas))
-    documentos.extend(_build_proposition_documents(df_proposicoes, sumarizacoes))
+    partido_por_nome: dict[str, str] = {}
+    if {"nome", "siglaPartido"}.issubset(df_deputados.columns):
+        partido_por_nome = dict(zip(df_deputados["nome"], df_deputados["siglaPartido"].astype(str)))
+    documentos.extend(_build_expense_documents(df_despesas, df_detalhadas, partido_por_nome))
+    documentos.extend(_build_proposition_documents(df_proposicoes, sumarizacoes, indice_proposicoes))
 
     return documentos
 
 
+class _EncoderOnnx:
+    """Executa o grafo ONNX exportado devolvendo `last_hidden_state` como o AutoModel."""
+
+    def __init__(self, caminho: Path, num_threads: int) -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:  # pragma: no cover - dependência opcional
+            raise RuntimeError("O backend 'onnx' requer o pacote onnxruntime (pip install onnxruntime).") from exc
+
+        opcoes = ort.SessionOptions()
+        opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            opcoes.intra_op_num_threads = num_threads
+        self._sessao = ort.InferenceSession(str(caminho), sess_options=opcoes, providers=["CPUExecutionProvider"])
+        self._entradas = {entrada.name for entrada in self._sessao.get_inputs()}
+
+    def __call__(self, **entradas: torch.Tensor) -> SimpleNamespace:
+        import torch
+
+        feed = {nome: tensor.cpu().numpy() for nome, tensor in entradas.items() if nome in self._entradas}
+        (hidden,) = self._sessao.run(["last_hidden_state"], feed)
+        return SimpleNamespace(last_hidden_state=torch.from_numpy(hidden))
+
+
+def _exportar_onnx(model_name: str, tokenizer: AutoTokenizer) -> Path:
+    destino = ASSISTANT_ONNX_DIR / f"{model_name.replace('/', '__')}.onnx"
+    if destino.exists():
+        return destino
+
+    import torch
+    from transformers import AutoModel
+
+    class _SaidaOcultaBert(torch.nn.Module):
+        """Fixa a assinatura posicional do forward para o rastreamento do exportador ONNX."""
+
+        def __init__(self, model: torch.nn.Module) -> None:
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor, token_type_ids: torch.Tensor) -> torch.Tensor:
+            saida = self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)
+            return saida.last_hidden_state
+
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    exemplo = tokenizer(["exportação onnx"], return_tensors="pt", return_token_type_ids=True)
+    nomes = ["input_ids", "attention_mask", "token_type_ids"]
+    eixos = {nome: {0: "batch", 1: "tokens"} for nome in nomes}
+    eixos["last_hidden_state"] = {0: "batch", 1: "tokens"}
+    # O exportador TorchScript aceita eixos dinâmicos sem dependências extras.
+    extras = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_suffix(".onnx.tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            _SaidaOcultaBert(model),
+            tuple(exemplo[nome] for nome in nomes),
+            str(temporario),
+            input_names=nomes,
+            output_names=["last_hidden_state"],
+            dynamic_axes=eixos,
+            opset_version=17,
+            **extras,
+        )
+    os.replace(temporario, destino)
+    return destino
+
+
 @st.cache_resource(show_spinner=False)
-def _load_embedding_model(model_name: str = BERT_EMBEDDING_MODEL) -> tuple[AutoTokenizer, AutoModel, str]:
+def _load_embedding_model(
+    model_name: str = BERT_EMBEDDING_MODEL,
+    backend: str = EMBEDDING_BACKEND,
+    num_threads: int = EMBEDDING_INTRA_OP_THREADS,
+) -> tuple[AutoTokenizer, Any, str]:
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Backend de embedding desconhecido: {backend!r}. Use um de {EMBEDDING_BACKENDS}.")
+
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
     tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+    if backend == "onnx":
+        return tokenizer, _EncoderOnnx(_exportar_onnx(model_name, tokenizer), num_threads), "cpu"
+
     model = AutoModel.from_pretrained(model_name)
     model.eval()
+    if backend == "int8":
+        # Quantização dinâmica só existe para CPU: pesos das camadas Linear em int8.
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return tokenizer, model, "cpu"
+
     device = "cuda" if torch.cuda.is_available() else "cpu"
     model.to(device)
     return tokenizer, model, device
 
 
-def _embed_texts(textos: list[str], model_name: str = BERT_EMBEDDING_MODEL, batch_size: int = 16) -> np.ndarray:
-    tokenizer, model, device = _load_embedding_model(model_name)
-    batches = []
-
-    for i in range(0, len(textos), batch_size):
-        trecho = textos[i : i + batch_size]
-        entradas = tokenizer(
-            trecho,
+def _planejar_lotes(comprimentos: list[int], max_tokens: int, max_itens: int) -> list[list[int]]:
+    """Agrupa os textos por comprimento (maior primeiro) sob um orçamento de tokens por lote.
+
+    O custo de um lote é `itens * maior comprimento`, pois todos são preenchidos até o
+    maior; ordenar antes evita pagar o padding de uma ementa longa em títulos curtos.
+    """
+    ordem = sorted(range(len(comprimentos)), key=lambda i: comprimentos[i], reverse=True)
+    lotes: list[list[int]] = []
+    atual: list[int] = []
+    maior = 0
+    for i in ordem:
+        comprimento = max(comprimentos[i], 1)
+        novo_maior = max(maior, comprimento)
+        if atual and (novo_maior * (len(atual) + 1) > max_tokens or len(atual) >= max_itens):
+            lotes.append(atual)
+            atual, novo_maior = [], comprimento
+        atual.append(i)
+        maior = novo_maior
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+def _embed_texts(
+    textos: list[str],
+    model_name: str = BERT_EMBEDDING_MODEL,
+    max_tokens: int = EMBEDDING_MAX_TOKENS_PER_BATCH,
+    backend: str | None = None,
+    max_itens: int = 128,
+    dim: int | None = None,
+    num_threads: int = EMBEDDING_INTRA_OP_THREADS,
+) -> np.ndarray:
+    import faiss
+    import torch
+
+    tokenizer, model, device = _load_embedding_model(model_name, backend or EMBEDDING_BACKEND, num_threads)
+    codificados = tokenizer(list(textos), truncation=True, max_length=EMBEDDING_MAX_LENGTH)
+    comprimentos = [len(ids) for ids in codificados["input_ids"]]
+    matriz: np.ndarray | None = None
+
+    for lote in _planejar_lotes(comprimentos, max_tokens, max_itens):
+        entradas = tokenizer.pad(
+            {chave: [codificados[chave][i] for i in lote] for chave in codificados.keys()},
             return_tensors="pt",
-            padding=True,
-            truncation=True,
-            max_length=256,
         )
         entradas = {k: v.to(device) for k, v in entradas.items()}
 
         with torch.no_grad():
             saidas = model(**entradas)
             hidden = saidas.last_hidden_state
-            mascara = entradas["attention_mask"].unsqueeze(-1)
+            mascara = entradas["attention_mask"].unsqueeze(-1).to(hidden.dtype)
             soma = (hidden * mascara).sum(dim=1)
             divisao = mascara.sum(dim=1).clamp(min=1)
-            embeddings = soma / divisao
-        batches.append(embeddings.cpu().numpy().astype(np.float32))
+            embeddings = (soma / divisao).cpu().numpy().astype(np.float32)
+
+        if matriz is None:
+            matriz = np.empty((len(textos), embeddings.shape[1]), dtype=np.float32)
+        matriz[lote] = embeddings  # devolve na ordem original das entradas
 
-    matriz = np.vstack(batches)
+    if matriz is None:
+        return np.empty((0, 0), dtype=np.float32)
+    if dim and dim < matriz.shape[1]:
+        matriz = np.ascontiguousarray(matriz[:, :dim])  # corte Matryoshka antes de normalizar
     faiss.normalize_L2(matriz)
     return matriz
 
 
-@st.cache_resource(show_spinner=False)
-def build_knowledge_base(base_dir: str | None = None) -> AssistantKnowledgeBase:
-    base_path = Path(base_dir) if base_dir else BASE_DIR
-    require_despesas_deputado_doc = (base_path / "data" / "despesas_deputados_detalhadas.parquet").exists()
+def _codificar(
+    textos: list[str], encoder: Encoder, papel: Literal["consulta", "documento"], **opcoes: Any
+) -> np.ndarray:
+    """Embeddings de `encoder` com o prefixo do papel (pergunta ou documento indexado).
+
+    `opcoes` seguem para `_embed_texts` (orçamento de tokens, threads).
+    """
+    prefixo = encoder.prefixo_consulta if papel == "consulta" else encoder.prefixo_documento
+    if prefixo:
+        textos = [prefixo + texto for texto in textos]
+    return _embed_texts(textos, model_name=encoder.modelo, dim=encoder.dim_truncada, **opcoes)
+
+
+def _texto_lexical(doc: dict[str, Any]) -> str:
+    """Texto indexado pelo BM25: título, texto e os valores/chaves dos metadados.
+
+    Os metadados carregam os termos exatos (siglas, ids de PL, fornecedores, nomes)
+    que a busca densa costuma diluir.
+    """
+    partes = [str(doc.get("title", "")), str(doc.get("text", ""))]
+
+    def coletar(valor: Any) -> None:
+        if isinstance(valor, dict):
+            for chave, item in valor.items():
+                partes.append(str(chave))
+                coletar(item)
+        elif isinstance(valor, (list, tuple)):
+            for item in valor:
+                coletar(item)
+        elif isinstance(valor, (str, int)) and not isinstance(valor, bool):
+            partes.append(str(valor))
+
+    coletar(doc.get("metadata", {}))
+    return " ".join(partes)
+
+
+def _carregar_indice_lexical(documentos: Sequence[dict[str, Any]], persistido: Path | None = None) -> IndiceLexical:
+    if persistido is not None and persistido.exists():
+        dados = _read_json(persistido, {})
+        if isinstance(dados, dict) and len(dados.get("doc_lens", [])) == len(documentos):
+            return IndiceLexical.from_dict(dados)
+    return IndiceLexical.construir([_texto_lexical(doc) for doc in documentos])
+
+
+def _carregar_indice_facetas(documentos: Sequence[dict[str, Any]], persistido: Path | None = None) -> IndiceFacetas:
+    if persistido is not None and persistido.exists():
+        dados = _read_json(persistido, {})
+        if isinstance(dados, dict) and len(dados.get("periodos", [])) == len(documentos):
+            return IndiceFacetas.from_dict(dados)
+    return IndiceFacetas.construir(documentos)
+
+
+def _hash_arquivo(caminho: Path) -> str:
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as file:
+        for bloco in iter(lambda: file.read(1 << 20), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def _manifesto_fontes(data_dir: Path, encoder: Encoder) -> dict[str, Any]:
+    fontes: dict[str, Any] = {}
+    for nome in ARQUIVOS_FONTE:
+        caminho = data_dir / nome
+        if not caminho.exists():
+            fontes[nome] = None
+            continue
+        stat = caminho.stat()
+        fontes[nome] = {"tamanho": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _hash_arquivo(caminho)}
+    return {
+        "schema_version": ASSISTANT_SCHEMA_VERSION,
+        "embedding_model": encoder.modelo,
+        "encoder": encoder.assinatura,
+        "fontes": fontes,
+    }
+
+
+def _manifesto_confere(manifesto: Any, data_dir: Path, encoder: Encoder) -> bool:
+    """Compara o manifesto com as fontes usando apenas `stat`, salvo quando o mtime mudou.
+
+    Um arquivo regravado com o mesmo conteúdo (mtime novo, tamanho igual) ainda confere
+    pelo hash; nenhum parquet é lido como tabela.
+    """
+    if not isinstance(manifesto, dict):
+        return False
+    if manifesto.get("schema_version") != ASSISTANT_SCHEMA_VERSION or manifesto.get("encoder") != encoder.assinatura:
+        return False
+
+    fontes = manifesto.get("fontes", {})
+    for nome in ARQUIVOS_FONTE:
+        registro = fontes.get(nome)
+        caminho = data_dir / nome
+        if registro is None or not caminho.exists():
+            if registro is not None or caminho.exists():
+                return False
+            continue
+        stat = caminho.stat()
+        if stat.st_size != registro.get("tamanho"):
+            return False
+        if stat.st_mtime_ns != registro.get("mtime_ns") and _hash_arquivo(caminho) != registro.get("sha256"):
+            return False
+    return True
+
+
+def _ler_indice_mapeado(caminho: Path) -> faiss.Index:
+    import faiss
+
+    # IO_FLAG_MMAP_IFC (faiss >= 1.11, a versão fixada em requirements.txt) mapeia os vetores de
+    # índices planos direto do arquivo; IO_FLAG_MMAP sozinho só vale para listas invertidas.
+    return faiss.read_index(str(caminho), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC)
+
+
+@dataclass(frozen=True)
+class ArtefatosBase:
+    """Arquivos de um pacote de índice publicado em data/assistente/<pacote>/."""
+
+    index: Path
+    meta: Path
+    docs: Path
+    lexical: Path
+    manifest: Path
+    facetas: Path
+
+    @classmethod
+    def de(cls, pasta: Path) -> "ArtefatosBase":
+        return cls(
+            *(
+                pasta / nome
+                for nome in ("faiss.index", "meta.json", "docs.bin", "bm25.json", "manifest.json", "facetas.json")
+            )
+        )
+
+
+def _pasta_pacotes(data_dir: Path) -> Path:
+    return data_dir / ASSISTANT_BUNDLES_DIR.name
+
+
+def _ponteiro_pacote(data_dir: Path, encoder: Encoder) -> Path:
+    return _pasta_pacotes(data_dir) / f"atual_{encoder.nome}.json"
+
+
+def _trava_publicacao(data_dir: Path, encoder: Encoder) -> TravaArquivo:
+    """Uma publicação por vez por dataset e encoder, entre todos os processos."""
+    return TravaArquivo(_pasta_pacotes(data_dir) / f".publicando_{encoder.nome}.lock", TRAVA_PUBLICACAO_EXPIRA_S)
+
+
+def _pacote_publicado(data_dir: Path, encoder: Encoder, desde: float = 0.0) -> ArtefatosBase | None:
+    """Pacote apontado por `atual_<encoder>.json`, se for deste encoder, publicado a partir de
+    `desde` (epoch) e ainda existir."""
+    ponteiro = _read_json(_ponteiro_pacote(data_dir, encoder), None)
+    if not isinstance(ponteiro, dict) or ponteiro.get("encoder") != encoder.assinatura:
+        return None
+    if float(ponteiro.get("publicado_em", 0)) < desde:
+        return None
+    pasta = _pasta_pacotes(data_dir) / str(ponteiro.get("pacote", ""))
+    return ArtefatosBase.de(pasta) if ponteiro.get("pacote") and pasta.is_dir() else None
+
+
+def _carregar_base_legada(data_dir: Path, encoder: Encoder) -> AssistantKnowledgeBase | None:
+    """Base do índice legado em data/, se ele foi gerado com o mesmo modelo e dimensão do encoder."""
+    caminho_index = data_dir / ASSISTANT_LEGACY_INDEX_NAME
+    caminho_docs = data_dir / ASSISTANT_LEGACY_DOCS_NAME
+    if not (caminho_index.exists() and caminho_docs.exists()) or encoder.prefixo_consulta or encoder.dim_truncada:
+        return None
+    dados = _read_json(caminho_docs, {})
+    if not isinstance(dados, dict) or dados.get("embedding_model") != encoder.modelo:
+        return None
+    documentos = dados.get("documents") or []
+    index = _ler_indice_mapeado(caminho_index)
+    if not documentos or index.d != encoder.dim_indice or index.ntotal != len(documentos):
+        return None
+    return AssistantKnowledgeBase(
+        documents=documentos,
+        index=index,
+        embedding_model=encoder.modelo,
+        lexical=_carregar_indice_lexical(documentos),
+        facetas=IndiceFacetas.construir(documentos),
+        encoder=encoder,
+    )
+
+
+def _servindo_indice_legado(base_path: Path, encoder: Encoder) -> bool:
+    data_dir = base_path / "data"
+    return _pacote_publicado(data_dir, encoder) is None and (data_dir / ASSISTANT_LEGACY_INDEX_NAME).exists()
+
+
+def _carregar_base_persistida(artefatos: ArtefatosBase, encoder: Encoder) -> AssistantKnowledgeBase | None:
+    if not (artefatos.index.exists() and artefatos.meta.exists() and artefatos.docs.exists()):
+        return None
+
+    # O pacote só é publicado completo; nenhum documento é decodificado para validá-lo.
+    dados_meta = _read_json(artefatos.meta, {})
+    if not isinstance(dados_meta, dict):
+        return None
+    metadados_encoder = dados_meta.get("encoder")
+    if not isinstance(metadados_encoder, dict) or metadados_encoder.get("assinatura") != encoder.assinatura:
+        return None
+    if int(dados_meta.get("schema_version", 0)) < ASSISTANT_SCHEMA_VERSION:
+        return None
+
+    try:
+        documentos = DocumentosBinarios(artefatos.docs)
+    except (OSError, ValueError):
+        return None
+    index = _ler_indice_mapeado(artefatos.index)
+    if not documentos or index.d != encoder.dim_indice or index.ntotal != len(documentos):
+        return None
+
+    return AssistantKnowledgeBase(
+        documents=documentos,
+        index=index,
+        embedding_model=encoder.modelo,
+        lexical=_carregar_indice_lexical(documentos, artefatos.lexical),
+        facetas=_carregar_indice_facetas(documentos, artefatos.facetas),
+        encoder=encoder,
+    )
+
+
+def _persistir_base(
+    artefatos: ArtefatosBase,
+    index: faiss.Index,
+    documentos: Sequence[dict[str, Any]],
+    lexical: IndiceLexical,
+    facetas: IndiceFacetas,
+    manifesto: dict[str, Any],
+    encoder: Encoder,
+) -> None:
+    import faiss
+
+    artefatos.index.parent.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(index, str(artefatos.index))
+    gravar_documentos(artefatos.docs, documentos)
+    _save_json(
+        artefatos.meta,
+        {
+            "schema_version": ASSISTANT_SCHEMA_VERSION,
+            "embedding_model": encoder.modelo,
+            "embedding_backend": EMBEDDING_BACKEND,
+            "encoder": {
+                "nome": encoder.nome,
+                "assinatura": encoder.assinatura,
+                "modelo": encoder.modelo,
+                "dim": encoder.dim_indice,
+            },
+            "total_documentos": len(documentos),
+        },
+    )
+    _save_json(artefatos.lexical, lexical.to_dict())
+    _save_json(artefatos.facetas, facetas.to_dict())
+    _save_json(artefatos.manifest, manifesto)
+
+
+def _construir_base(
+    base_path: Path, encoder: Encoder, **opcoes_encoder: Any
+) -> tuple[AssistantKnowledgeBase, dict[str, Any]]:
+    """Monta os documentos e calcula os embeddings; devolve a base em memória e o manifesto das fontes."""
+    import faiss
+
+    # Fotografia das fontes antes de lê-las: se mudarem durante o build, o pacote já nasce desatualizado.
+    manifesto = _manifesto_fontes(base_path / "data", encoder)
     documentos = montar_documentos(base_path)
     if not documentos:
         raise FileNotFoundError("Nenhum documento disponível para o assistente.")
 
-    if ASSISTANT_INDEX_PATH.exists() and ASSISTANT_META_PATH.exists() and base_path == BASE_DIR:
-        dados_meta = _read_json(ASSISTANT_META_PATH, {})
-        if isinstance(dados_meta, dict):
-            documentos = dados_meta.get("documents", [])
-            embedding_model = dados_meta.get("embedding_model", BERT_EMBEDDING_MODEL)
-            schema_version = int(dados_meta.get("schema_version", 0))
-        else:
-            documentos = dados_meta
-            embedding_model = BERT_EMBEDDING_MODEL
-            schema_version = 0
-        index = faiss.read_index(str(ASSISTANT_INDEX_PATH))
-
-        # Se existir índice antigo (ex.: TF-IDF) ou dimensão incompatível, força rebuild.
-        if (
-            embedding_model == BERT_EMBEDDING_MODEL
-            and index.d == BERT_EMBEDDING_DIM
-            and schema_version >= ASSISTANT_SCHEMA_VERSION
-            and not _documents_require_rebuild(documentos, require_despesas_deputado_doc=require_despesas_deputado_doc)
-        ):
-            return AssistantKnowledgeBase(documents=documentos, index=index, embedding_model=embedding_model)
-
     textos = [f"{doc['title']}. {doc['text']}" for doc in documentos]
-    embeddings = _embed_texts(textos, model_name=BERT_EMBEDDING_MODEL)
+    embeddings = _codificar(textos, encoder, "documento", **opcoes_encoder)
     index = faiss.IndexFlatIP(embeddings.shape[1])
     index.add(embeddings)
+    kb = AssistantKnowledgeBase(
+        documents=documentos,
+        index=index,
+        embedding_model=encoder.modelo,
+        lexical=_carregar_indice_lexical(documentos),
+        facetas=IndiceFacetas.construir(documentos),
+        encoder=encoder,
+    )
+    return kb, manifesto
 
-    if base_path == BASE_DIR:
-        base_path.mkdir(parents=True, exist_ok=True)
-        DATA_DIR.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(index, str(ASSISTANT_INDEX_PATH))
-        _save_json(
-            ASSISTANT_META_PATH,
-            {
-                "schema_version": ASSISTANT_SCHEMA_VERSION,
-                "embedding_model": BERT_EMBEDDING_MODEL,
-                "documents": documentos,
-            },
-        )
 
-    return AssistantKnowledgeBase(documents=documentos, index=index, embedding_model=BERT_EMBEDDING_MODEL)
+def _publicar_pacote(data_dir: Path, kb: AssistantKnowledgeBase, manifesto: dict[str, Any]) -> Path:
+    """Grava a base em uma pasta temporária, renomeia-a e só então troca o ponteiro.
+
+    Leitores veem o pacote anterior ou o novo, nunca um parcial; pacotes antigos do mesmo
+    encoder além de `PACOTES_MANTIDOS` são removidos (um processo ainda pode mapear o anterior).
+    """
+    pacotes = _pasta_pacotes(data_dir)
+    versao = hashlib.sha1(json.dumps(manifesto, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    nome = f"{kb.encoder.nome}-{versao}-{time.time_ns()}"
+    temporaria = pacotes / f".{nome}.tmp"
+    _persistir_base(
+        ArtefatosBase.de(temporaria), kb.index, kb.documents, kb.lexical, kb.facetas, manifesto, kb.encoder
+    )
+    os.replace(temporaria, pacotes / nome)
 
+    ponteiro = _ponteiro_pacote(data_dir, kb.encoder)
+    temporario = ponteiro.with_name(f"{ponteiro.name}.{os.getpid()}.tmp")
+    _save_json(temporario, {"pacote": nome, "encoder": kb.encoder.assinatura, "publicado_em": time.time()})
+    os.replace(temporario, ponteiro)
 
-def decompor_pergunta(pergunta: str) -> list[str]:
+    anteriores = sorted(
+        (pasta for pasta in pacotes.glob(f"{kb.encoder.nome}-*") if pasta.is_dir() and pasta.name != nome),
+        key=lambda pasta: pasta.stat().st_mtime_ns,
+    )
+    for pasta in anteriores[: max(0, len(anteriores) - (PACOTES_MANTIDOS - 1))]:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return pacotes / nome
+
+
+def publicar_base(
+    base_dir: str | None = None,
+    encoder: str | None = None,
+    num_threads: int = EMBEDDING_INTRA_OP_THREADS,
+    max_tokens: int = EMBEDDING_MAX_TOKENS_PER_BATCH,
+) -> Path:
+    """Etapa offline (offline/dataprep.py): calcula os embeddings e publica um pacote versionado.
+
+    Devolve a pasta do pacote publicado, que passa a ser o aberto por `build_knowledge_base`.
+    """
+    base_path = Path(base_dir) if base_dir else BASE_DIR
+    selecionado = _resolver_encoder(encoder)
+    with _trava_publicacao(base_path / "data", selecionado):
+        kb, manifesto = _construir_base(
+            base_path, selecionado, num_threads=num_threads, max_tokens=max_tokens, max_itens=max_tokens // 16
+        )
+        return _publicar_pacote(base_path / "data", kb, manifesto)
+
+
+def _abrir_ou_construir_base(
+    base_path: Path, reconstruir: bool = False, encoder: Encoder | None = None
+) -> AssistantKnowledgeBase:
+    data_dir = base_path / "data"
+    encoder = encoder or _resolver_encoder()
+    pedido = time.time()
+    kb = None
+
+    # Caminho de serviço: abre o pacote publicado (mapeado em memória) sem ler os parquets.
+    if not reconstruir:
+        artefatos = _pacote_publicado(data_dir, encoder)
+        kb = _carregar_base_persistida(artefatos, encoder) if artefatos is not None else None
+        if kb is not None and not INDICE_SOB_DEMANDA:
+            return kb  # fontes mais novas que o pacote aguardam a próxima publicação offline
+        if kb is not None and _manifesto_confere(_read_json(artefatos.manifest, None), data_dir, encoder):
+            return kb
+        if kb is None and artefatos is None and not INDICE_SOB_DEMANDA:
+            if (legada := _carregar_base_legada(data_dir, encoder)) is not None:
+                return legada  # clone novo: documentos do índice legado até a primeira publicação
+        if kb is None and not INDICE_SOB_DEMANDA:
+            raise FileNotFoundError(
+                f"Nenhum índice do assistente publicado em {_pasta_pacotes(data_dir)} para o encoder "
+                f"{encoder.nome!r}. Rode `python offline/dataprep.py --somente-indice`."
+            )
+
+    # Single-flight entre processos: só quem obtém a trava calcula embeddings e publica.
+    trava = _trava_publicacao(data_dir, encoder)
+    try:
+        livre = trava.tentar()
+    except OSError:  # dataset em pasta somente leitura: a base fica só em memória
+        return _construir_base(base_path, encoder)[0]
+    try:
+        if not livre:
+            if kb is not None:
+                return kb  # outro processo publica a versão nova; segue servindo a anterior
+            if not trava.adquirir(timeout=TRAVA_PUBLICACAO_ESPERA_S):
+                raise TimeoutError(
+                    f"Outra publicação do índice do assistente segura {trava.caminho} há mais de "
+                    f"{TRAVA_PUBLICACAO_ESPERA_S:.0f}s (ASSISTANT_INDEX_LOCK_WAIT). Aguarde ou remova a "
+                    "trava se o processo que a criou não existe mais."
+                )
+            # Quem segurava a trava pode ter publicado exatamente o que este pedido precisava.
+            artefatos = _pacote_publicado(data_dir, encoder, desde=pedido)
+            recente = _carregar_base_persistida(artefatos, encoder) if artefatos is not None else None
+            if recente is not None:
+                return recente
+        kb, manifesto = _construir_base(base_path, encoder)
+        try:
+            _publicar_pacote(data_dir, kb, manifesto)
+        except OSError:
+            pass  # a base segue válida só em memória
+        return kb
+    finally:
+        trava.liberar()
+
+
+def _estimar_bytes(kb: AssistantKnowledgeBase) -> int:
+    """Estimativa grosseira da memória de uma base: vetores, documentos e postings do BM25."""
+    total = kb.index.ntotal * kb.index.d * 4
+    if isinstance(kb.documents, DocumentosBinarios):
+        total += kb.documents.caminho.stat().st_size
+    else:
+        total += sum(len(json.dumps(doc, ensure_ascii=False)) for doc in kb.documents)
+    if kb.lexical is not None:
+        total += 64 * sum(len(lista) for lista in kb.lexical.postings.values())
+    return total
+
+
+class RegistroBases:
+    """Bases de conhecimento residentes, por dataset, versão dos dados e encoder, em LRU.
+
+    Quando os arquivos de um dataset mudam ou um pacote novo é publicado (por este ou por
+    outro processo), a entrada anterior do mesmo dataset e encoder é trocada pela nova; as
+    de outros encoders ficam. Ao passar de `max_bases` ou do orçamento de memória, as bases
+    usadas há mais tempo são despejadas; a reabertura usa os artefatos persistidos em data/.
+    """
+
+    def __init__(self, max_mb: float = KB_MEMORIA_MAX_MB, max_bases: int = KB_MAX_BASES) -> None:
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_bases = max_bases
+        self.despejos = 0
+        self._lock = threading.Lock()
+        self._bases: OrderedDict[tuple[str, str, str], tuple[AssistantKnowledgeBase, int]] = OrderedDict()
+        self._construindo: dict[tuple[str, str], threading.Lock] = {}
+        self._reconstruidas: dict[tuple[str, str], float] = {}
+
+    def _residente(self, chave: tuple[str, str, str]) -> AssistantKnowledgeBase | None:
+        with self._lock:
+            item = self._bases.get(chave)
+            if item is None:
+                return None
+            self._bases.move_to_end(chave)
+            return item[0]
+
+    def obter(
+        self, base_dir: str | None = None, reconstruir: bool = False, encoder: str | None = None
+    ) -> AssistantKnowledgeBase:
+        base_path = Path(base_dir) if base_dir else BASE_DIR
+        selecionado = _resolver_encoder(encoder)
+        chave = self._chave(base_path, selecionado)
+        if not reconstruir and (kb := self._residente(chave)) is not None:
+            return kb
+
+        pedido = time.monotonic()
+        dataset_encoder = (chave[0], chave[2])
+        with self._lock:
+            trava = self._construindo.setdefault(dataset_encoder, threading.Lock())
+        with trava:  # uma construção por dataset e encoder; quem chega depois reaproveita o resultado
+            if reconstruir and self._reconstruidas.get(dataset_encoder, 0.0) > pedido:
+                reconstruir = False  # outra thread reconstruiu enquanto este pedido esperava
+            chave = self._chave(base_path, selecionado)
+            if not reconstruir and (kb := self._residente(chave)) is not None:
+                return kb
+            kb = _abrir_ou_construir_base(base_path, reconstruir, selecionado)
+            chave = self._chave(base_path, selecionado)  # o ponteiro muda quando este pedido publica
+            tamanho = _estimar_bytes(kb)
+            with self._lock:
+                # Só versões anteriores desta mesma base; as de outros encoders seguem residentes.
+                for antiga in [outra for outra in self._bases if (outra[0], outra[2]) == dataset_encoder]:
+                    del self._bases[antiga]
+                self._bases[chave] = (kb, tamanho)
+                self._despejar()
+                if reconstruir:
+                    self._reconstruidas[dataset_encoder] = time.monotonic()
+        return kb
+
+    @staticmethod
+    def _chave(base_path: Path, encoder: Encoder) -> tuple[str, str, str]:
+        data_dir = base_path / "data"
+        try:
+            publicado = str(_ponteiro_pacote(data_dir, encoder).stat().st_mtime_ns)
+        except OSError:
+            publicado = "-"
+        return (str(base_path.resolve()), f"{_versao_fontes(data_dir)}:{publicado}", encoder.nome)
+
+    def _despejar(self) -> None:
+        total = sum(tamanho for _, tamanho in self._bases.values())
+        while len(self._bases) > 1 and (len(self._bases) > self.max_bases or (self.max_bytes and total > self.max_bytes)):
+            _, (_, tamanho) = self._bases.popitem(last=False)
+            total -= tamanho
+            self.despejos += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._bases.clear()
+
+    def resumo(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "base": base,
+                    "versao": versao[:12],
+                    "encoder": encoder,
+                    "documentos": len(kb.documents),
+                    "mb": tamanho / (1024 * 1024),
+                }
+                for (base, versao, encoder), (kb, tamanho) in self._bases.items()
+            ]
+
+
+REGISTRO_BASES = RegistroBases()
+
+
+def build_knowledge_base(
+    base_dir: str | None = None, reconstruir: bool = False, encoder: str | None = None
+) -> AssistantKnowledgeBase:
+    """Base de conhecimento do dataset em `base_dir`, via `REGISTRO_BASES`.
+
+    `reconstruir=True` ignora os artefatos persistidos e recalcula os embeddings.
+    `encoder` é um nome de `ENCODERS` (padrão: `ASSISTANT_ENCODER`); um índice gravado
+    com outro encoder é reconstruído.
+    """
+    return REGISTRO_BASES.obter(base_dir, reconstruir, encoder)
+
+
+TipoIntencao = Literal[
+    "partido_mais_deputados",
+    "deputado_mais_despesas",
+    "tipo_despesa_mais_declarado",
+    "proposicoes_tema",
+    "self_ask",
+]
+
+
+@dataclass(frozen=True)
+class Intencao:
+    tipo: TipoIntencao
+    confianca: float
+    subpergunta: str
+    tema: str | None = None
+
+
+# Recortes que os agregados não respondem (UF, período, comparação, explicação, um deputado
+# ou um tipo de despesa) reduzem a confiança. Siglas de UF e nomes próprios dependem da
+# caixa; as palavras, não.
+_UFS = "AC AL AP AM BA CE DF ES GO MA MT MS MG PA PB PR PE PI RJ RN RS RO RR SC SP SE TO".split()
+_QUALIFICADORES_SIGLAS = re.compile(
+    rf"\b(?:{'|'.join(_UFS)}|(?:19|20)\d{{2}})\b|\b[Dd]eputad[oa]s?\s+[A-ZÀ-Ý]\w+"
+)
+_QUALIFICADORES_ABERTOS = re.compile(
+    r"\b(?:estado|uf|m[eê]s|ano|entre|compar\w*|evolu\w*|por ?qu[eê]|como|quando)\b"
+    r"|\b(?:despesas?|gastos?)\s+com\b",
+    re.IGNORECASE,
+)
+# Radicais comuns a vários tipos de despesa ou às próprias perguntas estruturadas.
+_RADICAIS_GENERICOS = frozenset({"despes", "deputa", "parlam", "ativid", "fornec", "distri", "federa", "exceto", "especi", "presta", "empres"})
+
+
+def _radicais(texto: Any) -> set[str]:
+    """Prefixos de 6 letras dos termos longos (`passagens` e `passagem` -> `passag`)."""
+    return {termo[:6] for termo in _tokenizar(texto) if len(termo) >= 5 and not termo.isdigit()}
+
+
+def _recortes_nomeados(pergunta: str, estatisticas: EstatisticasAssistente) -> list[str]:
+    """Partidos, deputados e tipos de despesa conhecidos citados na pergunta."""
+    recortes = [sigla for sigla in _siglas_citadas(pergunta) if _normalizar_termo(sigla) in estatisticas.siglas_partidos]
+    palavras = f" {_normalizar_pergunta(pergunta)} "
+    recortes.extend(nome for nome in estatisticas.nomes_deputados if f" {nome} " in palavras)
+    recortes.extend(sorted(_radicais(pergunta) & estatisticas.termos_tipos))
+    return recortes
+
+
+def detectar_intencoes(pergunta: str, estatisticas: EstatisticasAssistente | None = None) -> list[Intencao]:
+    """Intenções da pergunta com a confiança de que os agregados a respondem.
+
+    Com `estatisticas`, citar um partido, deputado ou tipo de despesa conhecido também
+    reduz a confiança: os agregados são globais e responderiam outro recorte.
+    """
     pergunta_norm = pergunta.lower()
-    subperguntas: list[str] = []
+    superlativo = any(termo in pergunta_norm for termo in ("mais", "maior", "top", "ranking"))
+    aberta = bool(_QUALIFICADORES_SIGLAS.search(pergunta) or _QUALIFICADORES_ABERTOS.search(pergunta))
+    if not aberta and estatisticas is not None:
+        aberta = bool(_recortes_nomeados(pergunta, estatisticas))
+    penalidade = 0.3 if aberta else 0.0
+    intencoes: list[Intencao] = []
+
+    def adicionar(tipo: TipoIntencao, confianca: float, subpergunta: str, tema: str | None = None) -> None:
+        intencoes.append(Intencao(tipo, round(max(confianca - penalidade, 0.0), 2), subpergunta, tema))
 
     if "partido" in pergunta_norm and "deput" in pergunta_norm:
-        subperguntas.append("Qual partido político tem mais deputados na Câmara?")
+        adicionar("partido_mais_deputados", 0.9 if superlativo else 0.6, "Qual partido político tem mais deputados na Câmara?")
     if "mais desp" in pergunta_norm or "despesas" in pergunta_norm:
-        subperguntas.append("Qual deputado tem mais despesas na Câmara?")
+        confianca = 0.9 if "mais desp" in pergunta_norm and "deputad" in pergunta_norm else 0.5
+        adicionar("deputado_mais_despesas", confianca, "Qual deputado tem mais despesas na Câmara?")
     if "tipo de despesa" in pergunta_norm or "despesa mais" in pergunta_norm:
-        subperguntas.append("Qual é o tipo de despesa mais declarada pelos deputados?")
+        confianca = 0.9 if "tipo de despesa" in pergunta_norm and superlativo else 0.7
+        adicionar("tipo_despesa_mais_declarado", confianca, "Qual é o tipo de despesa mais declarada pelos deputados?")
     if "economia" in pergunta_norm:
-        subperguntas.append("Quais são as informações mais relevantes sobre as proposições que falam de Economia?")
+        adicionar(
+            "proposicoes_tema",
+            0.9 if "proposi" in pergunta_norm else 0.6,
+            "Quais são as informações mais relevantes sobre as proposições que falam de Economia?",
+            tema="Economia",
+        )
     if "ciência" in pergunta_norm or "tecnologia" in pergunta_norm or "inovação" in pergunta_norm:
-        subperguntas.append("Quais são as informações mais relevantes sobre as proposições que falam de Ciência, Tecnologia e Inovação?")
+        adicionar(
+            "proposicoes_tema",
+            0.9 if "proposi" in pergunta_norm else 0.6,
+            "Quais são as informações mais relevantes sobre as proposições que falam de Ciência, Tecnologia e Inovação?",
+            tema="Ciência, Tecnologia e Inovação",
+        )
     if "self-ask" in pergunta_norm or "self ask" in pergunta_norm or "técnica" in pergunta_norm:
-        subperguntas.append("Como a técnica Self-Ask funciona neste assistente da Câmara dos Deputados?")
+        adicionar(
+            "self_ask",
+            0.95 if "self" in pergunta_norm else 0.6,
+            "Como a técnica Self-Ask funciona neste assistente da Câmara dos Deputados?",
+        )
 
-    if not subperguntas:
-        subperguntas.append(pergunta.strip())
+    return list({intencao.subpergunta: intencao for intencao in intencoes}.values())
 
-    return list(dict.fromkeys(subperguntas))
 
+def decompor_pergunta(pergunta: str) -> list[str]:
+    subperguntas = [intencao.subpergunta for intencao in detectar_intencoes(pergunta)]
+    return subperguntas or [pergunta.strip()]
 
-def buscar_contexto(pergunta: str, kb: AssistantKnowledgeBase, top_k: int = 3) -> list[dict[str, Any]]:
-    query_vec = _embed_texts([pergunta], model_name=kb.embedding_model)
-    scores, indices = kb.index.search(query_vec, top_k)
-    resultados = []
-    for score, idx in zip(scores[0], indices[0]):
-        if idx < 0 or idx >= len(kb.documents):
-            continue
-        doc = kb.documents[idx]
-        resultados.append({"score": float(score), **doc})
-    return resultados
+
+def _fusao_rrf(rankings: list[list[tuple[int, float]]], k: int = RRF_K) -> list[tuple[int, float]]:
+    """Reciprocal Rank Fusion: soma 1 / (k + posição) de cada ranking."""
+    fundido: dict[int, float] = {}
+    for ranking in rankings:
+        for posicao, (doc_idx, _) in enumerate(ranking, start=1):
+            fundido[doc_idx] = fundido.get(doc_idx, 0.0) + 1.0 / (k + posicao)
+    return sorted(fundido.items(), key=lambda item: item[1], reverse=True)
+
+
+_ANOS = re.compile(r"\b((?:19|20)\d{2})\b")
+# Sigla de partido: palavra inteira em maiúsculas (PT, NOVO, UNIÃO, PCdoB) ou nome logo após
+# "partido"; palavras capitalizadas comuns ("Podemos ver...", "o Novo marco") não contam.
+_SIGLAS = re.compile(r"\b(PCdoB|[A-ZÀ-Ý]{2,13})\b(?!\s*\d)|\b[Pp]artido\s+(?:d[oa]\s+)?([A-ZÀ-Ý]\w{1,12})\b")
+
+
+def _siglas_citadas(pergunta: str) -> list[str]:
+    return [sigla or nome for sigla, nome in _SIGLAS.findall(pergunta)]
+
+
+def filtro_da_pergunta(pergunta: str, kb: AssistantKnowledgeBase | None = None) -> FiltroBusca:
+    """Deriva filtros da decomposição da pergunta: temas, anos citados e siglas de partido."""
+    intencoes = detectar_intencoes(pergunta)
+    temas: tuple[str, ...] = ()
+    # Só restringe por tema quando todas as subperguntas são sobre proposições de um tema.
+    if intencoes and all(intencao.tipo == "proposicoes_tema" and intencao.tema for intencao in intencoes):
+        temas = tuple(dict.fromkeys(intencao.tema for intencao in intencoes))
+
+    anos = sorted(int(ano) for ano in _ANOS.findall(pergunta))
+    partidos: tuple[str, ...] = ()
+    if kb is not None and kb.facetas is not None:
+        conhecidos = kb.facetas.partidos()
+        partidos = tuple(dict.fromkeys(sigla for sigla in _siglas_citadas(pergunta) if _normalizar_termo(sigla) in conhecidos))
+
+    return FiltroBusca(
+        temas=temas,
+        partidos=partidos,
+        data_inicio=f"{anos[0]}-01-01" if anos else None,
+        data_fim=f"{anos[-1]}-12-31" if anos else None,
+    )
+
+
+def _vetores_planos(index: faiss.Index) -> np.ndarray | None:
+    """Vista (sem cópia) dos vetores de um índice plano; None para outros tipos de índice."""
+    import faiss
+
+    if not isinstance(index, faiss.IndexFlat) or index.ntotal == 0:
+        return None
+    return faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+
+
+def _busca_densa_filtrada(
+    kb: AssistantKnowledgeBase, vetor: np.ndarray, permitidos: np.ndarray, candidatos: int
+) -> list[tuple[int, float]]:
+    """Busca só entre `permitidos`: custo proporcional ao subconjunto, não ao índice inteiro."""
+    candidatos = min(candidatos, len(permitidos))
+    vetores = _vetores_planos(kb.index)
+    if vetores is not None:
+        scores = vetores[permitidos] @ vetor
+        melhores = np.argpartition(-scores, candidatos - 1)[:candidatos] if candidatos < len(scores) else np.arange(len(scores))
+        melhores = melhores[np.argsort(-scores[melhores])]
+        return [(int(permitidos[i]), float(scores[i])) for i in melhores]
+
+    import faiss
+
+    parametros = faiss.SearchParameters(sel=faiss.IDSelectorBatch(permitidos))
+    scores, indices = kb.index.search(vetor[None, :], candidatos, params=parametros)
+    return [(int(idx), float(score)) for score, idx in zip(scores[0], indices[0]) if idx >= 0]
+
+
+def _selecionar_documentos(kb: AssistantKnowledgeBase, filtro: FiltroBusca | None) -> np.ndarray | None:
+    """Posições permitidas; se o filtro zerar o corpus, relaxa período e partido e depois desiste."""
+    if filtro is None or kb.facetas is None:
+        return None
+    for tentativa in (filtro, replace(filtro, partidos=(), data_inicio=None, data_fim=None)):
+        selecao = kb.facetas.selecionar(tentativa)
+        if selecao is None or len(selecao):
+            return selecao
+    return None
+
+
+def buscar_contextos(
+    perguntas: list[str],
+    kb: AssistantKnowledgeBase,
+    top_k: int = 3,
+    filtros: list[FiltroBusca | None] | None = None,
+    query_vecs: np.ndarray | None = None,
+) -> list[list[dict[str, Any]]]:
+    """Recupera o contexto de várias perguntas com um único lote de embeddings.
+
+    Sem `filtros`, cada pergunta usa `filtro_da_pergunta`. Perguntas sem filtro efetivo
+    compartilham uma busca FAISS; as filtradas pontuam só os documentos permitidos.
+    `query_vecs` (uma linha por pergunta) evita recodificar perguntas já codificadas.
+    """
+    total = len(kb.documents)
+    candidatos = min(total, max(top_k * 4, 10))
+    if candidatos <= 0 or not perguntas:
+        return [[] for _ in perguntas]
+
+    if filtros is None:
+        filtros = [filtro_da_pergunta(pergunta, kb) for pergunta in perguntas]
+    permitidos = [_selecionar_documentos(kb, filtro) for filtro in filtros]
+
+    if query_vecs is None:
+        query_vecs = _codificar(perguntas, kb.encoder, "consulta")
+    sem_filtro = [pos for pos, selecao in enumerate(permitidos) if selecao is None]
+    densos_por_pergunta: dict[int, list[tuple[int, float]]] = {}
+    if sem_filtro:
+        scores, indices = kb.index.search(query_vecs[sem_filtro], candidatos)
+        for linha, pos in enumerate(sem_filtro):
+            densos_por_pergunta[pos] = [
+                (int(idx), float(score)) for score, idx in zip(scores[linha], indices[linha]) if 0 <= idx < total
+            ]
+
+    contextos = []
+    for pos, pergunta in enumerate(perguntas):
+        selecao = permitidos[pos]
+        if selecao is None:
+            densos = densos_por_pergunta[pos]
+            lexicos = kb.lexical.buscar(pergunta, candidatos) if kb.lexical is not None else []
+        else:
+            densos = _busca_densa_filtrada(kb, query_vecs[pos], selecao, candidatos)
+            lexicos = kb.lexical.buscar(pergunta, candidatos, set(selecao.tolist())) if kb.lexical is not None else []
+
+        score_denso = dict(densos)
+        score_lexico = dict(lexicos)
+        resultados = []
+        for idx, score in _fusao_rrf([densos, lexicos])[:top_k]:
+            resultados.append(
+                {
+                    "score": score,
+                    "dense_score": score_denso.get(idx),
+                    "lexical_score": score_lexico.get(idx),
+                    **kb.documents[idx],
+                }
+            )
+        contextos.append(resultados)
+    return contextos
+
+
+def buscar_contexto(
+    pergunta: str, kb: AssistantKnowledgeBase, top_k: int = 3, filtro: FiltroBusca | None = None
+) -> list[dict[str, Any]]:
+    return buscar_contextos([pergunta], kb, top_k=top_k, filtros=None if filtro is None else [filtro])[0]
+
+
+def _mesclar_com_cotas(consultas: list[str], rankings: list[list[dict[str, Any]]], limite: int) -> list[dict[str, Any]]:
+    """Intercala os rankings (um item de cada consulta por rodada), sem repetir documentos.
+
+    Cada consulta tem ao menos `limite // len(consultas)` vagas: quando o próximo item dela já
+    foi escolhido por outra, ela avança para o seguinte em vez de perder a vez.
+    """
+    escolhidos: dict[str, dict[str, Any]] = {}
+    cursores = [0] * len(rankings)
+    while len(escolhidos) < limite:
+        avancou = False
+        for pos, ranking in enumerate(rankings):
+            while cursores[pos] < len(ranking) and ranking[cursores[pos]]["id"] in escolhidos:
+                cursores[pos] += 1
+            if cursores[pos] < len(ranking) and len(escolhidos) < limite:
+                item = ranking[cursores[pos]]
+                escolhidos[item["id"]] = {**item, "subquestion": consultas[pos]}
+                cursores[pos] += 1
+                avancou = True
+        if not avancou:
+            break
+    return list(escolhidos.values())
+
+
+def buscar_contextos_self_ask(
+    perguntas: list[str],
+    subperguntas: list[list[str]],
+    kb: AssistantKnowledgeBase,
+    top_k: int = 4,
+    vetores: dict[str, np.ndarray] | None = None,
+) -> list[list[dict[str, Any]]]:
+    """Contexto de cada pergunta a partir dela e das suas subperguntas, em uma única busca.
+
+    Todas as consultas do lote (sem repetição) vão juntas para `buscar_contextos`: um lote de
+    embeddings e uma busca FAISS. Os resultados de cada pergunta são mesclados com cota por
+    subpergunta; com várias subperguntas, o contexto cresce até uma vaga por consulta.
+    `vetores` traz embeddings já calculados (texto -> vetor); só os demais são codificados.
+    """
+    consultas_por_pergunta: list[list[tuple[str, FiltroBusca]]] = []
+    for pergunta, subs in zip(perguntas, subperguntas):
+        filtro = filtro_da_pergunta(pergunta, kb)
+        extras = [sub for sub in dict.fromkeys(subs) if sub != pergunta.strip()]
+        # Com subperguntas, o recorte por tema fica com as de tema e a pergunta original cobre
+        # as demais partes; anos e partidos citados valem para todas as consultas.
+        consultas = [(pergunta.strip(), replace(filtro, temas=()) if extras else filtro)]
+        consultas.extend((sub, replace(filtro, temas=filtro_da_pergunta(sub, kb).temas)) for sub in extras)
+        consultas_por_pergunta.append(consultas)
+
+    unicas = list(dict.fromkeys(consulta for consultas in consultas_por_pergunta for consulta in consultas))
+    profundidade = max([top_k, *(len(consultas) for consultas in consultas_por_pergunta)])
+    textos = [texto for texto, _ in unicas]
+    conhecidos = dict(vetores or {})
+    faltantes = [texto for texto in dict.fromkeys(textos) if texto not in conhecidos]
+    if faltantes:
+        conhecidos.update(zip(faltantes, _codificar(faltantes, kb.encoder, "consulta")))
+    resultados = buscar_contextos(
+        textos,
+        kb,
+        top_k=profundidade,
+        filtros=[filtro for _, filtro in unicas],
+        query_vecs=np.vstack([conhecidos[texto] for texto in textos]) if textos else None,
+    )
+    por_consulta = dict(zip(unicas, resultados))
+    return [
+        _mesclar_com_cotas(
+            [texto for texto, _ in consultas],
+            [por_consulta[consulta] for consulta in consultas],
+            max(top_k, len(consultas)),
+        )
+        for consultas in consultas_por_pergunta
+    ]
 
 
 def _sintetizar_tema_proposicoes(metadata: dict[str, Any], tema: str) -> str:
@@ -481,76 +1742,202 @@ def _sintetizar_tema_proposicoes(metadata: dict[str, Any], tema: str) -> str:
     return "\n".join(linhas)
 
 
-def _compute_top_deputado_on_demand() -> str:
-    # Tenta calcular o deputado com mais despesas a partir dos arquivos disponíveis
-    df_det = _carregar_despesas_detalhadas(DATA_DIR)
-    if not df_det.empty and {"nomeDeputado", "total_despesas"}.issubset(df_det.columns):
-        top = df_det.groupby("nomeDeputado", dropna=False)["total_despesas"].sum().sort_values(ascending=False)
-        if not top.empty:
-            nome, valor = top.index[0], float(top.iloc[0])
-            return f"O deputado com mais despesas na base detalhada é {nome} com R$ {valor:,.2f}."
+ESTATISTICAS_TOP_N = 10
+_COLUNAS_PROPOSICAO = ("id", "ementa", "tema", "dataApresentacao")
 
-    df_agg = _carregar_despesas_agregadas(DATA_DIR)
-    # tentar colunas alternativas de nome
-    nome_cols = [c for c in ("nomeDeputado", "nomeParlamentar", "nome", "deputado") if c in df_agg.columns]
-    if not df_agg.empty and nome_cols and "total_despesas" in df_agg.columns:
-        col = nome_cols[0]
-        top = df_agg.groupby(col, dropna=False)["total_despesas"].sum().sort_values(ascending=False)
-        if not top.empty:
-            nome, valor = top.index[0], float(top.iloc[0])
-            return f"O deputado com mais despesas na base disponível é {nome} com R$ {valor:,.2f}."
 
-    return "A base atual não possui o detalhamento por deputado. Para responder com precisão, gere data/despesas_deputados_detalhadas.parquet na coleta atualizada."
+@dataclass(frozen=True)
+class Ranking:
+    """Top-N de um agregado em arrays compactos (rótulos e valores em ordem decrescente)."""
 
+    rotulos: np.ndarray
+    valores: np.ndarray
 
-def _compute_proposicoes_on_demand(tema: str) -> str:
-    df = _carregar_proposicoes(DATA_DIR)
-    if df.empty:
-        return f"Para {tema}, não há proposições suficientes na base local atual."
+    @classmethod
+    def de_serie(cls, serie: pd.Series, n: int = ESTATISTICAS_TOP_N) -> "Ranking":
+        serie = serie.sort_values(ascending=False).head(n)
+        return cls(np.asarray([str(rotulo) for rotulo in serie.index], dtype=object), serie.to_numpy(dtype=np.float64))
 
-    palavras_map = {
-        "Economia": ["economia", "fiscal", "tribut", "financeir", "banc", "mercado"],
-        "Ciência, Tecnologia e Inovação": ["ciência", "tecnologia", "inovação", "software", "pesquisa", "telecom", "comput"],
-    }
-    palavras = palavras_map.get(tema, [tema.lower()])
+    @classmethod
+    def vazio(cls) -> "Ranking":
+        return cls(np.empty(0, dtype=object), np.empty(0, dtype=np.float64))
 
-    if "tema" in df.columns:
-        mask_tema = df["tema"].astype(str).str.contains(tema, case=False, na=False)
-    else:
-        mask_tema = pd.Series([False] * len(df), index=df.index)
+    def topo(self) -> tuple[str, float] | None:
+        return (self.rotulos[0], float(self.valores[0])) if len(self.rotulos) else None
 
-    if "ementa" in df.columns:
-        mask_text = df["ementa"].astype(str).str.contains("|".join(palavras), case=False, na=False, regex=True)
-    else:
-        mask_text = pd.Series([False] * len(df), index=df.index)
 
-    filtrado = df[mask_tema | mask_text].copy()
-    if filtrado.empty:
-        return f"Para {tema}, não há proposições suficientes na base local atual."
+@dataclass(frozen=True)
+class ProposicoesTema:
+    quantidade: int
+    itens: tuple[dict[str, str], ...]  # mais recentes primeiro
+
+
+@dataclass(frozen=True)
+class EstatisticasAssistente:
+    """Agregados usados pelas respostas sob demanda, calculados uma vez por versão dos dados."""
+
+    versao: str
+    partidos: Ranking
+    deputados: Ranking
+    base_deputados: str
+    tipos: Ranking
+    fornecedores: Ranking
+    total_gasto: float
+    proposicoes: dict[str, ProposicoesTema]
+    # Entidades que recortam os agregados (ver `_recortes_nomeados`), normalizadas.
+    siglas_partidos: frozenset[str] = frozenset()
+    nomes_deputados: frozenset[str] = frozenset()
+    termos_tipos: frozenset[str] = frozenset()
 
-    linhas = [f"Foram encontradas {len(filtrado)} proposições relevantes sobre {tema} na base local."]
-    linhas.append("Principais proposições encontradas:")
-    colunas = [col for col in ["id", "ementa", "tema", "dataApresentacao"] if col in filtrado.columns]
 
-    # Escolher coluna de data disponível para ordenação, se houver
-    sort_candidates = ["dataApresentacao", "data_apresentacao", "dataApresentacao_iso", "data"]
-    sort_col = next((c for c in sort_candidates if c in filtrado.columns), None)
-    if sort_col:
+def _versao_fontes(data_dir: Path) -> str:
+    partes = []
+    for nome in ARQUIVOS_FONTE:
         try:
-            filtrado[sort_col] = pd.to_datetime(filtrado[sort_col], errors="coerce")
-        except Exception:
-            pass
-        ordered = filtrado.sort_values(sort_col, ascending=False)
+            stat = (data_dir / nome).stat()
+        except FileNotFoundError:
+            partes.append(f"{nome}:-")
+            continue
+        partes.append(f"{nome}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def _proposicoes_por_tema(
+    df: pd.DataFrame, n: int = 5, indice: IndiceProposicoes | None = None
+) -> dict[str, ProposicoesTema]:
+    if df.empty:
+        return {}
+    indice = indice or IndiceProposicoes(df)
+    colunas = [coluna for coluna in _COLUNAS_PROPOSICAO if coluna in df.columns]
+    coluna_data = next((c for c in _COLUNAS_DATA_PROPOSICAO if c in df.columns), None)
+
+    por_tema: dict[str, ProposicoesTema] = {}
+    for tema, palavras in TEMAS_PALAVRAS_CHAVE.items():
+        filtrado = df.iloc[indice.linhas_tema(tema, palavras)]
+        if coluna_data:
+            datas = pd.to_datetime(filtrado[coluna_data], errors="coerce")
+            filtrado = filtrado.assign(**{coluna_data: datas}).sort_values(coluna_data, ascending=False)
+        itens = tuple(
+            {coluna: str(linha[coluna]) for coluna in colunas if not pd.isna(linha[coluna])}
+            for _, linha in filtrado.head(n).iterrows()
+        )
+        por_tema[tema] = ProposicoesTema(quantidade=int(len(filtrado)), itens=itens)
+    return por_tema
+
+
+def _construir_estatisticas(data_dir: Path, versao: str) -> EstatisticasAssistente:
+    df_deputados = _carregar_deputados(data_dir)
+    df_agregadas = _carregar_despesas_agregadas(data_dir)
+    df_detalhadas = _carregar_despesas_detalhadas(data_dir)
+    df_proposicoes, indice_proposicoes = _proposicoes_indexadas(data_dir)
+
+    partidos = Ranking.vazio()
+    if "siglaPartido" in df_deputados.columns:
+        partidos = Ranking.de_serie(df_deputados["siglaPartido"].value_counts())
+
+    deputados, base_deputados = Ranking.vazio(), ""
+    if not df_detalhadas.empty and {"nomeDeputado", "total_despesas"}.issubset(df_detalhadas.columns):
+        deputados = Ranking.de_serie(df_detalhadas.groupby("nomeDeputado", dropna=False)["total_despesas"].sum())
+        base_deputados = "detalhada"
     else:
-        ordered = filtrado
+        # tentar colunas alternativas de nome
+        nome_cols = [c for c in _COLUNAS_NOME_DEPUTADO if c in df_agregadas.columns]
+        if nome_cols and "total_despesas" in df_agregadas.columns:
+            deputados = Ranking.de_serie(df_agregadas.groupby(nome_cols[0], dropna=False)["total_despesas"].sum())
+            base_deputados = "disponível"
+
+    tipos, fornecedores, total_gasto = Ranking.vazio(), Ranking.vazio(), 0.0
+    if "total_despesas" in df_agregadas.columns:
+        total_gasto = float(df_agregadas["total_despesas"].sum())
+        if "tipoDespesa" in df_agregadas.columns:
+            tipos = Ranking.de_serie(df_agregadas.groupby("tipoDespesa", dropna=False)["total_despesas"].sum())
+        if "fornecedores" in df_agregadas.columns:
+            normalizados = df_agregadas["fornecedores"].apply(_normalizar_fornecedores)
+            fornecedores = Ranking.de_serie(df_agregadas.groupby(normalizados, dropna=False)["total_despesas"].sum())
+
+    nomes = set()
+    for df, coluna in ((df_deputados, "nome"), (df_detalhadas, "nomeDeputado"), (df_agregadas, "nomeDeputado")):
+        if coluna in df.columns:
+            nomes.update(_normalizar_pergunta(nome) for nome in df[coluna].dropna().unique())
+    tipos_despesa = set()
+    for df in (df_agregadas, df_detalhadas):
+        if "tipoDespesa" in df.columns:
+            tipos_despesa.update(df["tipoDespesa"].dropna().unique())
+
+    return EstatisticasAssistente(
+        versao=versao,
+        partidos=partidos,
+        deputados=deputados,
+        base_deputados=base_deputados,
+        tipos=tipos,
+        fornecedores=fornecedores,
+        total_gasto=total_gasto,
+        proposicoes=_proposicoes_por_tema(df_proposicoes, indice=indice_proposicoes),
+        siglas_partidos=frozenset(
+            _normalizar_termo(sigla) for sigla in df_deputados.get("siglaPartido", pd.Series(dtype=object)).dropna().unique()
+        ),
+        nomes_deputados=frozenset(nome for nome in nomes if nome.strip()),
+        termos_tipos=frozenset(termo for tipo in tipos_despesa for termo in _radicais(tipo)) - _RADICAIS_GENERICOS,
+    )
 
-    for idx, (_, row) in enumerate(ordered.head(5).iterrows(), start=1):
-        partes = []
-        for col in colunas:
-            val = row.get(col)
-            if pd.isna(val):
-                continue
-            partes.append(f"{col}: {_texto_breve(val, limite=140)}")
+
+class RepositorioEstatisticas:
+    """Guarda, por diretório de dados, as estatísticas da versão vigente dos arquivos.
+
+    A versão é conferida só com `stat`; quando muda, um novo objeto é montado por
+    completo e então substitui a referência antiga (leitores nunca veem meio-termo).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._atuais: dict[str, EstatisticasAssistente] = {}
+
+    def obter(self, data_dir: Path) -> EstatisticasAssistente:
+        chave = str(data_dir.resolve())
+        versao = _versao_fontes(data_dir)
+        atual = self._atuais.get(chave)
+        if atual is not None and atual.versao == versao:
+            return atual
+        with self._lock:
+            atual = self._atuais.get(chave)
+            if atual is None or atual.versao != versao:
+                atual = _construir_estatisticas(data_dir, versao)
+                self._atuais[chave] = atual
+        return atual
+
+
+ESTATISTICAS = RepositorioEstatisticas()
+
+
+def obter_estatisticas(data_dir: Path | None = None) -> EstatisticasAssistente:
+    return ESTATISTICAS.obter(data_dir or DATA_DIR)
+
+
+def _compute_top_deputado_on_demand(data_dir: Path | None = None) -> str:
+    estatisticas = obter_estatisticas(data_dir)
+    topo = estatisticas.deputados.topo()
+    if topo is None:
+        return "A base atual não possui o detalhamento por deputado. Para responder com precisão, gere data/despesas_deputados_detalhadas.parquet na coleta atualizada."
+    nome, valor = topo
+    return f"O deputado com mais despesas na base {estatisticas.base_deputados} é {nome} com R$ {valor:,.2f}."
+
+
+def _compute_tipo_despesa_on_demand(data_dir: Path | None = None) -> str | None:
+    topo = obter_estatisticas(data_dir).tipos.topo()
+    if topo is None:
+        return None
+    return f"O tipo de despesa mais declarado é {topo[0]}, com R$ {topo[1]:,.2f}."
+
+
+def _compute_proposicoes_on_demand(tema: str, data_dir: Path | None = None) -> str:
+    dados = obter_estatisticas(data_dir).proposicoes.get(tema)
+    if dados is None or not dados.quantidade:
+        return f"Para {tema}, não há proposições suficientes na base local atual."
+
+    linhas = [f"Foram encontradas {dados.quantidade} proposições relevantes sobre {tema} na base local."]
+    linhas.append("Principais proposições encontradas:")
+    for idx, item in enumerate(dados.itens, start=1):
+        partes = [f"{coluna}: {_texto_breve(valor, limite=140)}" for coluna, valor in item.items()]
         linhas.append(f"{idx}. " + " | ".join(partes))
 
     return "\n".join(linhas)
@@ -565,7 +1952,12 @@ def _explicar_self_ask() -> str:
     )
 
 
-def _resposta_rules_based(pergunta: str, contexto: list[dict[str, Any]], kb: AssistantKnowledgeBase) -> str:
+def _resposta_rules_based(
+    pergunta: str,
+    contexto: list[dict[str, Any]],
+    kb: AssistantKnowledgeBase,
+    data_dir: Path | None = None,
+) -> str:
     pergunta_norm = pergunta.lower()
 
     if "self-ask" in pergunta_norm or "self ask" in pergunta_norm or "técnica" in pergunta_norm:
@@ -585,22 +1977,19 @@ def _resposta_rules_based(pergunta: str, contexto: list[dict[str, Any]], kb: Ass
             if metadata.get("top_tipo"):
                 return f"O tipo de despesa mais declarado é {metadata['top_tipo']}, com R$ {metadata['top_valor']:,.2f}."
             # tentativa on-demand
-            df_agg_local = _carregar_despesas_agregadas(DATA_DIR)
-            if not df_agg_local.empty and 'tipoDespesa' in df_agg_local.columns and 'total_despesas' in df_agg_local.columns:
-                por_tipo = df_agg_local.groupby('tipoDespesa', dropna=False)['total_despesas'].sum().sort_values(ascending=False)
-                if not por_tipo.empty:
-                    top_tipo = por_tipo.index[0]
-                    return f"O tipo de despesa mais declarado é {top_tipo}, com R$ {float(por_tipo.iloc[0]):,.2f}."
+            resposta_tipo = _compute_tipo_despesa_on_demand(data_dir)
+            if resposta_tipo:
+                return resposta_tipo
         if "economia" in pergunta_norm and metadata.get("tema") == "Economia":
             if metadata.get('proposicoes'):
                 return _sintetizar_tema_proposicoes(metadata, "Economia")
             # tentar on-demand
-            return _compute_proposicoes_on_demand("Economia")
+            return _compute_proposicoes_on_demand("Economia", data_dir)
 
         if ("ciência" in pergunta_norm or "tecnologia" in pergunta_norm or "inovação" in pergunta_norm) and metadata.get("tema") == "Ciência, Tecnologia e Inovação":
             if metadata.get('proposicoes'):
                 return _sintetizar_tema_proposicoes(metadata, "Ciência, Tecnologia e Inovação")
-            return _compute_proposicoes_on_demand("Ciência, Tecnologia e Inovação")
+            return _compute_proposicoes_on_demand("Ciência, Tecnologia e Inovação", data_dir)
 
         if "despesas" in pergunta_norm and metadata.get("top_deputados"):
             top = metadata.get("top_deputados", {})
@@ -608,7 +1997,7 @@ def _resposta_rules_based(pergunta: str, contexto: list[dict[str, Any]], kb: Ass
             return f"O deputado com mais despesas na base detalhada é {deputado_top[0]} com R$ {deputado_top[1]:,.2f}."
 
     if "deputado com mais despesas" in pergunta_norm:
-        return _compute_top_deputado_on_demand()
+        return _compute_top_deputado_on_demand(data_dir)
 
     if contexto:
         return contexto[0]["text"]
@@ -616,16 +2005,242 @@ def _resposta_rules_based(pergunta: str, contexto: list[dict[str, Any]], kb: Ass
     return "Não encontrei contexto suficiente na base local para responder."
 
 
-def responder_pergunta(pergunta: str, base_dir: str | None = None) -> dict[str, Any]:
-    kb = build_knowledge_base(base_dir)
-    subperguntas = decompor_pergunta(pergunta)
-    contexto = buscar_contexto(pergunta, kb, top_k=4)
+class MetricasRotas:
+    """Contadores de latência por rota de `responder_pergunta`, compartilhados no processo."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._dados: dict[str, dict[str, float]] = {}
+
+    def registrar(self, rota: str, duracao_ms: float, ttft_ms: float | None = None) -> None:
+        ttft_ms = duracao_ms if ttft_ms is None else ttft_ms
+        with self._lock:
+            dados = self._dados.setdefault(
+                rota, {"chamadas": 0, "total_ms": 0.0, "max_ms": 0.0, "ultima_ms": 0.0, "total_ttft_ms": 0.0}
+            )
+            dados["chamadas"] += 1
+            dados["total_ms"] += duracao_ms
+            dados["max_ms"] = max(dados["max_ms"], duracao_ms)
+            dados["ultima_ms"] = duracao_ms
+            dados["total_ttft_ms"] += ttft_ms
+
+    def resumo(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                rota: {
+                    **dados,
+                    "media_ms": dados["total_ms"] / dados["chamadas"],
+                    "media_ttft_ms": dados["total_ttft_ms"] / dados["chamadas"],
+                }
+                for rota, dados in self._dados.items()
+            }
+
+
+METRICAS_ROTAS = MetricasRotas()
+
+
+class LimitadorTaxa:
+    """Espaça chamadas para no máximo `por_minuto` por minuto entre todas as threads."""
+
+    def __init__(self, por_minuto: float) -> None:
+        self.intervalo = 60.0 / por_minuto if por_minuto > 0 else 0.0
+        self._lock = threading.Lock()
+        self._proxima = 0.0
+
+    def aguardar(self) -> None:
+        if not self.intervalo:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            horario = max(agora, self._proxima)
+            self._proxima = horario + self.intervalo
+        if horario > agora:
+            time.sleep(horario - agora)
+
+
+LIMITADOR_GEMINI = LimitadorTaxa(GEMINI_MAX_CHAMADAS_POR_MINUTO)
+
+
+def _responder_intencao(intencao: Intencao, estatisticas: EstatisticasAssistente) -> tuple[str, str | None] | None:
+    """Responde uma intenção a partir do repositório de estatísticas; devolve (texto, fonte)."""
+    if intencao.tipo == "self_ask":
+        return _explicar_self_ask(), None
+
+    if intencao.tipo == "partido_mais_deputados":
+        topo = estatisticas.partidos.topo()
+        if topo is None:
+            return None
+        return f"O partido com mais deputados, na base atual, é {topo[0]} com {int(topo[1])} parlamentares.", "data/deputados.parquet"
+
+    if intencao.tipo == "deputado_mais_despesas":
+        topo = estatisticas.deputados.topo()
+        if topo is None:
+            return None
+        fonte = "data/despesas_deputados_detalhadas.parquet" if estatisticas.base_deputados == "detalhada" else "data/serie_despesas_diarias_deputados.parquet"
+        return f"O deputado com mais despesas na base {estatisticas.base_deputados} é {topo[0]} com R$ {topo[1]:,.2f}.", fonte
+
+    if intencao.tipo == "tipo_despesa_mais_declarado":
+        topo = estatisticas.tipos.topo()
+        if topo is None:
+            return None
+        return f"O tipo de despesa mais declarado é {topo[0]}, com R$ {topo[1]:,.2f}.", "data/serie_despesas_diarias_deputados.parquet"
+
+    if intencao.tipo == "proposicoes_tema" and intencao.tema:
+        dados = estatisticas.proposicoes.get(intencao.tema)
+        if dados is None or not dados.itens:
+            return None
+        metadata = {"quantidade": dados.quantidade, "proposicoes": list(dados.itens)}
+        return _sintetizar_tema_proposicoes(metadata, intencao.tema), "data/proposicoes_deputados.parquet"
+
+    return None
+
+
+def _responder_estruturado(
+    intencoes: list[Intencao], estatisticas: EstatisticasAssistente
+) -> tuple[str, list[dict[str, Any]]] | None:
+    respostas: list[str] = []
+    contexto: list[dict[str, Any]] = []
+    for intencao in intencoes:
+        resposta = _responder_intencao(intencao, estatisticas)
+        if resposta is None:
+            return None
+        texto, fonte = resposta
+        respostas.append(texto)
+        if fonte is not None:
+            contexto.append(
+                {
+                    "score": intencao.confianca,
+                    "id": f"estatisticas_{intencao.tipo}",
+                    "title": intencao.subpergunta,
+                    "text": texto,
+                    "source": fonte,
+                    "metadata": {"intencao": intencao.tipo, "tema": intencao.tema},
+                }
+            )
+    return "\n\n".join(respostas), contexto
+
+
+def _versao_dados(base_path: Path) -> str:
+    """Impressão digital barata (tamanho + mtime) das fontes, do encoder e do pacote servido.
+
+    As fontes podem mudar antes de o índice ser republicado: o nome do pacote apontado por
+    `atual_<encoder>.json` separa as respostas dadas com o pacote antigo das do novo.
+    Uma reconstrução forçada limpa o cache à parte.
+    """
+    encoder = _resolver_encoder()
+    ponteiro = _read_json(_ponteiro_pacote(base_path / "data", encoder), None)
+    partes = [
+        str(ASSISTANT_SCHEMA_VERSION),
+        encoder.assinatura,
+        EMBEDDING_BACKEND,
+        _versao_fontes(base_path / "data"),
+        str(ponteiro.get("pacote", "")) if isinstance(ponteiro, dict) else "",
+    ]
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def _normalizar_pergunta(pergunta: str) -> str:
+    return " ".join(re.findall(r"\w+", _normalizar_termo(pergunta)))
+
+
+@st.cache_resource(show_spinner=False)
+def _cache_respostas(base_dir: str) -> CacheRespostas:
+    # Um cache por base de dados, compartilhado por todas as sessões do processo.
+    return CacheRespostas(
+        Path(base_dir) / "data" / ANSWER_CACHE_FILENAME,
+        max_itens=ANSWER_CACHE_MAX_ITEMS,
+        ttl_segundos=ANSWER_CACHE_TTL_SECONDS,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _cache_semantico(base_dir: str, limiar: float) -> CacheSemantico:
+    return CacheSemantico(max_itens=SEMANTIC_CACHE_MAX_ITEMS, limiar=limiar, ttl_segundos=ANSWER_CACHE_TTL_SECONDS)
+
+
+def _cache_semantico_ativo(base_dir: str, encoder: Encoder | None = None) -> CacheSemantico | None:
+    """Cache semântico do dataset, ou None se desligado (tamanho 0 ou encoder sem limiar)."""
+    limiar = SEMANTIC_CACHE_THRESHOLD or (encoder or _resolver_encoder()).limiar_semantico
+    if SEMANTIC_CACHE_MAX_ITEMS <= 0 or limiar is None:
+        return None
+    return _cache_semantico(base_dir, limiar)
+
+
+def _grupo_semantico(pergunta: str, kb: AssistantKnowledgeBase, estatisticas: EstatisticasAssistente) -> str:
+    """Perguntas só são quase duplicatas com os mesmos filtros e as mesmas entidades citadas.
+
+    Mean pooling deixa "gastos da deputada Ana" e "gastos do deputado Bruno" quase idênticos;
+    partidos, deputados, tipos de despesa, UFs e anos entram no grupo para nunca se misturarem.
+    """
+    entidades = {_normalizar_termo(trecho) for trecho in _QUALIFICADORES_SIGLAS.findall(pergunta)}
+    entidades.update(_normalizar_termo(recorte) for recorte in _recortes_nomeados(pergunta, estatisticas))
+    return f"{filtro_da_pergunta(pergunta, kb)!r}|{','.join(sorted(entidades))}"
+
+
+def _sem_metricas(resultado: dict[str, Any]) -> dict[str, Any]:
+    return {chave: valor for chave, valor in resultado.items() if chave not in ("route", "latency_ms", "ttft_ms")}
+
+
+def _finalizar(resultado: dict[str, Any], rota: str, inicio: float, primeiro_trecho: float | None = None) -> dict[str, Any]:
+    """Anota rota, latência total e tempo até o primeiro trecho da resposta (TTFT)."""
+    fim = time.perf_counter()
+    duracao_ms = (fim - inicio) * 1000
+    ttft_ms = ((primeiro_trecho or fim) - inicio) * 1000
+    METRICAS_ROTAS.registrar(rota, duracao_ms, ttft_ms)
+    resultado["route"] = rota
+    resultado["latency_ms"] = duracao_ms
+    resultado["ttft_ms"] = ttft_ms
+    return resultado
+
+
+def _modo_geracao() -> tuple[str, Any, str | None]:
+    api_key = os.getenv("GOOGLE_API_KEY")
+    genai = _carregar_genai() if api_key else None
+    modo = "gemini" if api_key and genai is not None else "regras"
+    return modo, genai, api_key
+
+
+def _resposta_sem_recuperacao(
+    pergunta: str,
+    base_path: Path,
+    chave: str,
+    versao: str,
+    cache: CacheRespostas | None,
+    inicio: float,
+) -> dict[str, Any] | None:
+    """Rotas que dispensam o encoder: estruturada (agregados) e cache de respostas."""
+    estatisticas = obter_estatisticas(base_path / "data")
+    intencoes = detectar_intencoes(pergunta, estatisticas)
+
+    # Rota estruturada: perguntas reconhecidas com alta confiança saem dos agregados.
+    if intencoes and all(intencao.confianca >= LIMIAR_CONFIANCA_ROTA for intencao in intencoes):
+        estruturada = _responder_estruturado(intencoes, estatisticas)
+        if estruturada is not None:
+            answer, contexto = estruturada
+            resultado = {
+                "question": pergunta,
+                "subquestions": [intencao.subpergunta for intencao in intencoes],
+                "answer": answer,
+                "context": contexto,
+                "prompt": "",
+                "cached": False,
+            }
+            return _finalizar(resultado, "estruturada", inicio)
+
+    if cache is not None:
+        em_cache = cache.obter(chave, versao)
+        if em_cache is not None:
+            return _finalizar({**em_cache, "question": pergunta, "cached": True}, "cache", inicio)
+    return None
+
+
+def _montar_prompt(pergunta: str, subperguntas: list[str], contexto: list[dict[str, Any]]) -> str:
     contexto_texto = "\n\n".join(
         f"[{idx + 1}] {item['title']} | fonte: {item['source']} | score: {item['score']:.3f}\n{item['text']}"
         for idx, item in enumerate(contexto)
     )
 
-    prompt = f"""
+    return f"""
 Você é um assistente analítico sobre a Câmara dos Deputados.
 
 Use a técnica Self-Ask de forma interna:
@@ -641,25 +2256,307 @@ Contexto recuperado:
 {contexto_texto}
 """.strip()
 
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if api_key and genai is not None:
+
+def _trechos_gemini(response: Iterable[Any]) -> Iterable[str]:
+    for trecho in response:
         try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel("gemini-1.5-flash")
+            texto = trecho.text
+        except ValueError:  # trecho sem texto (ex.: candidato bloqueado)
+            continue
+        if texto:
+            yield texto
+
+
+def _gerar_resposta(
+    pergunta: str,
+    contexto: list[dict[str, Any]],
+    prompt: str,
+    kb: AssistantKnowledgeBase,
+    data_dir: Path,
+    modo: str,
+    genai: Any,
+    api_key: str | None,
+    ao_trecho: Callable[[str], None] | None = None,
+) -> tuple[str, bool, float | None]:
+    """Devolve (resposta, cacheável, instante do primeiro trecho).
+
+    Com `ao_trecho`, o Gemini é chamado em modo streaming e cada trecho recebido é
+    repassado com o texto acumulado até ali.
+    """
+    if modo != "gemini":
+        return _resposta_rules_based(pergunta, contexto, kb, data_dir), True, None
+
+    # Respostas de contingência por falha transitória do Gemini não entram no cache.
+    primeiro_trecho = None
+    try:
+        LIMITADOR_GEMINI.aguardar()
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(GEMINI_MODEL)
+        if ao_trecho is None:
             response = model.generate_content(prompt)
-            answer = getattr(response, "text", None) or _resposta_rules_based(pergunta, contexto, kb)
-        except Exception:
-            answer = _resposta_rules_based(pergunta, contexto, kb)
-    else:
-        answer = _resposta_rules_based(pergunta, contexto, kb)
+            answer = getattr(response, "text", None)
+        else:
+            partes: list[str] = []
+            for texto in _trechos_gemini(model.generate_content(prompt, stream=True)):
+                if primeiro_trecho is None:
+                    primeiro_trecho = time.perf_counter()
+                partes.append(texto)
+                ao_trecho("".join(partes))
+            answer = "".join(partes)
+        return answer or _resposta_rules_based(pergunta, contexto, kb, data_dir), True, primeiro_trecho
+    except Exception:
+        return _resposta_rules_based(pergunta, contexto, kb, data_dir), False, None
+
+
+def responder_pergunta(
+    pergunta: str,
+    base_dir: str | None = None,
+    usar_cache: bool = True,
+    ao_contexto: Callable[[list[str], list[dict[str, Any]]], None] | None = None,
+    ao_trecho: Callable[[str], None] | None = None,
+) -> dict[str, Any]:
+    """Responde uma pergunta pela rota mais barata disponível.
+
+    `ao_contexto(subperguntas, contexto)` é chamado logo após a busca, antes da geração;
+    `ao_trecho(texto_parcial)` recebe a resposta do Gemini à medida que é gerada.
+    """
+    inicio = time.perf_counter()
+    base_path = Path(base_dir) if base_dir else BASE_DIR
+    modo, genai, api_key = _modo_geracao()
 
-    return {
+    cache = _cache_respostas(str(base_path))
+    versao = _versao_dados(base_path)
+    chave = f"{modo}|{_normalizar_pergunta(pergunta)}"
+    rapida = _resposta_sem_recuperacao(pergunta, base_path, chave, versao, cache if usar_cache else None, inicio)
+    if rapida is not None:
+        return rapida
+
+    kb = build_knowledge_base(base_dir)
+    # O embedding da pergunta serve ao cache semântico e, numa falta, à própria busca.
+    vetor = _codificar([pergunta.strip()], kb.encoder, "consulta")[0]
+    semantico = _cache_semantico_ativo(str(base_path), kb.encoder) if usar_cache else None
+    grupo = _grupo_semantico(pergunta, kb, obter_estatisticas(base_path / "data"))
+    if semantico is not None and (similar := semantico.obter(vetor, f"{modo}|{versao}", grupo)) is not None:
+        resposta, original, similaridade = similar
+        resultado = {**resposta, "question": pergunta, "cached": True, "similar_to": original, "similarity": similaridade}
+        return _finalizar(resultado, "cache_semantico", inicio)
+
+    subperguntas = decompor_pergunta(pergunta)
+    contexto = buscar_contextos_self_ask([pergunta], [subperguntas], kb, top_k=4, vetores={pergunta.strip(): vetor})[0]
+    if ao_contexto is not None:
+        ao_contexto(subperguntas, contexto)
+    prompt = _montar_prompt(pergunta, subperguntas, contexto)
+    answer, cacheavel, primeiro_trecho = _gerar_resposta(
+        pergunta, contexto, prompt, kb, base_path / "data", modo, genai, api_key, ao_trecho
+    )
+
+    resultado = {
         "question": pergunta,
         "subquestions": subperguntas,
         "answer": answer,
         "context": contexto,
         "prompt": prompt,
+        "cached": False,
     }
+    if usar_cache and cacheavel:
+        # Cópias: `_finalizar` anota métricas no dicionário devolvido ao chamador.
+        cache.guardar(chave, versao, _sem_metricas(resultado))
+        if semantico is not None:
+            semantico.guardar_varios([(pergunta.strip(), vetor, grupo, _sem_metricas(resultado))], f"{modo}|{versao}")
+    return _finalizar(resultado, "recuperacao", inicio, primeiro_trecho)
+
+
+def responder_perguntas(
+    perguntas: list[str],
+    base_dir: str | None = None,
+    usar_cache: bool = True,
+    concurrency: int = 4,
+) -> list[dict[str, Any]]:
+    """Responde um lote de perguntas, na ordem de entrada.
+
+    Rotas estruturada e de cache (exato e, já com os embeddings do lote, semântico) são
+    resolvidas primeiro; as demais (com suas subperguntas)
+    compartilham um único lote de embeddings e uma busca FAISS, e as chamadas ao Gemini rodam em até
+    `concurrency` threads sob o `LIMITADOR_GEMINI`. `latency_ms` de cada item conta desde
+    o início do lote.
+    """
+    inicio = time.perf_counter()
+    base_path = Path(base_dir) if base_dir else BASE_DIR
+    modo, genai, api_key = _modo_geracao()
+
+    cache = _cache_respostas(str(base_path))
+    versao = _versao_dados(base_path)
+    chaves = [f"{modo}|{_normalizar_pergunta(pergunta)}" for pergunta in perguntas]
+    resultados: list[dict[str, Any] | None] = [
+        _resposta_sem_recuperacao(pergunta, base_path, chave, versao, cache if usar_cache else None, inicio)
+        for pergunta, chave in zip(perguntas, chaves)
+    ]
+
+    pendentes = [pos for pos, resultado in enumerate(resultados) if resultado is None]
+    if not pendentes:
+        return resultados
+
+    kb = build_knowledge_base(base_dir)
+    textos = list(dict.fromkeys(perguntas[pos].strip() for pos in pendentes))
+    vetores = dict(zip(textos, _codificar(textos, kb.encoder, "consulta")))
+    semantico = _cache_semantico_ativo(str(base_path), kb.encoder) if usar_cache else None
+    versao_semantica = f"{modo}|{versao}"
+    estatisticas = obter_estatisticas(base_path / "data")
+    grupos = {pos: _grupo_semantico(perguntas[pos], kb, estatisticas) for pos in pendentes}
+    if semantico is not None:
+        for pos in pendentes:
+            similar = semantico.obter(vetores[perguntas[pos].strip()], versao_semantica, grupos[pos])
+            if similar is not None:
+                resposta, original, similaridade = similar
+                resultado = {
+                    **resposta,
+                    "question": perguntas[pos],
+                    "cached": True,
+                    "similar_to": original,
+                    "similarity": similaridade,
+                }
+                resultados[pos] = _finalizar(resultado, "cache_semantico", inicio)
+        pendentes = [pos for pos in pendentes if resultados[pos] is None]
+        if not pendentes:
+            return resultados
+
+    subperguntas_por_pos = {pos: decompor_pergunta(perguntas[pos]) for pos in pendentes}
+    contextos = buscar_contextos_self_ask(
+        [perguntas[pos] for pos in pendentes],
+        [subperguntas_por_pos[pos] for pos in pendentes],
+        kb,
+        top_k=4,
+        vetores=vetores,
+    )
+    data_dir = base_path / "data"
+
+    def _responder(pos: int, contexto: list[dict[str, Any]]) -> tuple[dict[str, Any], bool]:
+        pergunta = perguntas[pos]
+        subperguntas = subperguntas_por_pos[pos]
+        prompt = _montar_prompt(pergunta, subperguntas, contexto)
+        answer, cacheavel, _ = _gerar_resposta(pergunta, contexto, prompt, kb, data_dir, modo, genai, api_key)
+        resultado = {
+            "question": pergunta,
+            "subquestions": subperguntas,
+            "answer": answer,
+            "context": contexto,
+            "prompt": prompt,
+            "cached": False,
+        }
+        return _finalizar(resultado, "recuperacao", inicio), cacheavel
+
+    if modo == "gemini" and concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            gerados = list(executor.map(_responder, pendentes, contextos))
+    else:
+        gerados = [_responder(pos, contexto) for pos, contexto in zip(pendentes, contextos)]
+
+    novos = []
+    for pos, (resultado, cacheavel) in zip(pendentes, gerados):
+        resultados[pos] = resultado
+        if cacheavel:
+            novos.append((pos, _sem_metricas(resultado)))
+    if usar_cache and novos:
+        cache.guardar_varios([(chaves[pos], resposta) for pos, resposta in novos], versao)
+        if semantico is not None:
+            semantico.guardar_varios(
+                [(perguntas[pos].strip(), vetores[perguntas[pos].strip()], grupos[pos], resposta) for pos, resposta in novos],
+                versao_semantica,
+            )
+    return resultados
+
+
+# Lote fictício do aquecimento: comprimentos diferentes exercitam mais de uma forma de entrada.
+_PERGUNTAS_AQUECIMENTO = (
+    "Economia",
+    "Quais proposições sobre reforma tributária e política fiscal tramitam na Câmara dos Deputados?",
+)
+
+
+def aquecer_assistente(base_dir: str | None = None) -> float:
+    """Abre a base, carrega tokenizer e modelo e roda um lote fictício; devolve os segundos gastos.
+
+    A primeira passada do encoder inicializa kernels e aloca buffers; feita aqui, a primeira
+    pergunta real já encontra a latência de regime.
+    """
+    inicio = time.perf_counter()
+    base_path = Path(base_dir) if base_dir else BASE_DIR
+    kb = build_knowledge_base(base_dir)
+    buscar_contextos(list(_PERGUNTAS_AQUECIMENTO), kb)  # encoder, FAISS, BM25 e facetas
+    obter_estatisticas(base_path / "data")
+    _cache_respostas(str(base_path))
+    _carregar_genai()
+    return time.perf_counter() - inicio
+
+
+class AquecimentoAssistente:
+    """Executa `aquecer_assistente` uma vez por processo, em uma thread de fundo."""
+
+    def __init__(self) -> None:
+        self.estado: Literal["pendente", "aquecendo", "pronto", "sem_indice", "erro"] = "pendente"
+        self.erro: str | None = None
+        self.duracao_s: float | None = None
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def iniciar(self, base_dir: str | None = None) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.estado = "aquecendo"
+            self._thread = threading.Thread(
+                target=self._executar, args=(base_dir,), name="assistente-aquecimento", daemon=True
+            )
+            self._thread.start()
+
+    def _executar(self, base_dir: str | None) -> None:
+        inicio = time.perf_counter()
+        try:
+            aquecer_assistente(base_dir)
+        except FileNotFoundError as exc:  # sem pacote publicado: perguntar não resolve
+            self.erro = str(exc)
+            self.estado = "sem_indice"
+        except Exception as exc:  # a primeira pergunta ainda carrega tudo sob demanda
+            self.erro = str(exc)
+            self.estado = "erro"
+        else:
+            self.estado = "pronto"
+        finally:
+            self.duracao_s = time.perf_counter() - inicio
+
+    def aguardar(self, timeout: float | None = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.estado == "pronto"
+
+
+AQUECIMENTO = AquecimentoAssistente()
+
+
+def iniciar_aquecimento(base_dir: str | None = None) -> None:
+    """Dispara o aquecimento em segundo plano (idempotente); no modo serviço não há o que aquecer."""
+    if not ASSISTANT_SERVICE_URL:
+        AQUECIMENTO.iniciar(base_dir)
+
+
+def _mostrar_aquecimento(base_dir: str | None = None) -> None:
+    if _servindo_indice_legado(Path(base_dir) if base_dir else BASE_DIR, _resolver_encoder()):
+        st.info(
+            "Usando o índice legado de `data/assistente_faiss.index`, anterior aos dados atuais; rode "
+            "`python offline/dataprep.py --somente-indice` para publicar o índice atualizado."
+        )
+    if AQUECIMENTO.estado == "aquecendo":
+        st.info("Carregando modelo e índice em segundo plano; a primeira resposta aguarda o fim do aquecimento.")
+    elif AQUECIMENTO.estado == "pronto":
+        st.caption(f"Modelo e índice prontos (aquecidos em {AQUECIMENTO.duracao_s:.1f} s).")
+    elif AQUECIMENTO.estado == "sem_indice":
+        st.warning(
+            "Nenhum índice do assistente publicado para este dataset e encoder: rode "
+            "`python offline/dataprep.py --somente-indice` e recarregue a página."
+        )
+        st.caption(AQUECIMENTO.erro)
+    elif AQUECIMENTO.estado == "erro":
+        st.warning(f"O aquecimento falhou ({AQUECIMENTO.erro}); o modelo será carregado na primeira pergunta.")
 
 
 def render_assistant_tab(base_dir: str | None = None, show_title: bool = True, key_prefix: str = "assistant") -> None:
@@ -669,17 +2566,25 @@ def render_assistant_tab(base_dir: str | None = None, show_title: bool = True, k
         st.subheader("🤖 Assistente Legislativo")
 
     st.caption(
-        "Busca semântica com FAISS e embeddings do modelo neuralmind/bert-base-portuguese-cased. "
+        f"Busca semântica com FAISS e embeddings do modelo {_resolver_encoder().modelo}. "
         "A resposta final usa a técnica Self-Ask."
     )
 
     with st.expander("Como o Self-Ask é aplicado neste contexto?"):
         st.write(_explicar_self_ask())
 
-    if st.button("Recriar índice FAISS", type="secondary", key=f"{key_prefix}_rebuild"):
-        build_knowledge_base.clear()
-        build_knowledge_base(base_dir)
-        st.success("Índice reconstruído com sucesso.")
+    # Com ASSISTANT_SERVICE_URL, modelo e índice vivem no serviço (online/assistant_service.py)
+    # e este processo só faz chamadas HTTP; a resposta chega inteira, sem streaming.
+    remoto = bool(ASSISTANT_SERVICE_URL)
+    if not remoto:
+        _mostrar_aquecimento(base_dir)
+
+    # Os embeddings nunca são recalculados aqui: um pacote publicado offline é aberto na próxima
+    # pergunta e invalida os caches de respostas, sem reiniciar o dashboard.
+    st.caption(
+        "Para atualizar o índice com dados novos, rode `python offline/dataprep.py --somente-indice`; "
+        "o pacote publicado passa a ser usado na próxima pergunta."
+    )
 
     pergunta = st.text_area(
         "Digite sua pergunta",
@@ -693,21 +2598,85 @@ def render_assistant_tab(base_dir: str | None = None, show_title: bool = True, k
             st.warning("Digite uma pergunta para continuar.")
             return
 
-        resultado = responder_pergunta(pergunta, base_dir)
-
         st.subheader("Resposta")
-        st.write(resultado["answer"])
-
-        st.subheader("Subperguntas")
-        for item in resultado["subquestions"]:
-            st.markdown(f"- {item}")
-
-        st.subheader("Contexto recuperado")
-        if resultado["context"]:
-            for item in resultado["context"]:
-                with st.container():
-                    st.markdown(f"**{item['title']}**")
-                    st.caption(f"Fonte: {item['source']} | Score: {item['score']:.3f}")
-                    st.write(item["text"])
+        area_resposta = st.empty()
+        area_rota = st.container()
+        area_contexto = st.container()
+
+        def _mostrar_contexto(subperguntas: list[str], contexto: list[dict[str, Any]]) -> None:
+            with area_contexto:
+                st.subheader("Subperguntas")
+                for item in subperguntas:
+                    st.markdown(f"- {item}")
+
+                st.subheader("Contexto recuperado")
+                if contexto:
+                    for item in contexto:
+                        with st.container():
+                            st.markdown(f"**{item['title']}**")
+                            st.caption(f"Fonte: {item['source']} | Score: {item['score']:.3f}")
+                            st.write(item["text"])
+                else:
+                    st.info("Nenhum contexto recuperado.")
+
+        # O contexto aparece assim que a busca termina; a resposta é desenhada trecho a trecho.
+        contexto_exibido: list[bool] = []
+
+        def _ao_contexto(subperguntas: list[str], contexto: list[dict[str, Any]]) -> None:
+            contexto_exibido.append(True)
+            _mostrar_contexto(subperguntas, contexto)
+            area_resposta.info("Gerando resposta...")
+
+        if remoto:
+            try:
+                with st.spinner("Consultando o serviço do assistente..."):
+                    resultado = chamar_servico("/responder", {"question": pergunta})
+            except ErroServicoAssistente as exc:
+                area_resposta.error(str(exc))
+                return
         else:
-            st.info("Nenhum contexto recuperado.")
+            try:
+                resultado = responder_pergunta(
+                    pergunta,
+                    base_dir,
+                    ao_contexto=_ao_contexto,
+                    ao_trecho=lambda parcial: area_resposta.markdown(parcial + " ▌"),
+                )
+            except FileNotFoundError as exc:  # nenhum índice publicado para o encoder ativo
+                area_resposta.error(str(exc))
+                return
+
+        area_resposta.write(resultado["answer"])
+        with area_rota:
+            if resultado.get("similar_to"):
+                st.caption(
+                    f"⚡ Resposta reaproveitada de uma pergunta semelhante: “{resultado['similar_to']}”"
+                    f" (similaridade {resultado['similarity']:.3f})."
+                )
+            elif resultado.get("cached"):
+                st.caption("⚡ Resposta servida do cache (dados e índice inalterados).")
+            st.caption(
+                f"Rota: {resultado['route']} | primeiro trecho: {resultado['ttft_ms']:.1f} ms"
+                f" | total: {resultado['latency_ms']:.1f} ms"
+            )
+        if not contexto_exibido:
+            _mostrar_contexto(resultado["subquestions"], resultado["context"])
+
+        with st.expander("Latência por rota"):
+            try:
+                if remoto:
+                    metricas = chamar_servico("/metricas")
+                    resumo, semantico = metricas["rotas"], metricas.get("cache_semantico")
+                else:
+                    resumo = METRICAS_ROTAS.resumo()
+                    semantico = _cache_semantico_ativo(str(Path(base_dir) if base_dir else BASE_DIR))
+                    semantico = semantico.estatisticas() if semantico is not None else None
+            except ErroServicoAssistente as exc:
+                st.caption(str(exc))
+            else:
+                st.dataframe(pd.DataFrame(resumo).T.round(2), use_container_width=True)
+                if semantico:
+                    st.caption(
+                        f"Cache semântico: {semantico['itens']} perguntas, acerto de {semantico['taxa_acerto']:.0%}"
+                        f" (limiar de similaridade {semantico['limiar']:.2f})."
+                    )
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import socket
+from typing import Any
+from urllib.parse import urlsplit
+
+# Endereço do serviço de inferência (online/assistant_service.py): "http://host:porta" ou
+# "unix:///caminho/do.sock". Vazio = o dashboard carrega modelo e índice no próprio processo.
+ASSISTANT_SERVICE_URL = os.getenv("ASSISTANT_SERVICE_URL", "").strip()
+ASSISTANT_SERVICE_TIMEOUT = float(os.getenv("ASSISTANT_SERVICE_TIMEOUT", "300") or 300)
+
+
+class ErroServicoAssistente(RuntimeError):
+    pass
+
+
+class _ConexaoUnix(http.client.HTTPConnection):
+    def __init__(self, caminho: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.caminho = caminho
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.caminho)
+
+
+def _conexao(url: str, timeout: float) -> http.client.HTTPConnection:
+    partes = urlsplit(url)
+    if partes.scheme == "unix":
+        return _ConexaoUnix(partes.path, timeout)
+    if partes.scheme == "http":
+        return http.client.HTTPConnection(partes.hostname or "127.0.0.1", partes.port or 80, timeout=timeout)
+    raise ErroServicoAssistente(f"Esquema não suportado em ASSISTANT_SERVICE_URL: {url}")
+
+
+def chamar_servico(
+    caminho: str,
+    corpo: dict[str, Any] | None = None,
+    url: str | None = None,
+    timeout: float = ASSISTANT_SERVICE_TIMEOUT,
+) -> Any:
+    """GET (sem corpo) ou POST JSON em `caminho` do serviço; devolve o JSON de resposta."""
+    conexao = _conexao(url or ASSISTANT_SERVICE_URL, timeout)
+    try:
+        if corpo is None:
+            conexao.request("GET", caminho)
+        else:
+            dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+            conexao.request("POST", caminho, body=dados, headers={"Content-Type": "application/json"})
+        resposta = conexao.getresponse()
+        conteudo = json.loads(resposta.read().decode("utf-8") or "null")
+    except (OSError, ValueError) as exc:
+        raise ErroServicoAssistente(f"Falha ao acessar o serviço do assistente: {exc}") from exc
+    finally:
+        conexao.close()
+
+    if resposta.status != 200:
+        erro = conteudo.get("erro") if isinstance(conteudo, dict) else conteudo
+        raise ErroServicoAssistente(f"Serviço do assistente respondeu {resposta.status}: {erro}")
+    return conteudo
@@ -0,0 +1,243 @@
+"""Serviço local de inferência do assistente legislativo.
+
+Carrega o encoder e o índice FAISS uma única vez e atende por HTTP ou socket Unix.
+Perguntas que chegam juntas são agrupadas em micro-lotes (uma janela curta de espera)
+e respondidas por `responder_perguntas` em um pool de workers, de modo que vários
+processos do dashboard compartilham o mesmo modelo em memória.
+
+Uso (a partir da raiz do projeto):
+    python online/assistant_service.py --porta 8765 --workers 2
+    python online/assistant_service.py --socket /tmp/assistente.sock
+
+No dashboard: ASSISTANT_SERVICE_URL=http://127.0.0.1:8765 (ou unix:///tmp/assistente.sock).
+
+Rotas:
+    GET  /saude              estado e contadores de micro-lotes
+    GET  /metricas           latência por rota (METRICAS_ROTAS), cache semântico e micro-lotes
+    POST /responder          {"question": "...", "use_cache": true}
+    POST /responder_lote     {"questions": ["...", ...], "use_cache": true}
+
+O serviço só abre o pacote publicado por `offline/dataprep.py --somente-indice`; um pacote
+novo é aberto na próxima pergunta, sem reiniciar o processo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Any
+
+try:
+    from .assistant import (
+        BASE_DIR,
+        METRICAS_ROTAS,
+        REGISTRO_BASES,
+        _cache_semantico_ativo,
+        aquecer_assistente,
+        responder_perguntas,
+    )
+except ImportError:  # executado como script: python online/assistant_service.py
+    from assistant import (
+        BASE_DIR,
+        METRICAS_ROTAS,
+        REGISTRO_BASES,
+        _cache_semantico_ativo,
+        aquecer_assistente,
+        responder_perguntas,
+    )
+
+
+class MicroLoteador:
+    """Agrupa perguntas concorrentes em lotes e os executa em um pool de workers.
+
+    O despachante espera a primeira pergunta e então até `janela_ms` por outras, até
+    `max_lote`; cada lote vira uma chamada a `responder_perguntas`.
+    """
+
+    def __init__(self, base_dir: str | None, workers: int = 2, janela_ms: float = 10.0, max_lote: int = 32) -> None:
+        self.base_dir = base_dir
+        self.janela = janela_ms / 1000
+        self.max_lote = max_lote
+        self.lotes = 0
+        self.perguntas = 0
+        self._lock = threading.Lock()
+        self._fila: queue.Queue[tuple[str, bool, Future]] = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assistente")
+        self._despachante = threading.Thread(target=self._despachar, name="assistente-lotes", daemon=True)
+        self._despachante.start()
+
+    def submeter(self, pergunta: str, usar_cache: bool = True) -> Future:
+        futuro: Future = Future()
+        self._fila.put((pergunta, usar_cache, futuro))
+        return futuro
+
+    def _despachar(self) -> None:
+        while True:
+            pendentes = [self._fila.get()]
+            limite = time.monotonic() + self.janela
+            while len(pendentes) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pendentes.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            for usar_cache in (True, False):
+                grupo = [item for item in pendentes if item[1] is usar_cache]
+                if grupo:
+                    self._executor.submit(self._executar, grupo, usar_cache)
+
+    def _executar(self, grupo: list[tuple[str, bool, Future]], usar_cache: bool) -> None:
+        try:
+            resultados = responder_perguntas([pergunta for pergunta, _, _ in grupo], self.base_dir, usar_cache=usar_cache)
+        except Exception as exc:
+            for _, _, futuro in grupo:
+                futuro.set_exception(exc)
+            return
+        with self._lock:
+            self.lotes += 1
+            self.perguntas += len(grupo)
+        for (_, _, futuro), resultado in zip(grupo, resultados):
+            futuro.set_result(resultado)
+
+    def estatisticas(self) -> dict[str, Any]:
+        return {
+            "lotes": self.lotes,
+            "perguntas": self.perguntas,
+            "media_por_lote": (self.perguntas / self.lotes) if self.lotes else 0.0,
+            "fila": self._fila.qsize(),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: Any
+
+    def address_string(self) -> str:
+        # Em socket Unix `client_address` é uma string vazia.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _responder_json(self, status: int, conteudo: Any) -> None:
+        corpo = json.dumps(conteudo, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _ler_json(self) -> dict[str, Any]:
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        dados = json.loads(self.rfile.read(tamanho).decode("utf-8") or "{}")
+        if not isinstance(dados, dict):
+            raise ValueError("corpo deve ser um objeto JSON")
+        return dados
+
+    def do_GET(self) -> None:  # noqa: N802
+        loteador: MicroLoteador = self.server.loteador
+        if self.path == "/saude":
+            self._responder_json(
+                200, {"status": "ok", "micro_lotes": loteador.estatisticas(), "bases": REGISTRO_BASES.resumo()}
+            )
+        elif self.path == "/metricas":
+            base_path = str(Path(loteador.base_dir) if loteador.base_dir else BASE_DIR)
+            semantico = _cache_semantico_ativo(base_path)
+            self._responder_json(
+                200,
+                {
+                    "rotas": METRICAS_ROTAS.resumo(),
+                    "cache_semantico": semantico.estatisticas() if semantico is not None else None,
+                    "micro_lotes": loteador.estatisticas(),
+                },
+            )
+        else:
+            self._responder_json(404, {"erro": f"rota desconhecida: {self.path}"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        loteador: MicroLoteador = self.server.loteador
+        try:
+            dados = self._ler_json()
+            usar_cache = bool(dados.get("use_cache", True))
+            if self.path == "/responder":
+                pergunta = str(dados.get("question") or "").strip()
+                if not pergunta:
+                    raise ValueError("campo 'question' vazio")
+                self._responder_json(200, loteador.submeter(pergunta, usar_cache).result())
+            elif self.path == "/responder_lote":
+                perguntas = [str(pergunta) for pergunta in dados.get("questions") or []]
+                futuros = [loteador.submeter(pergunta, usar_cache) for pergunta in perguntas]
+                self._responder_json(200, [futuro.result() for futuro in futuros])
+            else:
+                self._responder_json(404, {"erro": f"rota desconhecida: {self.path}"})
+        except ValueError as exc:
+            self._responder_json(400, {"erro": str(exc)})
+        except Exception as exc:
+            self._responder_json(500, {"erro": str(exc)})
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    request_queue_size = 128  # o padrão (5) recusa conexões sob rajadas de vários dashboards
+
+
+class _ServidorUnix(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def criar_servidor(
+    base_dir: str | None = None,
+    host: str = "127.0.0.1",
+    porta: int = 8765,
+    socket_unix: str | None = None,
+    workers: int = 2,
+    janela_ms: float = 10.0,
+    max_lote: int = 32,
+) -> _ServidorHTTP | _ServidorUnix:
+    """Aquece modelo e índice e devolve o servidor pronto para `serve_forever()`."""
+    aquecer_assistente(base_dir)
+    if socket_unix:
+        if os.path.exists(socket_unix):
+            os.unlink(socket_unix)
+        servidor: Any = _ServidorUnix(socket_unix, _Handler)
+    else:
+        servidor = _ServidorHTTP((host, porta), _Handler)
+    servidor.loteador = MicroLoteador(base_dir, workers=workers, janela_ms=janela_ms, max_lote=max_lote)
+    return servidor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serviço local de inferência do assistente.")
+    parser.add_argument("--base-dir", default=None, help="raiz do projeto com a pasta data/ (padrão: este projeto)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--socket", default=None, help="caminho de socket Unix (substitui host/porta)")
+    parser.add_argument("--workers", type=int, default=2, help="lotes processados em paralelo")
+    parser.add_argument("--janela-ms", type=float, default=10.0, help="espera para agrupar perguntas concorrentes")
+    parser.add_argument("--lote-max", type=int, default=32, help="perguntas por micro-lote")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(
+        args.base_dir, args.host, args.porta, args.socket, args.workers, args.janela_ms, args.lote_max
+    )
+    endereco = f"unix://{args.socket}" if args.socket else f"http://{args.host}:{args.porta}"
+    print(f"Assistente servindo em {endereco}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
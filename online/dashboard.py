@@ -24,10 +24,23 @@ from PIL import Image
 from pathlib import Path
 import plotly.express as px
 
+from data_access import (
+    CACHE_CONSULTAS_MAX_ENTRADAS,
+    CACHE_DADOS_MAX_ENTRADAS,
+    CACHE_DADOS_TTL_S,
+    COLUNAS_DESPESAS_PAINEL,
+    COLUNAS_PROPOSICOES_PAINEL,
+    PONTOS_POR_SERIE,
+    IndiceGrupos,
+    ler_parquet,
+    reduzir_series,
+    versao_arquivos,
+)
+
 try:
-    from assistant import render_assistant_tab
+    from assistant import iniciar_aquecimento, render_assistant_tab
 except Exception:
-    render_assistant_tab = None
+    iniciar_aquecimento = render_assistant_tab = None
 
 
 # ============================================================================
@@ -40,6 +53,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Carrega modelo e índice do assistente em segundo plano enquanto as outras abas são desenhadas
+# (uma vez por processo; as execuções seguintes do script não fazem nada).
+if iniciar_aquecimento is not None:
+    iniciar_aquecimento()
+
 # ============================================================================
 # ESTILOS PERSONALIZADOS
 # ============================================================================
@@ -67,11 +85,23 @@ st.markdown("""
 # ============================================================================
 # FUNÇÕES AUXILIARES COM CACHE
 # ============================================================================
-@st.cache_data
-def carregar_config():
+# Os carregadores recebem `versao_arquivos(...)` dos arquivos que leem: quando o pipeline
+# regrava um arquivo, a chave muda e só aquele conjunto de dados é relido, sem reiniciar.
+ARQUIVO_CONFIG = "data/config.yaml"
+ARQUIVO_INSIGHTS_DEPUTADOS = "data/insights_distribuicao_deputados.json"
+ARQUIVO_GRAFICO = "docs/distribuicao_deputados.png"
+ARQUIVO_DESPESAS_DETALHADAS = "data/despesas_deputados_detalhadas.parquet"
+ARQUIVO_DESPESAS_AGREGADAS = "data/serie_despesas_diarias_deputados.parquet"
+ARQUIVO_INSIGHTS_DESPESAS = "data/insights_despesas_deputados.json"
+ARQUIVO_PROPOSICOES = "data/proposicoes_deputados.parquet"
+ARQUIVO_SUMARIZACOES = "data/sumarizacao_proposicoes.json"
+
+
+@st.cache_data(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def carregar_config(versao=None):
     """Carrega configurações do arquivo config.yaml"""
     try:
-        with open("data/config.yaml", "r", encoding="utf-8") as f:
+        with open(ARQUIVO_CONFIG, "r", encoding="utf-8") as f:
             # tentamos ler como UTF-8 normal e como UTF-8-SIG (remove BOM)
             text = f.read()
         try:
@@ -96,11 +126,11 @@ def carregar_config():
         return {}
 
 
-@st.cache_data
-def carregar_insights_deputados():
+@st.cache_data(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def carregar_insights_deputados(versao=None):
     """Carrega insights sobre distribuição de deputados"""
     try:
-        with open("data/insights_distribuicao_deputados.json", "r", encoding="utf-8") as f:
+        with open(ARQUIVO_INSIGHTS_DEPUTADOS, "r", encoding="utf-8") as f:
             dados = json.load(f)
         return dados
     except FileNotFoundError:
@@ -111,11 +141,11 @@ def carregar_insights_deputados():
         return None
 
 
-@st.cache_data
-def carregar_gráfico():
+@st.cache_data(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def carregar_gráfico(versao=None):
     """Carrega a imagem do gráfico de distribuição"""
     try:
-        img = Image.open("docs/distribuicao_deputados.png")
+        img = Image.open(ARQUIVO_GRAFICO)
         return img
     except FileNotFoundError:
         st.warning("⚠️ Arquivo de gráfico não encontrado")
@@ -128,17 +158,19 @@ def carregar_gráfico():
 # ============================================================================
 # FUNÇÕES AUXILIARES - ABA DESPESAS
 # ============================================================================
-@st.cache_data
-def carregar_despesas():
+# cache_resource: o DataFrame é compartilhado (somente leitura) em vez de desserializado a cada
+# execução do script, o que custaria O(todas as linhas) a cada troca de deputado.
+@st.cache_resource(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def carregar_despesas(versao=None):
     """Carrega dados de despesas dos deputados."""
     try:
-        caminho_detalhado = Path("data/despesas_deputados_detalhadas.parquet")
-        caminho_agregado = Path("data/serie_despesas_diarias_deputados.parquet")
+        caminho_detalhado = Path(ARQUIVO_DESPESAS_DETALHADAS)
+        caminho_agregado = Path(ARQUIVO_DESPESAS_AGREGADAS)
 
         if caminho_detalhado.exists():
-            df = pd.read_parquet(caminho_detalhado)
+            df = ler_parquet(caminho_detalhado, COLUNAS_DESPESAS_PAINEL)
         else:
-            df = pd.read_parquet(caminho_agregado)
+            df = ler_parquet(caminho_agregado, COLUNAS_DESPESAS_PAINEL)
 
         if 'dataDocumento' in df.columns:
             df['dataDocumento'] = pd.to_datetime(df['dataDocumento'], errors='coerce')
@@ -151,11 +183,63 @@ def carregar_despesas():
         return None
 
 
-@st.cache_data
-def carregar_insights_despesas():
+@st.cache_resource(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def indice_despesas_por_deputado(versao, coluna, _df):
+    """Despesas ordenadas por deputado, com a lista de nomes e o intervalo de linhas de cada um."""
+    return IndiceGrupos(_df, coluna)
+
+
+@st.cache_data(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def resumir_despesas(versao, _df):
+    """Total geral, tipo de despesa mais relevante e período coberto."""
+    total_geral = float(_df['total_despesas'].sum())
+    tipo_top = "N/A"
+    if 'tipoDespesa' in _df.columns:
+        por_tipo = _df.groupby('tipoDespesa', dropna=False)['total_despesas'].sum().sort_values(ascending=False)
+        if not por_tipo.empty:
+            tipo_top = str(por_tipo.index[0])
+
+    periodo = "N/A"
+    if 'dataDocumento' in _df.columns:
+        datas_validas = _df['dataDocumento'].dropna()
+        if not datas_validas.empty:
+            periodo = f"{datas_validas.min().date()} ate {datas_validas.max().date()}"
+    return total_geral, tipo_top, periodo
+
+
+def filtrar_serie_temporal(df, chave, cor=None):
+    """Período escolhido pelo usuário + redução (LTTB) a PONTOS_POR_SERIE pontos por série.
+
+    Quanto menor o período, mais detalhe: a redução é aplicada só às linhas do intervalo.
+    "Dados exatos" envia todos os pontos ao navegador.
+    """
+    datas = df['dataDocumento'].dropna()
+    if datas.empty:
+        return df
+    inicio, fim = datas.min().date(), datas.max().date()
+    col_periodo, col_exatos = st.columns([3, 1])
+    periodo = col_periodo.date_input(
+        "Período", value=(inicio, fim), min_value=inicio, max_value=fim, key=f"{chave}_periodo"
+    )
+    exatos = col_exatos.checkbox(
+        "Dados exatos", key=f"{chave}_exatos", help="Envia todos os pontos ao gráfico (mais lento em históricos longos)."
+    )
+    if isinstance(periodo, (tuple, list)) and len(periodo) == 2:
+        fim_periodo = pd.Timestamp(periodo[1]) + pd.Timedelta(days=1)
+        df = df[(df['dataDocumento'] >= pd.Timestamp(periodo[0])) & (df['dataDocumento'] < fim_periodo)]
+    if exatos:
+        return df
+    reduzido = reduzir_series(df, 'dataDocumento', 'total_despesas', cor=cor)
+    if len(reduzido) < len(df):
+        st.caption(f"Exibindo {len(reduzido):,} de {len(df):,} pontos (até {PONTOS_POR_SERIE} por série).")
+    return reduzido
+
+
+@st.cache_data(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def carregar_insights_despesas(versao=None):
     """Carrega insights sobre despesas dos deputados."""
     try:
-        with open("data/insights_despesas_deputados.json", "r", encoding="utf-8") as f:
+        with open(ARQUIVO_INSIGHTS_DESPESAS, "r", encoding="utf-8") as f:
             data = json.load(f)
         return data.get("insights", [])
     except FileNotFoundError:
@@ -169,11 +253,27 @@ def carregar_insights_despesas():
 # ============================================================================
 # FUNÇÕES AUXILIARES - ABA PROPOSIÇÕES
 # ============================================================================
-@st.cache_data
-def carregar_proposicoes():
-    """Carrega dados de proposições legislativas."""
+@st.cache_data(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def carregar_temas_proposicoes(versao=None):
+    """Lista de temas das proposições (lê só a coluna `tema`)."""
+    try:
+        df = ler_parquet(ARQUIVO_PROPOSICOES, ("tema",))
+        return sorted(df['tema'].dropna().unique()) if 'tema' in df.columns else []
+    except FileNotFoundError:
+        st.warning("Arquivo de proposições não encontrado.")
+        return None
+    except Exception as e:
+        st.error(f"Erro ao carregar proposições: {e}")
+        return None
+
+
+@st.cache_data(max_entries=CACHE_CONSULTAS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def carregar_proposicoes(versao=None, temas=()):
+    """Carrega dados de proposições legislativas (só dos `temas` pedidos, se houver)."""
     try:
-        df = pd.read_parquet("data/proposicoes_deputados.parquet")
+        # O filtro de tema vai para o leitor Arrow: linhas de outros temas não são materializadas.
+        filtros = [('tema', 'in', list(temas))] if temas else []
+        df = ler_parquet(ARQUIVO_PROPOSICOES, COLUNAS_PROPOSICOES_PAINEL, filtros)
         # Nem sempre a coluna de data vem com o nome esperado; fazer verificação
         if 'dataApresentacao' in df.columns:
             df['dataApresentacao'] = pd.to_datetime(df['dataApresentacao'], errors='coerce')
@@ -192,11 +292,11 @@ def carregar_proposicoes():
         return None
 
 
-@st.cache_data
-def carregar_sumarizacoes():
+@st.cache_data(max_entries=CACHE_DADOS_MAX_ENTRADAS, ttl=CACHE_DADOS_TTL_S)
+def carregar_sumarizacoes(versao=None):
     """Carrega sumarizações de proposições."""
     try:
-        with open("data/sumarizacao_proposicoes.json", "r", encoding="utf-8") as f:
+        with open(ARQUIVO_SUMARIZACOES, "r", encoding="utf-8") as f:
             data = json.load(f)
         return data.get("resumos", [])
     except FileNotFoundError:
@@ -220,9 +320,9 @@ with tab1:
     st.divider()
     
     # Carregar dados
-    config = carregar_config()
-    insights = carregar_insights_deputados()
-    grafico = carregar_gráfico()
+    config = carregar_config(versao_arquivos(ARQUIVO_CONFIG))
+    insights = carregar_insights_deputados(versao_arquivos(ARQUIVO_INSIGHTS_DEPUTADOS))
+    grafico = carregar_gráfico(versao_arquivos(ARQUIVO_GRAFICO))
     
     if config:
         # Descrição do projeto
@@ -289,8 +389,9 @@ with tab2:
     st.title("💰 Análise de Despesas dos Deputados")
     
     # Carregar dados
-    df_despesas = carregar_despesas()
-    insights = carregar_insights_despesas()
+    versao_despesas = versao_arquivos(ARQUIVO_DESPESAS_DETALHADAS, ARQUIVO_DESPESAS_AGREGADAS)
+    df_despesas = carregar_despesas(versao_despesas)
+    insights = carregar_insights_despesas(versao_arquivos(ARQUIVO_INSIGHTS_DESPESAS))
     
     # Exibir insights
     if insights:
@@ -310,18 +411,7 @@ with tab2:
     
     if df_despesas is not None:
         if 'total_despesas' in df_despesas.columns and not df_despesas['total_despesas'].empty:
-            total_geral = float(df_despesas['total_despesas'].sum())
-            tipo_top = "N/A"
-            if 'tipoDespesa' in df_despesas.columns:
-                por_tipo = df_despesas.groupby('tipoDespesa', dropna=False)['total_despesas'].sum().sort_values(ascending=False)
-                if not por_tipo.empty:
-                    tipo_top = str(por_tipo.index[0])
-
-            periodo = "N/A"
-            if 'dataDocumento' in df_despesas.columns:
-                datas_validas = df_despesas['dataDocumento'].dropna()
-                if not datas_validas.empty:
-                    periodo = f"{datas_validas.min().date()} ate {datas_validas.max().date()}"
+            total_geral, tipo_top, periodo = resumir_despesas(versao_despesas, df_despesas)
 
             m1, m2, m3 = st.columns(3)
             m1.metric("Total Geral (R$)", f"{total_geral:,.2f}")
@@ -342,6 +432,7 @@ with tab2:
                     .reset_index()
                     .sort_values('dataDocumento')
                 )
+                serie_tempo = filtrar_serie_temporal(serie_tempo, "despesas_agregadas")
                 fig_tempo = px.line(
                     serie_tempo,
                     x='dataDocumento',
@@ -370,14 +461,15 @@ with tab2:
                 )
                 st.plotly_chart(fig_tipos, use_container_width=True)
         else:
-            deputados = sorted(df_despesas[coluna_deputado].dropna().astype(str).unique().tolist())
+            indice_deputados = indice_despesas_por_deputado(versao_despesas, coluna_deputado, df_despesas)
+            deputados = indice_deputados.nomes
             deputado_selecionado = st.selectbox(
                 "Selecione um deputado:",
                 deputados if deputados else ["Sem dados"],
                 key="despesas_deputado"
             )
 
-            df_deputado = df_despesas[df_despesas[coluna_deputado].astype(str) == str(deputado_selecionado)].copy()
+            df_deputado = indice_deputados.linhas(str(deputado_selecionado))
 
             if df_deputado.empty:
                 st.warning(f"Sem dados de despesas para {deputado_selecionado}")
@@ -389,6 +481,8 @@ with tab2:
                         .sum()
                         .reset_index()
                     )
+                    # Chave por deputado: o período padrão acompanha o histórico de quem foi escolhido.
+                    df_serie = filtrar_serie_temporal(df_serie, f"despesas_{deputado_selecionado}", cor='tipoDespesa')
 
                     fig = px.line(
                         df_serie,
@@ -418,24 +512,21 @@ with tab3:
     st.title("📜 Proposições Legislativas")
     
     # Carregar dados
-    df_proposicoes = carregar_proposicoes()
-    sumarizacoes = carregar_sumarizacoes()
-    
-    if df_proposicoes is not None:
-        # Filtro por tema (opcional)
-        temas_disponiveis = sorted(df_proposicoes['tema'].unique()) if 'tema' in df_proposicoes.columns else []
+    versao_proposicoes = versao_arquivos(ARQUIVO_PROPOSICOES)
+    temas_disponiveis = carregar_temas_proposicoes(versao_proposicoes)
+    sumarizacoes = carregar_sumarizacoes(versao_arquivos(ARQUIVO_SUMARIZACOES))
+
+    df_filtrado = None
+    if temas_disponiveis is not None:
+        # Filtro por tema (opcional), aplicado já na leitura do arquivo
         temas_selecionados = st.multiselect(
             "🏷️ Filtrar por tema:",
             temas_disponiveis,
             key="proposicoes_tema"
         )
-        
-        # Aplicar filtro
-        if temas_selecionados:
-            df_filtrado = df_proposicoes[df_proposicoes['tema'].isin(temas_selecionados)]
-        else:
-            df_filtrado = df_proposicoes
-        
+        df_filtrado = carregar_proposicoes(versao_proposicoes, tuple(sorted(temas_selecionados)))
+
+    if df_filtrado is not None:
         # Exibir tabela
         st.subheader("📋 Proposições")
         colunas_exibir = ['id', 'ementa', 'tema', 'dataApresentacao']
@@ -526,9 +617,9 @@ with st.sidebar:
     try:
         if Path("data/deputados.parquet").exists():
             st.success("✅ Deputados")
-        if Path("data/serie_despesas_diarias_deputados.parquet").exists():
+        if Path(ARQUIVO_DESPESAS_AGREGADAS).exists():
             st.success("✅ Despesas")
-        if Path("data/proposicoes_deputados.parquet").exists():
+        if Path(ARQUIVO_PROPOSICOES).exists():
             st.success("✅ Proposições")
     except:
         pass
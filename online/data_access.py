@@ -0,0 +1,156 @@
+"""Acesso aos arquivos de dados usados pelo dashboard e pelo assistente.
+
+Os carregadores do dashboard são cacheados pelo Streamlit; para que uma nova rodada de
+`offline/dataprep.py` apareça sem reiniciar o servidor, a chave de cada carregador inclui
+a impressão digital dos arquivos que ele lê (veja `versao_arquivos`). Cada visão declara
+as colunas de que precisa e os filtros de linha vão para o leitor Arrow (`ler_parquet`).
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Uma entrada nova por versão dos arquivos; a anterior é despejada pelo LRU do Streamlit.
+CACHE_DADOS_MAX_ENTRADAS = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "2"))
+CACHE_DADOS_TTL_S = int(os.getenv("DASHBOARD_CACHE_TTL", str(6 * 3600)))
+# Leituras filtradas (ex.: um conjunto de temas) guardam uma entrada por combinação de filtros.
+CACHE_CONSULTAS_MAX_ENTRADAS = int(os.getenv("DASHBOARD_QUERY_CACHE_MAX_ENTRIES", "32"))
+# Pontos enviados ao navegador por série dos gráficos de linha (0 = sem redução).
+PONTOS_POR_SERIE = int(os.getenv("DASHBOARD_MAX_POINTS", "500"))
+
+# Colunas lidas por visão do dashboard; nomes alternativos ausentes no arquivo são ignorados.
+COLUNAS_DESPESAS_PAINEL = (
+    "nomeDeputado",
+    "nomeParlamentar",
+    "nome",
+    "deputado",
+    "dataDocumento",
+    "tipoDespesa",
+    "total_despesas",
+)
+COLUNAS_PROPOSICOES_PAINEL = ("id", "ementa", "tema", "dataApresentacao", "data_apresentacao", "dataApresentacao_iso", "data")
+
+Filtro = tuple[str, str, Any]
+
+
+def versao_arquivos(*caminhos: str | Path) -> tuple[tuple[str, int, int] | None, ...]:
+    """Impressão digital barata (mtime em ns + tamanho) de cada arquivo; `None` se não existe.
+
+    Um `stat` por arquivo a cada execução do script: muda quando o arquivo é regravado e
+    entra como argumento dos carregadores cacheados, que então só releem o que mudou.
+    """
+    partes = []
+    for caminho in caminhos:
+        try:
+            stat = os.stat(caminho)
+        except OSError:
+            partes.append(None)
+            continue
+        partes.append((str(caminho), stat.st_mtime_ns, stat.st_size))
+    return tuple(partes)
+
+
+class IndiceGrupos:
+    """Linhas de um DataFrame agrupadas por uma coluna-chave (ex.: nome do deputado).
+
+    Ordena uma única vez por `str(chave)` e guarda o intervalo [início, fim) de cada valor;
+    `linhas(nome)` devolve uma fatia posicional, custando O(linhas do grupo) em vez de uma
+    conversão e comparação sobre a coluna inteira. Linhas com chave nula ficam de fora.
+    """
+
+    def __init__(self, df: pd.DataFrame, coluna: str) -> None:
+        validas = df[coluna].notna().to_numpy()
+        chaves = df[coluna].to_numpy()[validas].astype(str)
+        ordem = np.argsort(chaves, kind="stable")
+        self.dados = df[validas].iloc[ordem]
+        nomes, inicios = np.unique(chaves[ordem], return_index=True)
+        fins = np.append(inicios[1:], len(ordem))
+        self.nomes: list[str] = nomes.tolist()
+        self._intervalos = dict(zip(self.nomes, zip(inicios.tolist(), fins.tolist())))
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def linhas(self, nome: str) -> pd.DataFrame:
+        """Linhas do grupo (somente leitura; vazio se o nome não existe)."""
+        inicio, fim = self._intervalos.get(str(nome), (0, 0))
+        return self.dados.iloc[inicio:fim]
+
+
+def indices_lttb(x: np.ndarray, y: np.ndarray, alvo: int) -> np.ndarray:
+    """Posições mantidas pelo Largest-Triangle-Three-Buckets (x crescente).
+
+    Preserva primeiro e último ponto e, em cada balde, o ponto que forma o maior triângulo
+    com o escolhido no balde anterior e a média do seguinte: picos e vales sobrevivem.
+    """
+    n = len(x)
+    if alvo >= n or alvo < 3:
+        return np.arange(n)
+    limites = (np.arange(alvo - 1) * ((n - 2) / (alvo - 2))).astype(np.int64) + 1
+    limites[-1] = n - 1
+    escolhidos = np.empty(alvo, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for balde in range(alvo - 2):
+        inicio, fim = limites[balde], limites[balde + 1]
+        proximo_fim = limites[balde + 2] if balde + 2 < len(limites) else n
+        media_x = x[fim:proximo_fim].mean()
+        media_y = y[fim:proximo_fim].mean()
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[balde + 1] = anterior
+    return escolhidos
+
+
+def reduzir_series(
+    df: pd.DataFrame, x: str, y: str, cor: str | None = None, alvo: int = PONTOS_POR_SERIE
+) -> pd.DataFrame:
+    """Reduz cada série (uma por valor de `cor`) a no máximo `alvo` pontos com LTTB.
+
+    Séries curtas voltam inteiras; pontos sem x ou y são descartados (o gráfico não os
+    desenharia). Com `alvo` <= 0 devolve `df` sem alteração.
+    """
+    if alvo <= 0:
+        return df
+    df = df[df[x].notna() & df[y].notna()]
+    grupos = [df] if cor is None else [grupo for _, grupo in df.groupby(cor, dropna=False, sort=False)]
+    if all(len(grupo) <= alvo for grupo in grupos):
+        return df
+    partes = []
+    for grupo in grupos:
+        if len(grupo) > alvo:
+            grupo = grupo.sort_values(x, kind="stable")
+            if pd.api.types.is_datetime64_any_dtype(grupo[x]):
+                eixo_x = grupo[x].to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+            else:
+                eixo_x = grupo[x].to_numpy(dtype=np.float64)
+            grupo = grupo.iloc[indices_lttb(eixo_x, grupo[y].to_numpy(dtype=np.float64), alvo)]
+        partes.append(grupo)
+    return pd.concat(partes)
+
+
+def ler_parquet(
+    caminho: str | Path, colunas: Sequence[str] | None = None, filtros: Sequence[Filtro] = ()
+) -> pd.DataFrame:
+    """Lê `caminho` decodificando só `colunas` e as linhas que passam em `filtros`.
+
+    Colunas pedidas que não existem no arquivo são ignoradas (os leitores aceitam nomes
+    alternativos); `None` lê todas. `filtros` são tuplas `(coluna, operador, valor)` no
+    formato do pyarrow, combinadas com E: grupos de linhas descartados pelas estatísticas
+    do arquivo nem são lidos. Um filtro sobre coluna inexistente é erro, não é ignorado.
+    """
+    import pyarrow.parquet as pq
+
+    if colunas is not None:
+        existentes = set(pq.read_schema(caminho).names)
+        colunas = [coluna for coluna in dict.fromkeys(colunas) if coluna in existentes]
+    return pd.read_parquet(caminho, columns=colunas, filters=[tuple(filtro) for filtro in filtros] or None)
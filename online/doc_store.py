@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# Layout: MAGICO (8 bytes) | n (uint64) | n + 1 offsets (uint64, relativos ao início dos dados) | dados.
+# Cada documento é um JSON UTF-8 independente, decodificado só quando acessado.
+MAGICO = b"ASDOCS1\x00"
+_CABECALHO = len(MAGICO) + 8
+
+
+def gravar_documentos(caminho: Path, documentos: Sequence[dict[str, Any]]) -> None:
+    """Grava os documentos no formato binário com offsets (arquivo temporário + rename)."""
+    blobs = [json.dumps(doc, ensure_ascii=False).encode("utf-8") for doc in documentos]
+    offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+    np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+    with open(temporario, "wb") as file:
+        file.write(MAGICO)
+        file.write(np.uint64(len(blobs)).astype("<u8").tobytes())
+        file.write(offsets.tobytes())
+        for blob in blobs:
+            file.write(blob)
+    os.replace(temporario, caminho)
+
+
+class DocumentosBinarios(Sequence):
+    """Sequência somente leitura de documentos sobre um arquivo mapeado em memória.
+
+    Abrir custa O(1) além do mapeamento; processos diferentes compartilham as páginas pelo
+    cache do sistema operacional e cada documento só é decodificado quando é devolvido.
+    """
+
+    def __init__(self, caminho: Path) -> None:
+        self.caminho = caminho
+        with open(caminho, "rb") as file:
+            self._mapa = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mapa[: len(MAGICO)] != MAGICO:
+            self._mapa.close()
+            raise ValueError(f"{caminho} não é um arquivo de documentos do assistente")
+        total = int(np.frombuffer(self._mapa, dtype="<u8", count=1, offset=len(MAGICO))[0])
+        self._offsets = np.frombuffer(self._mapa, dtype="<u8", count=total + 1, offset=_CABECALHO)
+        self._inicio_dados = _CABECALHO + 8 * (total + 1)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, posicao: int | slice) -> Any:
+        if isinstance(posicao, slice):
+            return [self[i] for i in range(*posicao.indices(len(self)))]
+        if posicao < 0:
+            posicao += len(self)
+        if not 0 <= posicao < len(self):
+            raise IndexError(posicao)
+        inicio = self._inicio_dados + int(self._offsets[posicao])
+        fim = self._inicio_dados + int(self._offsets[posicao + 1])
+        return json.loads(self._mapa[inicio:fim].decode("utf-8"))
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+import uuid
+from pathlib import Path
+
+
+class TravaArquivo:
+    """Trava entre processos baseada em um arquivo criado com O_CREAT | O_EXCL.
+
+    Funciona igual em POSIX e Windows, sem `fcntl`/`msvcrt`. O arquivo guarda pid, host,
+    horário e um token do dono; uma trava de processo morto (mesmo host, POSIX) ou mais velha
+    que `expira_s` é considerada abandonada e removida. `liberar` só apaga o arquivo se o
+    token ainda for o seu (a trava pode ter sido tomada como abandonada por outro processo).
+    """
+
+    def __init__(self, caminho: Path, expira_s: float = 3600.0, intervalo_s: float = 0.2) -> None:
+        self.caminho = caminho
+        self.expira_s = expira_s
+        self.intervalo_s = intervalo_s
+        self._token: str | None = None
+
+    def tentar(self) -> bool:
+        """Tenta adquirir sem esperar. Erros de E/S (ex.: pasta somente leitura) são propagados."""
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                descritor = os.open(self.caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._abandonada():
+                    return False
+                # Dois processos podem remover a mesma trava abandonada ao mesmo tempo e ambos
+                # publicarem; a publicação é atômica, então o custo é só um build repetido.
+                try:
+                    os.unlink(self.caminho)
+                except FileNotFoundError:
+                    pass
+                continue
+            token = uuid.uuid4().hex
+            with os.fdopen(descritor, "w", encoding="utf-8") as file:
+                json.dump(
+                    {"pid": os.getpid(), "host": socket.gethostname(), "criada_em": time.time(), "token": token}, file
+                )
+            self._token = token
+            return True
+        return False
+
+    def adquirir(self, timeout: float | None = None) -> bool:
+        limite = None if timeout is None else time.monotonic() + timeout
+        while not self.tentar():
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            time.sleep(self.intervalo_s)
+        return True
+
+    def liberar(self) -> None:
+        token, self._token = self._token, None
+        if token is None or self._ler().get("token") != token:
+            return  # não é (mais) nossa: expirou e outro processo a tomou
+        try:
+            os.unlink(self.caminho)
+        except FileNotFoundError:
+            pass
+
+    def _ler(self) -> dict:
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as file:
+                dados = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return dados if isinstance(dados, dict) else {}
+
+    def _abandonada(self) -> bool:
+        try:
+            idade = time.time() - self.caminho.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        if idade > self.expira_s:
+            return True
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as file:
+                dono = json.load(file)
+        except FileNotFoundError:
+            return True
+        except (OSError, ValueError):
+            return False  # ainda sendo escrita por quem acabou de criá-la (a idade já foi conferida)
+        if os.name == "posix" and dono.get("host") == socket.gethostname():
+            try:
+                os.kill(int(dono.get("pid", 0)), 0)
+            except ProcessLookupError:
+                return True
+            except (OSError, ValueError):
+                return False
+        return False
+
+    def __enter__(self) -> "TravaArquivo":
+        self.adquirir()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.liberar()
@@ -0,0 +1,126 @@
+"""Compara os backends de inferência do encoder do assistente em CPU.
+
+Para cada backend (fp32, int8, onnx) mede a vazão de codificação sobre a mistura real
+de textos da base local (documentos do índice, ementas e sumarizações) e o desvio de
+cosseno em relação aos embeddings fp32. Com `--comparar-lotes`, compara também os
+lotes fixos de 16 textos em ordem original com os lotes por comprimento sob orçamento
+de tokens, em tokens reais (sem padding) por segundo.
+
+Uso:
+    python scripts/benchmark_encoder.py --backends fp32 int8 onnx --threads 4
+    python scripts/benchmark_encoder.py --backends fp32 --comparar-lotes
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+def _args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de inferência do encoder.")
+    parser.add_argument("--backends", nargs="+", default=["fp32", "int8", "onnx"], choices=["fp32", "int8", "onnx"])
+    parser.add_argument("--modelo", default=None, help="modelo Hugging Face (padrão: o do assistente)")
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads de torch/ONNX Runtime (0 = padrão)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--comparar-lotes", action="store_true", help="compara lotes fixos de 16 com lotes por comprimento")
+    return parser.parse_args()
+
+
+ARGS = _args()
+# Lido por online.assistant na importação (ASSISTANT_INTRA_OP_THREADS).
+os.environ["ASSISTANT_INTRA_OP_THREADS"] = str(ARGS.threads)
+
+from online.assistant import (  # noqa: E402
+    BERT_EMBEDDING_MODEL,
+    EMBEDDING_MAX_LENGTH,
+    EMBEDDING_MAX_TOKENS_PER_BATCH,
+    _carregar_proposicoes,
+    _carregar_sumarizacoes,
+    _embed_texts,
+    _load_embedding_model,
+    _planejar_lotes,
+    montar_documentos,
+)
+
+
+def corpus_benchmark(base_dir: Path) -> list[str]:
+    textos = [f"{doc['title']}. {doc['text']}" for doc in montar_documentos(base_dir)]
+    df_proposicoes = _carregar_proposicoes(base_dir / "data")
+    if "ementa" in df_proposicoes.columns:
+        textos.extend(df_proposicoes["ementa"].dropna().astype(str).tolist())
+    textos.extend(_carregar_sumarizacoes(base_dir / "data"))
+    return textos
+
+
+def medir(textos: list[str], modelo: str, backend: str, repeticoes: int) -> tuple[np.ndarray, float, float]:
+    inicio = time.perf_counter()
+    _load_embedding_model(modelo, backend)
+    carga = time.perf_counter() - inicio
+
+    _embed_texts(textos[:8], model_name=modelo, backend=backend)  # aquecimento
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        embeddings = _embed_texts(textos, model_name=modelo, backend=backend)
+    duracao = (time.perf_counter() - inicio) / repeticoes
+    return embeddings, carga, len(textos) / duracao
+
+
+def comparar_lotes(textos: list[str], modelo: str, backend: str, repeticoes: int) -> None:
+    tokenizer, _, _ = _load_embedding_model(modelo, backend)
+    comprimentos = [len(ids) for ids in tokenizer(textos, truncation=True, max_length=EMBEDDING_MAX_LENGTH)["input_ids"]]
+    tokens_reais = sum(comprimentos)
+
+    def fixos() -> None:
+        # Comportamento anterior: fatias de 16 na ordem original, cada uma um único lote.
+        for i in range(0, len(textos), 16):
+            _embed_texts(textos[i : i + 16], model_name=modelo, backend=backend)
+
+    def dinamicos() -> None:
+        _embed_texts(textos, model_name=modelo, backend=backend)
+
+    preenchidos_fixos = sum(
+        len(trecho) * max(trecho) for trecho in (comprimentos[i : i + 16] for i in range(0, len(comprimentos), 16))
+    )
+    preenchidos_dinamicos = sum(
+        len(lote) * max(comprimentos[i] for i in lote) for lote in _planejar_lotes(comprimentos, EMBEDDING_MAX_TOKENS_PER_BATCH, 128)
+    )
+
+    print(f"\nLotes ({backend}) | tokens reais: {tokens_reais}")
+    print(f"{'estratégia':<12} {'tokens c/ padding':>18} {'% padding':>10} {'tokens/s':>10}")
+    for nome, funcao, preenchidos in (("fixo-16", fixos, preenchidos_fixos), ("dinâmico", dinamicos, preenchidos_dinamicos)):
+        funcao()  # aquecimento
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            funcao()
+        duracao = (time.perf_counter() - inicio) / repeticoes
+        padding = 100 * (1 - tokens_reais / preenchidos)
+        print(f"{nome:<12} {preenchidos:>18} {padding:>9.1f}% {tokens_reais / duracao:>10.0f}")
+
+
+def main() -> None:
+    modelo = ARGS.modelo or BERT_EMBEDDING_MODEL
+    textos = corpus_benchmark(BASE_DIR)
+    print(f"Textos: {len(textos)} | modelo: {modelo} | threads: {ARGS.threads or 'padrão'}")
+
+    referencia, _, _ = medir(textos, modelo, "fp32", 1)
+    print(f"{'backend':<8} {'carga (s)':>10} {'textos/s':>10} {'cos médio':>10} {'cos mínimo':>11}")
+    for backend in ARGS.backends:
+        embeddings, carga, vazao = medir(textos, modelo, backend, ARGS.repeticoes)
+        cossenos = np.sum(embeddings * referencia, axis=1)
+        print(f"{backend:<8} {carga:>10.2f} {vazao:>10.1f} {cossenos.mean():>10.5f} {cossenos.min():>11.5f}")
+
+    if ARGS.comparar_lotes:
+        comparar_lotes(textos, modelo, ARGS.backends[0], ARGS.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Mede a inicialização a frio do dashboard.
+
+1. `python -X importtime` da importação de `online/assistant.py` (o que o dashboard importa
+   no carregamento): tempo total, módulos mais caros e se torch/transformers/faiss entraram.
+2. Tempo até a primeira renderização: executa `online/dashboard.py` uma vez com o
+   `AppTest` do Streamlit em um processo novo e reporta o tempo de parede e o pico de RSS.
+
+Uso (a partir da raiz do projeto):
+    python scripts/measure_cold_start.py
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODULOS_PESADOS = ("torch", "transformers", "faiss", "google.generativeai")
+
+_CODIGO_IMPORTACAO = f"""
+import json, resource, sys
+sys.path.insert(0, {str(BASE_DIR / "online")!r})
+import assistant
+print(json.dumps({{
+    "pesados": [m for m in {MODULOS_PESADOS!r} if m in sys.modules],
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+_CODIGO_PRIMEIRA_RENDERIZACAO = f"""
+import json, resource, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({str(BASE_DIR / "online" / "dashboard.py")!r}, default_timeout=300).run()
+print(json.dumps({{
+    "segundos": time.perf_counter() - inicio,
+    "excecoes": [str(item.value) for item in app.exception],
+    "pesados": [m for m in {MODULOS_PESADOS!r} if m in sys.modules],
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def _ultima_linha_json(saida: str) -> dict:
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def medir_importacao(top: int = 10) -> None:
+    inicio = time.perf_counter()
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CODIGO_IMPORTACAO],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    parede = time.perf_counter() - inicio
+
+    # Linhas: "import time: self [us] | cumulative | imported package"
+    modulos = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "imported package" in linha:
+            continue
+        _, cumulativo, nome = (parte.strip() for parte in linha.split(":", 1)[1].split("|"))
+        if not nome.startswith(" ") and "." not in nome:
+            modulos.append((int(cumulativo), nome))
+    modulos.sort(reverse=True)
+
+    resultado = _ultima_linha_json(processo.stdout)
+    print(f"import assistant: {parede:.2f}s de parede | pico de RSS {resultado['rss_mb']:.0f} MB")
+    print(f"módulos pesados carregados: {resultado['pesados'] or 'nenhum'}")
+    print(f"{'módulo':<30} {'cumulativo (ms)':>16}")
+    for cumulativo, nome in modulos[:top]:
+        print(f"{nome:<30} {cumulativo / 1000:>16.1f}")
+
+
+def medir_primeira_renderizacao() -> None:
+    processo = subprocess.run(
+        [sys.executable, "-c", _CODIGO_PRIMEIRA_RENDERIZACAO],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if processo.returncode != 0:
+        print("Falha ao executar o dashboard com AppTest:\n" + processo.stderr[-2000:])
+        return
+    resultado = _ultima_linha_json(processo.stdout)
+    print(
+        f"\nprimeira renderização do dashboard: {resultado['segundos']:.2f}s | pico de RSS {resultado['rss_mb']:.0f} MB"
+        f" | módulos pesados: {resultado['pesados'] or 'nenhum'}"
+    )
+    for excecao in resultado["excecoes"]:
+        print(f"  exceção no script: {excecao}")
+
+
+if __name__ == "__main__":
+    medir_importacao()
+    medir_primeira_renderizacao()
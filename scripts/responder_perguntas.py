@@ -0,0 +1,111 @@
+"""Responde perguntas em lote com o assistente (avaliação de regressão).
+
+Lê perguntas em JSONL, uma por linha, como objeto `{"id": ..., "question": ...}` (também
+aceita `pergunta`) ou como string JSON. Grava as respostas em JSONL na mesma ordem e
+reporta a vazão e a distribuição por rota na saída de erro.
+
+Uso:
+    python scripts/responder_perguntas.py perguntas.jsonl -o respostas.jsonl --concorrencia 8
+    python scripts/responder_perguntas.py perguntas.jsonl --sem-cache --lote 512
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from online.assistant import responder_perguntas  # noqa: E402
+
+
+def _ler_perguntas(arquivo: TextIO) -> Iterator[dict[str, Any]]:
+    for numero, linha in enumerate(arquivo, start=1):
+        if not linha.strip():
+            continue
+        item = json.loads(linha)
+        if isinstance(item, str):
+            item = {"question": item}
+        pergunta = item.get("question") or item.get("pergunta")
+        if not pergunta:
+            raise ValueError(f"linha {numero}: pergunta ausente")
+        yield {"id": item.get("id", numero), "question": str(pergunta)}
+
+
+def _em_lotes(itens: Iterator[dict[str, Any]], tamanho: int) -> Iterator[list[dict[str, Any]]]:
+    lote: list[dict[str, Any]] = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _saida_jsonl(entrada: dict[str, Any], resultado: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": entrada["id"],
+        "question": entrada["question"],
+        "answer": resultado["answer"],
+        "route": resultado["route"],
+        "cached": resultado["cached"],
+        "latency_ms": round(resultado["latency_ms"], 2),
+        "context": [{"id": item["id"], "source": item["source"], "score": item["score"]} for item in resultado["context"]],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Responde perguntas JSONL em lote com o assistente.")
+    parser.add_argument("entrada", help="arquivo JSONL de perguntas ('-' para stdin)")
+    parser.add_argument("-o", "--saida", default="-", help="arquivo JSONL de respostas ('-' para stdout)")
+    parser.add_argument("--base-dir", default=None, help="raiz do projeto com a pasta data/ (padrão: este projeto)")
+    parser.add_argument("--concorrencia", type=int, default=4, help="chamadas simultâneas ao Gemini")
+    parser.add_argument("--lote", type=int, default=256, help="perguntas por lote de embeddings/busca")
+    parser.add_argument("--sem-cache", action="store_true", help="ignora e não alimenta o cache de respostas")
+    args = parser.parse_args()
+
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, "r", encoding="utf-8")
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8")
+
+    rotas: Counter[str] = Counter()
+    latencias: list[float] = []
+    inicio = time.perf_counter()
+    try:
+        for lote in _em_lotes(_ler_perguntas(entrada), max(1, args.lote)):
+            resultados = responder_perguntas(
+                [item["question"] for item in lote],
+                base_dir=args.base_dir,
+                usar_cache=not args.sem_cache,
+                concurrency=args.concorrencia,
+            )
+            for item, resultado in zip(lote, resultados):
+                saida.write(json.dumps(_saida_jsonl(item, resultado), ensure_ascii=False) + "\n")
+                rotas[resultado["route"]] += 1
+                latencias.append(resultado["latency_ms"])
+            saida.flush()
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if saida is not sys.stdout:
+            saida.close()
+
+    duracao = time.perf_counter() - inicio
+    total = sum(rotas.values())
+    print(f"{total} perguntas em {duracao:.2f}s | {total / duracao if duracao else 0.0:.1f} perguntas/s", file=sys.stderr)
+    if latencias:
+        p50, p95 = np.percentile(latencias, [50, 95])
+        print(f"latência no lote: p50 {p50:.1f} ms | p95 {p95:.1f} ms", file=sys.stderr)
+    print("rotas: " + ", ".join(f"{rota}={quantidade}" for rota, quantidade in rotas.most_common()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
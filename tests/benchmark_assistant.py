@@ -0,0 +1,387 @@
+"""Benchmark de qualidade de recuperação e de latência do assistente.
+
+1. Qualidade: a fixture de `run_assistant_checks.py`, estendida com mais proposições e
+   resumos, e um conjunto rotulado pergunta -> documento esperado. Reporta recall@k e MRR
+   da busca densa, da BM25 e da híbrida (RRF, a usada em produção).
+2. Latência: p50/p95/p99 do embedding da pergunta, da busca (FAISS + BM25 + RRF) e da
+   resposta ponta a ponta sem cache.
+   Perguntas compostas (duas partes, dois documentos esperados) comparam o contexto da
+   pergunta original com o mesclado das subperguntas Self-Ask: recall e latência.
+3. Encoders: para cada encoder de `ENCODERS` pedido, publica um pacote do índice e reporta a
+   dimensão, a vazão de codificação dos documentos, o tamanho do índice e recall@k/MRR
+   da busca densa.
+4. Cache semântico: para cada encoder pedido, o cosseno entre pares de perguntas rotulados
+   (reformulações vs. perguntas diferentes sobre o mesmo assunto) e o menor limiar que não
+   junta nenhum par diferente, candidato a `Encoder.limiar_semantico`.
+5. Escala: corpus sintético de vetores (agrupados, normalizados) de 10 a 1M documentos.
+   Para cada tipo de índice FAISS mede a construção, a latência por consulta e o recall@10
+   contra a busca exata. Os vetores são sintéticos para isolar o custo do índice do encoder.
+
+Uso (a partir da raiz do projeto):
+    python tests/benchmark_assistant.py
+    python tests/benchmark_assistant.py --escalas 10 1000 100000 1000000 --indices flat hnsw ivf
+    python tests/benchmark_assistant.py --sem-escala --repeticoes 50
+    python tests/benchmark_assistant.py --sem-escala --encoders bert-base-pt minilm-multilingue e5-small-multilingue-256
+    python tests/benchmark_assistant.py --sem-escala --calibrar-cache bert-base-pt
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / "tests"))
+
+from online.assistant import (  # noqa: E402
+    BERT_EMBEDDING_DIM,
+    ENCODERS,
+    _codificar,
+    _fusao_rrf,
+    build_knowledge_base,
+    buscar_contexto,
+    buscar_contextos_self_ask,
+    decompor_pergunta,
+    publicar_base,
+    responder_pergunta,
+)
+from run_assistant_checks import _write_fixture  # noqa: E402
+
+DOC_CIENCIA = "proposicoes_ciência,_tecnologia_e_inovação"
+
+PERGUNTAS_ROTULADAS: list[tuple[str, str]] = [
+    ("Quantos deputados cada partido tem?", "deputados_partidos"),
+    ("Qual bancada partidária é a maior na Câmara?", "deputados_partidos"),
+    ("Com o que os deputados mais gastam a cota parlamentar?", "despesas_tipo"),
+    ("Qual foi o total gasto agregado em despesas?", "despesas_tipo"),
+    ("Quais empresas mais receberam pagamentos dos deputados?", "despesas_fornecedores"),
+    ("Quais fornecedores aparecem com mais frequência?", "despesas_fornecedores"),
+    ("Quem é o parlamentar que mais gastou?", "despesas_deputados"),
+    ("Quanto a deputada Ana gastou na base detalhada?", "despesas_deputados"),
+    ("Há projetos sobre reforma tributária e política fiscal?", "proposicoes_economia"),
+    ("O que tramita sobre emprego e mercado financeiro?", "proposicoes_economia"),
+    ("Existem propostas sobre software e telecomunicações?", DOC_CIENCIA),
+    ("Quais projetos incentivam a pesquisa científica?", DOC_CIENCIA),
+    ("Resuma as proposições da base.", "sumarizacoes_gerais"),
+    ("Quais resumos consolidados das proposições estão disponíveis?", "sumarizacoes_gerais"),
+]
+
+PERGUNTAS_COMPOSTAS: list[tuple[str, set[str]]] = [
+    ("Quais empresas mais recebem pagamentos e o que tramita sobre economia?", {"despesas_fornecedores", "proposicoes_economia"}),
+    ("Há propostas de tecnologia e qual partido tem mais deputados?", {DOC_CIENCIA, "deputados_partidos"}),
+    ("Resuma as proposições e diga o que há sobre inovação.", {"sumarizacoes_gerais", DOC_CIENCIA}),
+    ("Quem mais gastou em despesas e quais projetos tratam de economia?", {"despesas_deputados", "proposicoes_economia"}),
+    ("Qual tipo de despesa é mais declarado e quais fornecedores aparecem mais?", {"despesas_tipo", "despesas_fornecedores"}),
+]
+
+
+# (pergunta, outra, mesma pergunta?): as diferentes compartilham assunto e vocabulário, que é
+# onde um limiar frouxo erra; perguntas sobre entidades diferentes já são separadas pelo grupo.
+PARES_CACHE: list[tuple[str, str, bool]] = [
+    ("Qual partido tem mais deputados?", "Qual é o partido com mais deputados na Câmara?", True),
+    ("Qual deputado gastou mais?", "Quem é o deputado que mais gastou?", True),
+    ("Quais fornecedores são mais recorrentes?", "Quais fornecedores aparecem com mais frequência?", True),
+    ("Qual o tipo de despesa mais declarado?", "Que tipo de despesa os deputados mais declaram?", True),
+    ("O que tramita sobre economia?", "Quais proposições sobre economia estão tramitando?", True),
+    ("Há projetos sobre inovação tecnológica?", "Existem proposições sobre inovação e tecnologia?", True),
+    ("Resuma as proposições da base.", "Faça um resumo das proposições da base.", True),
+    ("Quanto os deputados gastaram no total?", "Qual foi o gasto total dos deputados?", True),
+    ("Qual partido tem mais deputados?", "Qual partido tem menos deputados?", False),
+    ("Qual deputado gastou mais?", "Qual deputado gastou menos?", False),
+    ("Quais fornecedores são mais recorrentes?", "Quais fornecedores receberam mais dinheiro?", False),
+    ("Qual o tipo de despesa mais declarado?", "Qual deputado declarou mais despesas?", False),
+    ("O que tramita sobre economia?", "O que tramita sobre ciência e tecnologia?", False),
+    ("Há projetos sobre inovação tecnológica?", "Quantos projetos sobre inovação foram apresentados?", False),
+    ("Resuma as proposições da base.", "Quantas proposições há na base?", False),
+    ("Quanto os deputados gastaram no total?", "Quantos deputados há na Câmara?", False),
+]
+
+
+def calibrar_cache_semantico(nomes: list[str]) -> None:
+    """Cossenos dos pares rotulados por encoder e o limiar sugerido para `limiar_semantico`."""
+    iguais = [iguais for _, _, iguais in PARES_CACHE]
+    print(f"\nCache semântico | {sum(iguais)} reformulações, {len(iguais) - sum(iguais)} perguntas diferentes")
+    print(
+        f"{'encoder':<26} {'reform. (mín/méd)':>18} {'difer. (máx/méd)':>17} {'limiar sugerido':>16} {'acerto reform.':>15}"
+    )
+    iguais_arr = np.asarray(iguais)
+    for nome in nomes:
+        encoder = ENCODERS[nome]
+        a = _codificar([pergunta for pergunta, _, _ in PARES_CACHE], encoder, "consulta")
+        b = _codificar([outra for _, outra, _ in PARES_CACHE], encoder, "consulta")
+        cossenos = np.sum(a * b, axis=1)
+        positivos, negativos = cossenos[iguais_arr], cossenos[~iguais_arr]
+        # Menor limiar (3 casas) acima de todos os pares diferentes: nenhum falso acerto no conjunto.
+        limiar = np.floor(negativos.max() * 1000 + 1) / 1000
+        acerto = np.mean(positivos >= limiar)
+        sugerido = f"{limiar:.3f}" if acerto > 0 else "nenhum"  # sem separação: deixe o cache desligado
+        print(
+            f"{nome:<26} {positivos.min():>8.3f}/{positivos.mean():<9.3f} {negativos.max():>8.3f}/{negativos.mean():<8.3f}"
+            f" {sugerido:>16} {acerto:>15.2f}"
+        )
+
+
+def _write_fixture_benchmark(base_dir: Path) -> None:
+    """Fixture das checagens com mais proposições por tema e mais resumos."""
+    _write_fixture(base_dir)
+    data_dir = base_dir / "data"
+
+    extras = pd.DataFrame(
+        {
+            "id": [13, 14, 15, 16, 17, 18],
+            "ementa": [
+                "Altera a legislação tributária e o regime fiscal de pequenas empresas.",
+                "Dispõe sobre o mercado financeiro e a supervisão bancária.",
+                "Cria programa de software livre na administração pública.",
+                "Amplia a cobertura de telecomunicações em áreas rurais.",
+                "Institui política de pesquisa científica nas universidades.",
+                "Estabelece regras de responsabilidade fiscal para municípios.",
+            ],
+            "tema": [
+                "Economia",
+                "Economia",
+                "Ciência, Tecnologia e Inovação",
+                "Ciência, Tecnologia e Inovação",
+                "Ciência, Tecnologia e Inovação",
+                "Economia",
+            ],
+            "dataApresentacao": ["2026-02-01", "2026-02-02", "2026-02-03", "2026-02-04", "2026-02-05", "2026-02-06"],
+        }
+    )
+    caminho = data_dir / "proposicoes_deputados.parquet"
+    pd.concat([pd.read_parquet(caminho), extras], ignore_index=True).to_parquet(caminho, index=False)
+
+    with open(data_dir / "sumarizacao_proposicoes.json", "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "resumos": [
+                    "Resumo de inovação: incentivos à pesquisa e ao software livre.",
+                    "Resumo de economia: medidas fiscais, tributárias e de emprego.",
+                    "Resumo de telecomunicações: expansão da cobertura em áreas rurais.",
+                ]
+            },
+            file,
+            ensure_ascii=False,
+            indent=2,
+        )
+
+
+def _percentis(amostras_ms: list[float]) -> str:
+    p50, p95, p99 = np.percentile(amostras_ms, [50, 95, 99])
+    return f"{p50:>9.2f} {p95:>9.2f} {p99:>9.2f}"
+
+
+def _metricas_ranking(rankings: list[list[str]], esperados: list[str], ks: list[int]) -> str:
+    recalls = [np.mean([esperado in ranking[:k] for ranking, esperado in zip(rankings, esperados)]) for k in ks]
+    mrr = np.mean(
+        [1.0 / (ranking.index(esperado) + 1) if esperado in ranking else 0.0 for ranking, esperado in zip(rankings, esperados)]
+    )
+    return " ".join(f"{recall:>9.3f}" for recall in recalls) + f" {mrr:>9.3f}"
+
+
+def avaliar_qualidade(base_dir: Path, ks: list[int]) -> None:
+    kb = build_knowledge_base(str(base_dir))
+    ids = [doc["id"] for doc in kb.documents]
+    perguntas = [pergunta for pergunta, _ in PERGUNTAS_ROTULADAS]
+    esperados = [esperado for _, esperado in PERGUNTAS_ROTULADAS]
+    profundidade = len(ids)
+
+    vetores = _codificar(perguntas, kb.encoder, "consulta")
+    _, indices = kb.index.search(vetores, profundidade)
+    densos = [[ids[idx] for idx in linha if idx >= 0] for linha in indices]
+    lexicos = [[ids[idx] for idx, _ in kb.lexical.buscar(pergunta, profundidade)] for pergunta in perguntas]
+    hibridos = [[item["id"] for item in buscar_contexto(pergunta, kb, top_k=profundidade)] for pergunta in perguntas]
+
+    print(f"\nQualidade | {len(perguntas)} perguntas rotuladas | {len(ids)} documentos")
+    print(f"{'busca':<10} " + " ".join(f"{f'recall@{k}':>9}" for k in ks) + f" {'MRR':>9}")
+    for nome, rankings in (("densa", densos), ("bm25", lexicos), ("híbrida", hibridos)):
+        print(f"{nome:<10} {_metricas_ranking(rankings, esperados, ks)}")
+
+
+def avaliar_subperguntas(base_dir: Path, repeticoes: int, top_k: int = 4) -> None:
+    kb = build_knowledge_base(str(base_dir))
+    perguntas = [pergunta for pergunta, _ in PERGUNTAS_COMPOSTAS]
+    subperguntas = [decompor_pergunta(pergunta) for pergunta in perguntas]
+    estrategias = {
+        "original": lambda: [buscar_contexto(pergunta, kb, top_k=top_k) for pergunta in perguntas],
+        "self-ask": lambda: buscar_contextos_self_ask(perguntas, subperguntas, kb, top_k=top_k),
+    }
+
+    print(f"\nPerguntas compostas | {len(perguntas)} perguntas, 2 documentos esperados cada | contexto de até {top_k}+")
+    print(f"{'contexto':<10} {'recall':>9} {'docs/perg.':>11} {'ms/perg.':>9}")
+    for nome, estrategia in estrategias.items():
+        contextos = estrategia()
+        recall = np.mean(
+            [len(esperados & {item["id"] for item in contexto}) / len(esperados) for contexto, (_, esperados) in zip(contextos, PERGUNTAS_COMPOSTAS)]
+        )
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            estrategia()
+        por_pergunta = (time.perf_counter() - inicio) * 1000 / (repeticoes * len(perguntas))
+        print(f"{nome:<10} {recall:>9.3f} {np.mean([len(contexto) for contexto in contextos]):>11.1f} {por_pergunta:>9.2f}")
+
+
+def medir_latencias(base_dir: Path, repeticoes: int) -> None:
+    kb = build_knowledge_base(str(base_dir))
+    candidatos = min(len(kb.documents), 16)
+    perguntas = [pergunta for pergunta, _ in PERGUNTAS_ROTULADAS]
+    _codificar(perguntas[:2], kb.encoder, "consulta")  # aquecimento
+
+    embedding, busca, ponta_a_ponta = [], [], []
+    for _ in range(repeticoes):
+        for pergunta in perguntas:
+            inicio = time.perf_counter()
+            vetor = _codificar([pergunta], kb.encoder, "consulta")
+            embedding.append((time.perf_counter() - inicio) * 1000)
+
+            inicio = time.perf_counter()
+            scores, indices = kb.index.search(vetor, candidatos)
+            densos = [(int(idx), float(score)) for score, idx in zip(scores[0], indices[0]) if idx >= 0]
+            _fusao_rrf([densos, kb.lexical.buscar(pergunta, candidatos)])
+            busca.append((time.perf_counter() - inicio) * 1000)
+
+            inicio = time.perf_counter()
+            responder_pergunta(pergunta, str(base_dir), usar_cache=False)
+            ponta_a_ponta.append((time.perf_counter() - inicio) * 1000)
+
+    print(f"\nLatência (ms) | {len(embedding)} amostras por etapa")
+    print(f"{'etapa':<14} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for nome, amostras in (("embedding", embedding), ("busca", busca), ("ponta a ponta", ponta_a_ponta)):
+        print(f"{nome:<14} {_percentis(amostras)}")
+
+
+def comparar_encoders(base_dir: Path, nomes: list[str], ks: list[int]) -> None:
+    import faiss
+
+    perguntas = [pergunta for pergunta, _ in PERGUNTAS_ROTULADAS]
+    esperados = [esperado for _, esperado in PERGUNTAS_ROTULADAS]
+    print(f"\nEncoders | busca densa | {len(perguntas)} perguntas rotuladas")
+    print(
+        f"{'encoder':<26} {'dim':>5} {'textos/s':>9} {'índice (KB)':>12} "
+        + " ".join(f"{f'recall@{k}':>9}" for k in ks)
+        + f" {'MRR':>9}"
+    )
+    for nome in nomes:
+        publicar_base(str(base_dir), encoder=nome)
+        kb = build_knowledge_base(str(base_dir), encoder=nome)
+        textos = [f"{doc['title']}. {doc['text']}" for doc in kb.documents]
+        _codificar(textos[:2], kb.encoder, "documento")  # aquecimento
+        inicio = time.perf_counter()
+        _codificar(textos, kb.encoder, "documento")
+        vazao = len(textos) / (time.perf_counter() - inicio)
+        tamanho = len(faiss.serialize_index(kb.index)) / 1024
+
+        ids = [doc["id"] for doc in kb.documents]
+        _, indices = kb.index.search(_codificar(perguntas, kb.encoder, "consulta"), len(ids))
+        densos = [[ids[idx] for idx in linha if idx >= 0] for linha in indices]
+        print(
+            f"{nome:<26} {kb.index.d:>5} {vazao:>9.1f} {tamanho:>12.1f} {_metricas_ranking(densos, esperados, ks)}"
+        )
+
+
+def _corpus_sintetico(n: int, dim: int, rng: np.random.Generator, bloco: int = 100_000) -> np.ndarray:
+    """Vetores agrupados em torno de centros aleatórios (mais próximo de embeddings reais que ruído puro)."""
+    centros = rng.standard_normal((max(1, min(1024, n // 10)), dim)).astype(np.float32)
+    corpus = np.empty((n, dim), dtype=np.float32)
+    for inicio in range(0, n, bloco):
+        fim = min(n, inicio + bloco)
+        corpus[inicio:fim] = centros[rng.integers(0, len(centros), fim - inicio)]
+        corpus[inicio:fim] += 0.5 * rng.standard_normal((fim - inicio, dim)).astype(np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    return corpus
+
+
+def _criar_indice(tipo: str, corpus: np.ndarray):
+    import faiss
+
+    n, dim = corpus.shape
+    if tipo == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif tipo == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = 64
+    elif tipo == "ivf":
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(corpus[: max(nlist * 39, min(n, 100_000))])
+        index.nprobe = min(nlist, 8)
+    else:
+        raise ValueError(f"Tipo de índice desconhecido: {tipo}")
+    index.add(corpus)
+    return index
+
+
+def medir_escala(escalas: list[int], tipos: list[str], dim: int, consultas: int, k: int = 10) -> None:
+    rng = np.random.default_rng(42)
+    print(f"\nEscala | dim {dim} | {consultas} consultas por tamanho | recall@{k} contra a busca exata")
+    print(f"{'docs':>9} {'índice':<6} {'construção (s)':>15} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {f'recall@{k}':>10}")
+    for n in escalas:
+        corpus = _corpus_sintetico(n, dim, rng)
+        amostra = corpus[rng.integers(0, n, consultas)]
+        amostra = amostra + 0.1 * rng.standard_normal(amostra.shape).astype(np.float32)
+        amostra /= np.linalg.norm(amostra, axis=1, keepdims=True)
+        k_efetivo = min(k, n)
+
+        exatos: np.ndarray | None = None
+        for tipo in ["flat"] + [tipo for tipo in tipos if tipo != "flat"]:
+            inicio = time.perf_counter()
+            index = _criar_indice(tipo, corpus)
+            construcao = time.perf_counter() - inicio
+
+            latencias, resultados = [], []
+            for consulta in amostra:
+                inicio = time.perf_counter()
+                _, indices = index.search(consulta[None, :], k_efetivo)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                resultados.append(indices[0])
+            resultados_arr = np.vstack(resultados)
+            if exatos is None:
+                exatos = resultados_arr
+            recall = np.mean([len(set(a) & set(b)) / k_efetivo for a, b in zip(resultados_arr, exatos)])
+            if tipo in tipos:
+                print(f"{n:>9} {tipo:<6} {construcao:>15.2f} {_percentis(latencias)} {recall:>10.3f}")
+            del index
+        del corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de qualidade e latência do assistente.")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5], help="cortes de recall@k")
+    parser.add_argument("--repeticoes", type=int, default=10, help="repetições do conjunto rotulado na latência")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[10, 1_000, 100_000], help="tamanhos do corpus sintético")
+    parser.add_argument("--indices", nargs="+", default=["flat", "hnsw", "ivf"], choices=["flat", "hnsw", "ivf"])
+    parser.add_argument("--dim", type=int, default=BERT_EMBEDDING_DIM, help="dimensão dos vetores sintéticos")
+    parser.add_argument("--consultas", type=int, default=200, help="consultas por tamanho de corpus")
+    parser.add_argument("--encoders", nargs="+", default=[], choices=sorted(ENCODERS), help="encoders a comparar")
+    parser.add_argument(
+        "--calibrar-cache", nargs="+", default=[], choices=sorted(ENCODERS), help="encoders a calibrar no cache semântico"
+    )
+    parser.add_argument("--sem-escala", action="store_true", help="pula o corpus sintético")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = Path(temp_dir)
+        _write_fixture_benchmark(base_dir)
+        publicar_base(str(base_dir))
+        avaliar_qualidade(base_dir, args.k)
+        avaliar_subperguntas(base_dir, args.repeticoes)
+        medir_latencias(base_dir, args.repeticoes)
+        if args.encoders:
+            comparar_encoders(base_dir, args.encoders, args.k)
+    if args.calibrar_cache:
+        calibrar_cache_semantico(args.calibrar_cache)
+
+    if not args.sem_escala:
+        medir_escala(args.escalas, args.indices, args.dim, args.consultas)
+
+
+if __name__ == "__main__":
+    main()
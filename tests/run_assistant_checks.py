@@ -1,16 +1,39 @@
 from __future__ import annotations
 
 import json
+import os
 import sys
 import tempfile
+import threading
+import time
+from dataclasses import replace
 from pathlib import Path
+from types import SimpleNamespace
 
+import faiss
+import numpy as np
 import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(BASE_DIR))
 
-from online.assistant import build_knowledge_base, responder_pergunta
+from online.assistant import (
+    FiltroBusca,
+    build_knowledge_base,
+    buscar_contexto,
+    buscar_contextos,
+    buscar_contextos_self_ask,
+    decompor_pergunta,
+    obter_estatisticas,
+    publicar_base,
+    responder_pergunta,
+    responder_perguntas,
+)
+import online.assistant as assistente
+from online.answer_cache import CacheSemantico
+from online.assistant_client import chamar_servico
+from online.assistant_service import criar_servidor
+from online.file_lock import TravaArquivo
 
 
 def _write_fixture(base_dir: Path) -> None:
@@ -71,16 +94,69 @@ def main() -> None:
         base_dir = Path(temp_dir)
         _write_fixture(base_dir)
 
+        try:
+            build_knowledge_base(str(base_dir))
+        except FileNotFoundError:
+            pass
+        else:
+            raise AssertionError("Sem pacote publicado, o assistente não deveria calcular embeddings sob demanda")
+        aquecimento = assistente.AquecimentoAssistente()
+        aquecimento.iniciar(str(base_dir))
+        assert not aquecimento.aguardar() and aquecimento.estado == "sem_indice", (aquecimento.estado, aquecimento.erro)
+
+        # Sem pacote publicado, o índice legado em data/ é servido até a primeira publicação.
+        encoder = assistente._resolver_encoder()
+        legados = assistente.montar_documentos(base_dir)[:2]
+        vetores_legados = assistente._codificar([f"{doc['title']}. {doc['text']}" for doc in legados], encoder, "documento")
+        indice_legado = faiss.IndexFlatIP(vetores_legados.shape[1])
+        indice_legado.add(vetores_legados)
+        faiss.write_index(indice_legado, str(base_dir / "data" / assistente.ASSISTANT_LEGACY_INDEX_NAME))
+        with open(base_dir / "data" / assistente.ASSISTANT_LEGACY_DOCS_NAME, "w", encoding="utf-8") as file:
+            json.dump({"schema_version": 2, "embedding_model": encoder.modelo, "documents": legados}, file, ensure_ascii=False)
+        ids_legados = [doc["id"] for doc in legados]
+        assert [doc["id"] for doc in build_knowledge_base(str(base_dir)).documents] == ids_legados
+
+        publicar_base(str(base_dir))
         kb = build_knowledge_base(str(base_dir))
+        assert [doc["id"] for doc in kb.documents] != ids_legados, "O pacote publicado deveria substituir o índice legado"
         assert len(kb.documents) >= 4, "Esperava ao menos 4 documentos no índice"
+        filtrado = buscar_contexto("Quais são as proposições que falam de Economia?", kb, top_k=3)
+        assert [item["id"] for item in filtrado] == ["proposicoes_economia"], [item["id"] for item in filtrado]
+
+        # Partidos e períodos das facetas vêm das tabelas de origem e restringem de fato a busca.
+        def recuperados(pergunta: str, filtro: FiltroBusca) -> set[str]:
+            return {item["id"] for item in buscar_contextos([pergunta], kb, top_k=len(kb.documents), filtros=[filtro])[0]}
+
+        ranking = "Qual deputado tem mais despesas?"
+        assert "despesas_deputados" in recuperados(ranking, FiltroBusca(partidos=("PT",)))
+        assert "despesas_deputados" not in recuperados(ranking, FiltroBusca(partidos=("PL",))), "Sem despesas de deputados do PL"
+        sobre_economia = "Quais são as proposições que falam de Economia?"
+        assert "proposicoes_economia" in recuperados(sobre_economia, FiltroBusca(data_fim="2026-01-02"))
+        antes = recuperados(sobre_economia, FiltroBusca(data_fim="2026-01-01"))
+        assert "proposicoes_economia" not in antes and "proposicoes_ciência,_tecnologia_e_inovação" in antes, antes
+
+        # Só siglas em maiúsculas (ou nomes após "partido") viram filtro de partido.
+        com_podemos_e_novo = SimpleNamespace(
+            facetas=assistente.IndiceFacetas(valores={"partido": {"podemos": [0], "novo": [0]}}, periodos=[None])
+        )
+        comum = assistente.filtro_da_pergunta("Podemos ver os gastos de 2023?", com_podemos_e_novo)
+        assert comum.partidos == () and comum.data_inicio == "2023-01-01", comum
+        assert assistente.filtro_da_pergunta("O Novo marco fiscal avançou?", com_podemos_e_novo).partidos == ()
+        assert assistente.filtro_da_pergunta("Quanto o NOVO gastou?", com_podemos_e_novo).partidos == ("NOVO",)
+        assert assistente.filtro_da_pergunta("E o partido Podemos?", com_podemos_e_novo).partidos == ("Podemos",)
 
-        respostas = {
-            "partidos": responder_pergunta("Qual é o partido político com mais deputados na câmara?", str(base_dir)),
-            "despesas": responder_pergunta("Qual é o deputado com mais despesas na câmara?", str(base_dir)),
-            "tipo": responder_pergunta("Qual é o tipo de despesa mais declarada pelos deputados da câmara?", str(base_dir)),
-            "economia": responder_pergunta("Quais são as informações mais relevantes sobre as proposições que falam de Economia?", str(base_dir)),
-            "ciencia": responder_pergunta("Quais são as informações mais relevantes sobre as proposições que falam de 'Ciência, Tecnologia e Inovação'?", str(base_dir)),
+        composta = "Quais fornecedores são mais recorrentes e o que tramita sobre economia?"
+        mesclado = {item["id"] for item in buscar_contextos_self_ask([composta], [decompor_pergunta(composta)], kb)[0]}
+        assert {"proposicoes_economia", "despesas_fornecedores"} <= mesclado, mesclado
+
+        perguntas = {
+            "partidos": "Qual é o partido político com mais deputados na câmara?",
+            "despesas": "Qual é o deputado com mais despesas na câmara?",
+            "tipo": "Qual é o tipo de despesa mais declarada pelos deputados da câmara?",
+            "economia": "Quais são as informações mais relevantes sobre as proposições que falam de Economia?",
+            "ciencia": "Quais são as informações mais relevantes sobre as proposições que falam de 'Ciência, Tecnologia e Inovação'?",
         }
+        respostas = dict(zip(perguntas, responder_perguntas(list(perguntas.values()), str(base_dir))))
 
         assert "PT" in respostas["partidos"]["answer"], respostas["partidos"]["answer"]
         assert "Bruno" in respostas["despesas"]["answer"], respostas["despesas"]["answer"]
@@ -88,6 +164,137 @@ def main() -> None:
         assert "Economia" in respostas["economia"]["answer"], respostas["economia"]["answer"]
         assert "Ciência, Tecnologia e Inovação" in respostas["ciencia"]["answer"], respostas["ciencia"]["answer"]
 
+        for chave in ("partidos", "despesas", "tipo", "economia", "ciencia"):
+            assert respostas[chave]["route"] == "estruturada", (chave, respostas[chave]["route"])
+
+        # Recortes (partido, deputado, tipo de despesa, comparação) não saem dos agregados globais.
+        recortadas = [
+            "Qual deputado do PL tem mais despesas?",
+            "Qual o tipo de despesa mais declarado pela deputada Ana?",
+            "Qual deputado tem mais despesas com passagens aéreas?",
+            "Qual deputado tem mais despesas de Divulgação?",
+            "Compare os gastos dos deputados com mais despesas",
+        ]
+        rotas = [item["route"] for item in responder_perguntas(recortadas, str(base_dir), usar_cache=False)]
+        assert rotas == ["recuperacao"] * len(recortadas), list(zip(recortadas, rotas))
+
+        aberta = responder_pergunta("Quais fornecedores são mais recorrentes?", str(base_dir))
+        assert aberta["route"] == "recuperacao", aberta["route"]
+        # O resultado devolvido é do chamador: alterá-lo não pode mudar a entrada do cache.
+        resposta_aberta, aberta["answer"] = aberta["answer"], "alterada pelo chamador"
+        repetida = responder_pergunta("quais fornecedores sao mais recorrentes", str(base_dir))
+        assert repetida["cached"] and repetida["route"] == "cache", "Pergunta repetida deveria vir do cache de respostas"
+        assert repetida["answer"] == resposta_aberta, repetida["answer"]
+
+        with open(base_dir / "data" / "sumarizacao_proposicoes.json", "w", encoding="utf-8") as file:
+            json.dump({"resumos": ["Resumo de inovação", "Resumo de economia", "Resumo novo"]}, file, ensure_ascii=False)
+        apos_atualizacao = responder_pergunta("Quais fornecedores são mais recorrentes?", str(base_dir))
+        assert not apos_atualizacao["cached"], "Atualização dos dados deveria invalidar o cache de respostas"
+
+        em_lote = responder_perguntas(
+            ["Quais fornecedores são mais recorrentes?", "Qual é o partido político com mais deputados na câmara?"],
+            str(base_dir),
+            usar_cache=False,
+        )
+        assert [item["route"] for item in em_lote] == ["recuperacao", "estruturada"], [item["route"] for item in em_lote]
+        assert em_lote[0]["answer"] == apos_atualizacao["answer"], "Lote e pergunta isolada deveriam concordar"
+
+        # Fontes regravadas antes da republicação: a resposta dada com o pacote antigo não
+        # pode sobreviver no cache depois que o pacote novo é publicado.
+        fornecedores = "Quais fornecedores são mais recorrentes?"
+        agregadas = pd.read_parquet(base_dir / "data" / "serie_despesas_diarias_deputados.parquet")
+        agregadas["fornecedores"] = [["Fornecedor NOVO"]] * len(agregadas)
+        agregadas.to_parquet(base_dir / "data" / "serie_despesas_diarias_deputados.parquet", index=False)
+        com_pacote_antigo = responder_pergunta(fornecedores, str(base_dir))
+        assert not any("Fornecedor NOVO" in item["text"] for item in com_pacote_antigo["context"])
+        publicar_base(str(base_dir))
+        com_pacote_novo = responder_pergunta(fornecedores, str(base_dir))
+        assert not com_pacote_novo["cached"], "Pacote republicado deveria invalidar o cache de respostas"
+        assert any("Fornecedor NOVO" in item["text"] for item in com_pacote_novo["context"]), com_pacote_novo["context"]
+
+        semantico = CacheSemantico(max_itens=2, limiar=0.9)
+        base = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+        vizinha = np.array([0.96, 0.28, 0.0], dtype=np.float32)
+        semantico.guardar_varios([("pergunta original", base, "tema=economia", {"answer": "resposta"})], "v1")
+        _, similar_a, similaridade = semantico.obter(vizinha, "v1", "tema=economia")
+        assert similar_a == "pergunta original" and abs(similaridade - 0.96) < 1e-6, (similar_a, similaridade)
+        assert semantico.obter(vizinha, "v1", "tema=saude") is None, "Grupos de filtros diferentes não se misturam"
+        assert semantico.obter(np.array([0.0, 1.0, 0.0], dtype=np.float32), "v1", "tema=economia") is None
+        assert semantico.obter(base, "v2", "tema=economia") is None, "Nova versão dos dados deveria esvaziar o cache"
+        semantico.guardar_varios(
+            [(f"p{i}", np.eye(3, dtype=np.float32)[i], "", {"answer": str(i)}) for i in range(3)], "v2"
+        )
+        assert len(semantico) == 2 and semantico.obter(np.eye(3, dtype=np.float32)[0], "v2") is None
+
+        # Sem limiar calibrado para o encoder o cache semântico fica desligado.
+        sobre_ana = "Quanto a deputada Ana gastou com fornecedores?"
+        responder_pergunta(sobre_ana, str(base_dir))
+        assert responder_pergunta("Quanto a deputada Ana gastou com os fornecedores?", str(base_dir))["route"] == "recuperacao"
+        # Mesmo aceitando qualquer cosseno, perguntas sobre entidades diferentes não se misturam.
+        assistente.SEMANTIC_CACHE_THRESHOLD = -1.0
+        try:
+            responder_perguntas(["Qual foi o gasto da deputada Ana com fornecedores?"], str(base_dir))
+            reformulada = responder_pergunta("Qual foi o gasto da deputada Ana com seus fornecedores?", str(base_dir))
+            assert reformulada["route"] == "cache_semantico", reformulada["route"]
+            outra_deputada = responder_pergunta("Qual foi o gasto do deputado Bruno com fornecedores?", str(base_dir))
+            assert outra_deputada["route"] == "recuperacao", outra_deputada.get("similar_to")
+            responder_pergunta("Quanto os deputados do PL gastaram com fornecedores?", str(base_dir))
+            outro_partido = responder_pergunta("Quanto os deputados do PT gastaram com fornecedores?", str(base_dir))
+            assert outro_partido["route"] == "recuperacao", outro_partido.get("similar_to")
+        finally:
+            assistente.SEMANTIC_CACHE_THRESHOLD = None
+
+        socket_servico = base_dir / "assistente.sock"
+        servidor = criar_servidor(str(base_dir), socket_unix=str(socket_servico))
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        try:
+            remota = chamar_servico("/responder", {"question": perguntas["partidos"]}, url=f"unix://{socket_servico}")
+            assert "PT" in remota["answer"], remota["answer"]
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+        # Bases de encoders diferentes do mesmo dataset convivem; republicar troca só a do encoder.
+        assistente.ENCODERS["copia"] = replace(assistente.ENCODERS[assistente.EMBEDDING_ENCODER], nome="copia")
+        try:
+            registro = assistente.RegistroBases()
+            publicar_base(str(base_dir), encoder="copia")
+            registro.obter(str(base_dir))
+            registro.obter(str(base_dir), encoder="copia")
+            publicar_base(str(base_dir), encoder="copia")
+            registro.obter(str(base_dir), encoder="copia")
+            residentes = sorted(item["encoder"] for item in registro.resumo())
+            assert residentes == sorted([assistente.EMBEDDING_ENCODER, "copia"]), residentes
+        finally:
+            del assistente.ENCODERS["copia"]
+
+        data_dir = base_dir / "data"
+        estatisticas = obter_estatisticas(data_dir)
+        assert obter_estatisticas(data_dir) is estatisticas, "Estatísticas deveriam ser reutilizadas enquanto os dados não mudam"
+        pd.DataFrame({"id": [3], "siglaPartido": ["PL"]}).to_parquet(data_dir / "deputados.parquet", index=False)
+        assert obter_estatisticas(data_dir).partidos.topo()[0] == "PL", "Estatísticas deveriam refletir os dados regravados"
+
+        _, indice_proposicoes = assistente._proposicoes_indexadas(data_dir)
+        assert assistente._proposicoes_indexadas(data_dir)[1] is indice_proposicoes, "Índice das proposições deveria ser reutilizado"
+        caminho_proposicoes = data_dir / "proposicoes_deputados.parquet"
+        pd.read_parquet(caminho_proposicoes).head(1).to_parquet(caminho_proposicoes, index=False)
+        regravadas, novo_indice = assistente._proposicoes_indexadas(data_dir)
+        assert novo_indice is not indice_proposicoes and len(regravadas) == 1, "Parquet regravado deveria gerar um novo índice"
+
+        # Trava ilegível e velha expira pelo mtime; quem perdeu a trava não apaga a do novo dono.
+        caminho_trava = base_dir / "publicando.lock"
+        caminho_trava.write_text("{", encoding="utf-8")
+        os.utime(caminho_trava, (time.time() - 120, time.time() - 120))
+        primeira = TravaArquivo(caminho_trava, expira_s=60)
+        assert primeira.tentar(), "Trava corrompida mais velha que o TTL deveria ser tomada"
+        os.utime(caminho_trava, (time.time() - 120, time.time() - 120))
+        segunda = TravaArquivo(caminho_trava, expira_s=60)
+        assert segunda.tentar()
+        primeira.liberar()
+        assert caminho_trava.exists() and not TravaArquivo(caminho_trava, expira_s=60).adquirir(timeout=0.1)
+        segunda.liberar()
+        assert not caminho_trava.exists()
+
         print("assistant_checks_ok")
 
 
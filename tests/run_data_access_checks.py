@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from online.data_access import IndiceGrupos, indices_lttb, ler_parquet, reduzir_series, versao_arquivos
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "dados.json"
+        assert versao_arquivos(caminho) == (None,)
+        caminho.write_text("[]", encoding="utf-8")
+        antes = versao_arquivos(caminho)
+        caminho.write_text("[1, 2]", encoding="utf-8")
+        assert versao_arquivos(caminho) != antes, "Arquivo regravado deveria mudar a versão"
+
+        proposicoes = Path(tmp) / "proposicoes.parquet"
+        pd.DataFrame(
+            {
+                "id": [1, 2, 3],
+                "uri": ["u1", "u2", "u3"],
+                "ementa": ["Reforma tributária", "Bolsas de pesquisa", "Crédito rural"],
+                "tema": ["Economia", "Ciência", "Economia"],
+            }
+        ).to_parquet(proposicoes, index=False, row_group_size=1)
+        lidas = ler_parquet(proposicoes, ("id", "tema", "dataApresentacao"), [("tema", "in", ["Economia"])])
+        assert lidas.columns.tolist() == ["id", "tema"], lidas.columns.tolist()
+        assert lidas["id"].tolist() == [1, 3], lidas["id"].tolist()
+        assert len(ler_parquet(proposicoes).columns) == 4
+
+    despesas = pd.DataFrame(
+        {"nomeDeputado": ["Bruno", "Ana", None, "Bruno", "Ana"], "total_despesas": [1.0, 2.0, 3.0, 4.0, 5.0]}
+    )
+    indice = IndiceGrupos(despesas, "nomeDeputado")
+    assert indice.nomes == ["Ana", "Bruno"], indice.nomes
+    assert indice.linhas("Bruno")["total_despesas"].tolist() == [1.0, 4.0]
+    assert indice.linhas("Carla").empty
+
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 300)
+    y[5_000] = 10.0
+    escolhidos = indices_lttb(x, y, 200)
+    assert len(escolhidos) == 200 and escolhidos[0] == 0 and escolhidos[-1] == len(x) - 1
+    assert np.all(np.diff(escolhidos) > 0) and 5_000 in escolhidos, "LTTB deveria preservar o pico"
+
+    serie = pd.DataFrame(
+        {
+            "dataDocumento": np.repeat(pd.date_range("2015-01-01", periods=3_000, freq="D"), 2),
+            "tipoDespesa": np.tile(["Passagens", "Telefonia"], 3_000),
+            "total_despesas": np.random.default_rng(0).random(6_000),
+        }
+    )
+    reduzida = reduzir_series(serie, "dataDocumento", "total_despesas", cor="tipoDespesa", alvo=300)
+    assert reduzida.groupby("tipoDespesa").size().tolist() == [300, 300]
+    assert reduzir_series(serie.head(10), "dataDocumento", "total_despesas", cor="tipoDespesa", alvo=300).equals(
+        serie.head(10)
+    )
+
+    print("data_access_checks_ok")
+
+
+if __name__ == "__main__":
+    main()